@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+#
+# Run with: gunicorn -c gunicorn.conf.py
+
+import gc
+import multiprocessing
+
+# The views are async: each uvicorn worker runs one event loop serving many
+# requests at once, with parsing and ranking offloaded to its executors
+# (see resume/executors.py), so one worker per core is enough.
+wsgi_app = 'resume_screening_backend.asgi:application'
+worker_class = 'uvicorn_worker.UvicornWorker'
+workers = multiprocessing.cpu_count()
+
+# Import the application (and with it load the NLP models, see wsgi.py) once in
+# the master, so every forked worker shares those pages copy-on-write instead
+# of loading its own copy.
+preload_app = True
+
+
+def when_ready(server):
+    from resume.model_registry import registry
+
+    for name, seconds in registry.load_times.items():
+        server.log.info("Preloaded model %r in %.2fs", name, seconds)
+
+    # Move everything loaded so far out of the garbage collector's reach, so
+    # collections in the workers do not touch (and un-share) those pages.
+    gc.freeze()
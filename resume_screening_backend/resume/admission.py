@@ -0,0 +1,269 @@
+# resume/admission.py
+
+import hashlib
+import os
+import tempfile
+import time
+import zipfile
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+
+from .extractors import EXTRACTORS
+
+# File fields of `upload_resume` and `bulk_upload`; any other file in the request is skipped
+UPLOAD_FIELD = 'resume'
+ARCHIVE_FIELD = 'archive'
+
+# Multipart framing and form fields allowed on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Leading bytes identifying each format, as the extension it is stored under.
+# A PDF header may follow up to 1 KiB of junk.
+SIGNATURES = (
+    (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', '.doc'),  # OLE2 compound file
+    (b'{\\rtf', '.rtf'),
+    (b'PK\x03\x04', '.docx'),
+)
+PDF_SIGNATURE = b'%PDF-'
+ZIP_SIGNATURES = (b'PK\x03\x04', b'PK\x05\x06')  # A first member, or an empty archive
+SNIFF_BYTES = 1024
+SNIFFED_EXTENSIONS = {'.pdf', '.txt', *(extension for _, extension in SIGNATURES)}
+
+# Claimed extensions whose files often really are another format
+COMPATIBLE_EXTENSIONS = {'.doc': {'.rtf', '.docx'}}
+
+
+class UploadRejected(Exception):
+    """
+    An upload turned away before it was stored or parsed.
+
+    `code` is a stable, machine-readable reason sent next to the message;
+    `retry_after` is set for rate limits.
+    """
+
+    def __init__(self, code, message, status=400, retry_after=None):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+        self.retry_after = retry_after
+
+
+def sniff_extension(head):
+    """The format of a file from its first bytes, as an extension, or None if it is not a document."""
+    if PDF_SIGNATURE in head[:SNIFF_BYTES]:
+        return '.pdf'
+    for magic, extension in SIGNATURES:
+        if head.startswith(magic):
+            return extension
+    if head.startswith((b'\xff\xfe', b'\xfe\xff')) or b'\x00' not in head:
+        return '.txt'
+    return None
+
+
+def check_extension(extension):
+    if extension.lower() not in EXTRACTORS:
+        raise UploadRejected(
+            'unsupported_type', f"Unsupported file format: Only {', '.join(EXTRACTORS)} files are supported", 415,
+        )
+
+
+def admitted_extension(claimed, head):
+    """
+    The extension an upload whose name ends in `claimed` is stored and
+    parsed under, going by its content; raises `UploadRejected` if it is not a supported
+    document or not the format its name says.
+    """
+    claimed = claimed.lower()
+    check_extension(claimed)
+    if claimed not in SNIFFED_EXTENSIONS:
+        return claimed  # A plugged-in format without a known signature
+    sniffed = sniff_extension(head)
+    if sniffed == claimed:
+        return claimed
+    if sniffed in COMPATIBLE_EXTENSIONS.get(claimed, ()):
+        return sniffed
+    raise UploadRejected('type_mismatch', f"The file content is not a valid {claimed} document", 415)
+
+
+def check_structure(path, extension):
+    """Cheap checks that a stored upload can be parsed at all, before it goes to an extractor."""
+    if extension == '.docx':
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if 'word/document.xml' not in archive.namelist():
+                    raise UploadRejected('invalid_document', "The .docx file has no document part", 422)
+        except zipfile.BadZipFile:
+            raise UploadRejected('invalid_document', "The .docx file is not a valid archive", 422) from None
+    elif extension == '.pdf':
+        with open(path, 'rb') as f:
+            f.seek(max(os.path.getsize(path) - SNIFF_BYTES, 0))
+            if b'%%EOF' not in f.read():
+                raise UploadRejected('invalid_document', "The PDF file is truncated", 422)
+
+
+# Client limits --------------------------------------------------------------
+
+def client_address(request):
+    """The client an upload is counted against: REMOTE_ADDR, or the first hop of UPLOAD_CLIENT_IP_HEADER."""
+    if settings.UPLOAD_CLIENT_IP_HEADER:
+        forwarded = request.META.get(settings.UPLOAD_CLIENT_IP_HEADER, '')
+        if forwarded.strip():
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def _content_length(request):
+    try:
+        return int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return 0
+
+
+def _count(cache, key, amount, timeout):
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key, amount)
+    except ValueError:  # Expired between add and incr
+        cache.set(key, amount, timeout=timeout)
+        return amount
+
+
+def admit_request(request, max_bytes=None):
+    """
+    Turn an upload away from its headers alone, before the body is read.
+
+    The request body may not be larger than `max_bytes` (UPLOAD_MAX_BYTES
+    by default, plus the multipart framing). Each client may send UPLOAD_RATE_LIMIT uploads and
+    UPLOAD_CLIENT_MAX_BYTES bytes per UPLOAD_RATE_WINDOW seconds; the
+    counters live in the UPLOAD_RATE_CACHE_ALIAS cache, so a shared cache
+    makes the limits hold across workers.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    length = _content_length(request)
+    if length > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise UploadRejected('file_too_large', f"Uploads are limited to {max_bytes} bytes", 413)
+
+    window = settings.UPLOAD_RATE_WINDOW
+    now = time.time()
+    bucket = int(now // window)
+    retry_after = int(window - now % window) + 1
+    cache = caches[settings.UPLOAD_RATE_CACHE_ALIAS]
+    prefix = f"upload-rate:{client_address(request)}:{bucket}"
+
+    if settings.UPLOAD_RATE_LIMIT:
+        if _count(cache, f"{prefix}:count", 1, window * 2) > settings.UPLOAD_RATE_LIMIT:
+            raise UploadRejected(
+                'rate_limited', f"At most {settings.UPLOAD_RATE_LIMIT} uploads per {window} seconds",
+                429, retry_after,
+            )
+    if settings.UPLOAD_CLIENT_MAX_BYTES and length:
+        if _count(cache, f"{prefix}:bytes", length, window * 2) > settings.UPLOAD_CLIENT_MAX_BYTES:
+            raise UploadRejected(
+                'quota_exceeded', f"At most {settings.UPLOAD_CLIENT_MAX_BYTES} bytes per {window} seconds",
+                429, retry_after,
+            )
+
+
+# Streaming ------------------------------------------------------------------
+
+class AdmittedUpload(UploadedFile):
+    """A sniffed, size-checked upload in a temporary file, hashed while it was received."""
+
+    def __init__(self, name, tmp_path, extension, content_hash, size):
+        super().__init__(None, name, None, size)
+        self.tmp_path = tmp_path
+        self.extension = extension
+        self.content_hash = content_hash
+
+    def temporary_file_path(self):
+        return self.tmp_path
+
+
+class AdmissionUploadHandler(FileUploadHandler):
+    """
+    Stream the `resume` field straight to a temporary file under UPLOAD_DIR.
+
+    The first chunk is sniffed before anything is written, every chunk is
+    hashed as it arrives, and the upload is aborted once it passes
+    UPLOAD_MAX_BYTES, so at most one UPLOAD_CHUNK_SIZE chunk is held in
+    memory. Rejections raise `UploadRejected` out of the multipart parser;
+    `discard` removes whatever temporary file is left behind.
+    """
+    upload_field = UPLOAD_FIELD
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.chunk_size = settings.UPLOAD_CHUNK_SIZE
+        self.directory = settings.UPLOAD_DIR
+        self.max_bytes = settings.UPLOAD_MAX_BYTES
+        self.tmp_path = None
+        self._file = None
+        self._digest = None
+        self._extension = None
+        self._size = 0
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        if field_name != self.upload_field or self.tmp_path is not None:
+            raise SkipFile()
+        # Rejected on the name alone, before a byte is written
+        self.check_name(file_name)
+        os.makedirs(self.directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        self._file = os.fdopen(fd, 'wb', buffering=0)
+        self._digest = hashlib.sha256()
+
+    def check_name(self, file_name):
+        check_extension(os.path.splitext(file_name)[1])
+
+    def sniff(self, head):
+        """The extension the file is stored under, from its first bytes."""
+        return admitted_extension(os.path.splitext(self.file_name)[1], head)
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._extension is None:
+            self._extension = self.sniff(raw_data[:SNIFF_BYTES])
+        self._size += len(raw_data)
+        if self._size > self.max_bytes:
+            raise UploadRejected('file_too_large', f"Uploads are limited to {self.max_bytes} bytes", 413)
+        self._digest.update(raw_data)
+        self._file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        self._file.close()
+        if not file_size:
+            raise UploadRejected('empty_file', "The uploaded file is empty")
+        return AdmittedUpload(self.file_name, self.tmp_path, self._extension, self._digest.hexdigest(), file_size)
+
+    def discard(self):
+        """Remove the temporary file unless it was moved into storage."""
+        if self._file is not None:
+            self._file.close()
+        if self.tmp_path and os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class ArchiveUploadHandler(AdmissionUploadHandler):
+    """
+    Stream the `archive` field of a bulk upload to a temporary file under
+    BULK_UPLOAD_DIR, refusing anything that is not a ZIP archive or is
+    larger than BULK_UPLOAD_MAX_BYTES.
+    """
+    upload_field = ARCHIVE_FIELD
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.directory = settings.BULK_UPLOAD_DIR
+        self.max_bytes = settings.BULK_UPLOAD_MAX_BYTES
+
+    def check_name(self, file_name):
+        pass  # Archives are recognised by their content
+
+    def sniff(self, head):
+        if not head.startswith(ZIP_SIGNATURES):
+            raise UploadRejected('unsupported_type', "Bulk uploads must be a ZIP archive", 415)
+        return '.zip'
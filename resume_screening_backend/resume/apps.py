@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ResumeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'resume'
+
+    def ready(self):
+        # Register the signal handlers that maintain the skill index
+        from . import signals  # noqa: F401
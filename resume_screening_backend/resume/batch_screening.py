@@ -0,0 +1,110 @@
+# resume/batch_screening.py
+
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .model_registry import registry
+from .models import Resume, ScreeningBatch, ShortlistEntry
+from .ranking import top_k_indices
+from .skill_index import chunked
+
+
+def top_k_per_query(model, texts, top_k, min_score=None, chunk_rows=None):
+    """
+    Rank the corpus for every text in one pass; returns `(resume_ids, scores)`
+    per text, best first.
+
+    Only the running top k of each text is kept between chunks, so memory
+    is bounded by the chunk's score block, not by the corpus size.
+    """
+    # Imported here so that importing the views does not pull in NumPy
+    import numpy as np
+
+    chunk_rows = chunk_rows or settings.BATCH_SCREENING_CHUNK_ROWS
+    best = [(np.zeros(0, dtype=np.int64), np.zeros(0)) for _ in texts]
+    for chunk_ids, chunk_scores in model.iter_batch_similarities(texts, chunk_rows):
+        for i, scores in enumerate(chunk_scores):
+            ids = np.concatenate([best[i][0], chunk_ids])
+            scores = np.concatenate([best[i][1], scores])
+            winners = top_k_indices(scores, ids, top_k, min_score)
+            best[i] = (ids[winners], scores[winners])
+    return best
+
+
+def create_batch(job_descriptions, top_k, min_score):
+    return ScreeningBatch.objects.create(job_descriptions=list(job_descriptions), top_k=top_k, min_score=min_score)
+
+
+def run_batch(batch_id):
+    """Score every JD of a batch against the TF-IDF matrix and store the shortlists in bulk."""
+    batch = ScreeningBatch.objects.get(pk=batch_id)
+    ScreeningBatch.objects.filter(pk=batch.pk).update(status=ScreeningBatch.STATUS_RUNNING, updated_at=timezone.now())
+    try:
+        model = registry.require('tfidf')
+        shortlists = top_k_per_query(model, batch.job_descriptions, batch.top_k, batch.min_score / 100)
+
+        with transaction.atomic():
+            # Resumes deleted while the batch was scored cannot be referenced
+            winners = {int(resume_id) for resume_ids, _ in shortlists for resume_id in resume_ids}
+            existing = set()
+            for chunk in chunked(winners):
+                existing.update(Resume.objects.filter(id__in=chunk).values_list('id', flat=True))
+            entries = []
+            for jd_index, (resume_ids, scores) in enumerate(shortlists):
+                kept = [(int(resume_id), float(score)) for resume_id, score in zip(resume_ids, scores)
+                        if int(resume_id) in existing]
+                entries.extend(
+                    ShortlistEntry(batch=batch, jd_index=jd_index, rank=rank, resume_id=resume_id, score=score)
+                    for rank, (resume_id, score) in enumerate(kept, 1)
+                )
+
+            # A re-run replaces the shortlists of an earlier attempt
+            ShortlistEntry.objects.filter(batch=batch).delete()
+            ShortlistEntry.objects.bulk_create(entries, batch_size=1000)
+            ScreeningBatch.objects.filter(pk=batch.pk).update(
+                status=ScreeningBatch.STATUS_DONE, updated_at=timezone.now()
+            )
+    except Exception as e:
+        ScreeningBatch.objects.filter(pk=batch.pk).update(
+            status=ScreeningBatch.STATUS_FAILED, error=str(e), updated_at=timezone.now()
+        )
+        raise
+    batch.refresh_from_db()
+    return batch
+
+
+def run_batch_in_background(batch_id):
+    """Run `run_batch` on a daemon thread so the request can return immediately."""
+    def target():
+        try:
+            run_batch(batch_id)
+        except Exception:
+            pass  # The failure is recorded on the batch for the status endpoint
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=target, name=f"screening-batch-{batch_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def batch_shortlists(batch):
+    """The stored shortlists of a batch: one list of resumes per JD, best first."""
+    shortlists = [[] for _ in batch.job_descriptions]
+    rows = (
+        ShortlistEntry.objects.filter(batch=batch).order_by('jd_index', 'rank')
+        .values_list('jd_index', 'score', 'resume_id', 'resume__name', 'resume__email', 'resume__phone', 'resume__skills')
+    )
+    for jd_index, score, resume_id, name, email, phone, skills in rows.iterator(chunk_size=2000):
+        shortlists[jd_index].append({
+            'id': resume_id,
+            'name': name,
+            'email': email,
+            'phone': phone,
+            'skills': skills,
+            'similarity': round(score * 100, 2),
+        })
+    return shortlists
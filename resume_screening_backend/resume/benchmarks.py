@@ -0,0 +1,270 @@
+# resume/benchmarks.py
+
+import gc
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+from django.conf import settings
+from django.urls import reverse
+
+# Relative change of a metric that counts as a regression against the baseline
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+# Metrics compared against the baseline, and whether a higher value is worse
+COMPARED_METRICS = {
+    'p50_ms': True,
+    'p95_ms': True,
+    'throughput_per_s': False,
+    'peak_rss_mb': True,
+}
+
+
+# Measurement ----------------------------------------------------------------
+
+def peak_rss_mb():
+    """Peak resident set size of this process and of its reaped children (e.g. parser processes)."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    )
+
+
+def summarize(timings, elapsed, warmup_seconds=0.0):
+    """Throughput and latency percentiles of one benchmark; `timings` are in seconds."""
+    latencies = np.asarray(timings) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (0.0, 0.0, 0.0)
+    own_rss, children_rss = peak_rss_mb()
+    return {
+        'iterations': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        'mean_ms': round(float(latencies.mean()), 3) if len(latencies) else 0.0,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'max_ms': round(float(latencies.max()), 3) if len(latencies) else 0.0,
+        'warmup_ms': round(warmup_seconds * 1000, 3),
+        'peak_rss_mb': round(own_rss, 1),
+        'peak_children_rss_mb': round(children_rss, 1),
+    }
+
+
+def measure(fn, inputs, warmup=(), setup=None):
+    """
+    Time `fn(item)` for every item of `inputs`, after running it on `warmup`.
+
+    The warmup pays for lazy model loads and index builds; its total is
+    reported separately. `setup`, if given, runs before every call and is
+    not timed.
+    """
+    started = time.perf_counter()
+    for item in warmup:
+        if setup:
+            setup()
+        fn(item)
+    warmup_seconds = time.perf_counter() - started
+
+    gc.collect()
+    timings = []
+    elapsed = 0.0
+    for item in inputs:
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - started)
+        elapsed += timings[-1]
+    return summarize(timings, elapsed, warmup_seconds)
+
+
+def _cycle(items, iterations):
+    return [items[i % len(items)] for i in range(iterations)] if items else []
+
+
+# Benchmarks -----------------------------------------------------------------
+
+def bench_extract_resume_data(paths, iterations, **_):
+    """`extract_resume_data` per document format."""
+    from .parsing import extract_resume_data
+
+    results = {}
+    for extension in sorted({os.path.splitext(path)[1].lower() for path in paths}):
+        files = [path for path in paths if path.lower().endswith(extension)]
+        results[f'extract_resume_data[{extension.lstrip(".")}]'] = measure(
+            extract_resume_data, _cycle(files, iterations), warmup=files[:1]
+        )
+    return results
+
+
+def bench_extract_skills_nlp(texts, iterations, **_):
+    from .parsing import extract_skills_nlp
+
+    return {'extract_skills_nlp': measure(extract_skills_nlp, _cycle(texts, iterations), warmup=texts[:1])}
+
+
+def _client():
+    from django.test import Client
+
+    hosts = [host for host in settings.ALLOWED_HOSTS if host and '*' not in host]
+    return Client(HTTP_HOST=(hosts[0].lstrip('.') if hosts else 'localhost'))
+
+
+def bench_upload_resume(upload_paths, **_):
+    """
+    POST each document once to the upload endpoint.
+
+    Every upload stores a new resume, so this needs documents not yet in
+    the database and should run against a scratch database. The per-client
+    upload limits are lifted for the run.
+    """
+    from django.test import override_settings
+
+    client = _client()
+
+    def upload(path):
+        with open(path, 'rb') as f:
+            response = client.post(reverse('upload_resume'), {'resume': f})
+        if response.status_code != 200 or response.json().get('duplicate'):
+            raise RuntimeError(f"Upload of {path} failed: {response.status_code} {response.content[:200]!r}")
+
+    with override_settings(UPLOAD_RATE_LIMIT=None, UPLOAD_CLIENT_MAX_BYTES=None):
+        return {'upload_resume': measure(upload, upload_paths[1:], warmup=upload_paths[:1])}
+
+
+def bench_get_results(jds, iterations, modes, **_):
+    """
+    POST the JDs to `get_results` in each ranking mode.
+
+    The corpus version is bumped before every request so each one misses
+    the result cache and measures the ranking itself.
+    """
+    from .result_cache import bump_corpus_version
+
+    client = _client()
+    results = {}
+    for mode in modes:
+        def query(job_description, mode=mode):
+            response = client.post(
+                reverse('get_results'), json.dumps({'job_description': job_description, 'mode': mode}),
+                content_type='application/json',
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"get_results ({mode}) failed: {response.status_code}")
+
+        results[f'get_results[{mode}]'] = measure(
+            query, _cycle(jds, iterations), warmup=jds[:1], setup=bump_corpus_version
+        )
+    return results
+
+
+def bench_kernels(jds, iterations, kernel_rows, **_):
+    """The scoring kernels on their own, without HTTP, the database or the result cache."""
+    from .bm25 import build_bm25_index
+    from .corpus_model import fit_corpus_model
+    from .embeddings import build_embedding_index, embed_query
+    from .hybrid import score_resumes, split_jd_skills
+    from .model_registry import registry
+    from .ranking import top_k_indices
+
+    queries = _cycle(jds, iterations)
+    top_k = settings.RESULTS_DEFAULT_TOP_K
+    results = {}
+
+    rng = np.random.default_rng(0)
+    scores, ids = rng.random(kernel_rows), np.arange(kernel_rows, dtype=np.int64)
+    results[f'kernel.top_k_indices[{kernel_rows}]'] = measure(
+        lambda _: top_k_indices(scores, ids, top_k), range(iterations), warmup=range(1)
+    )
+
+    model = registry.get('tfidf') or fit_corpus_model()
+    if model is not None:
+        results['kernel.tfidf.similarities'] = measure(model.similarities, queries, warmup=jds[:1])
+
+    index = registry.get('bm25') or build_bm25_index()
+    if index.doc_count:
+        results['kernel.bm25.search'] = measure(lambda jd: index.search(jd, top_k), queries, warmup=jds[:1])
+
+    embedding_index = registry.get('embedding_index') or build_embedding_index()
+    if len(embedding_index):
+        vectors = [embed_query(jd) for jd in jds]
+        results['kernel.embeddings.similarities'] = measure(
+            embedding_index.similarities, _cycle(vectors, iterations), warmup=vectors[:1]
+        )
+
+    split = {jd: split_jd_skills(jd) for jd in jds}
+    results['kernel.hybrid.score_resumes'] = measure(
+        lambda jd: score_resumes(
+            jd, *split[jd], settings.HYBRID_WEIGHTS, settings.HYBRID_MIN_MUST_COVERAGE
+        ),
+        queries, warmup=jds[:1],
+    )
+    return results
+
+
+BENCHMARKS = {
+    'extract_resume_data': bench_extract_resume_data,
+    'extract_skills_nlp': bench_extract_skills_nlp,
+    'upload_resume': bench_upload_resume,
+    'get_results': bench_get_results,
+    'kernels': bench_kernels,
+}
+
+
+def run_benchmarks(names, progress=None, **inputs):
+    """Run the named benchmarks; returns the JSON-serializable report."""
+    from .models import Resume
+
+    report = {
+        'meta': {
+            'started_at': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'resumes': Resume.objects.count(),
+            'benchmarks': list(names),
+        },
+        'results': {},
+    }
+    for name in names:
+        if progress:
+            progress(name)
+        report['results'].update(BENCHMARKS[name](**inputs))
+    own_rss, children_rss = peak_rss_mb()
+    report['meta']['peak_rss_mb'] = round(own_rss, 1)
+    report['meta']['peak_children_rss_mb'] = round(children_rss, 1)
+    return report
+
+
+# Baseline comparison --------------------------------------------------------
+
+def compare_to_baseline(report, baseline, threshold=DEFAULT_REGRESSION_THRESHOLD):
+    """
+    List the metrics of `report` that are worse than in `baseline` by more
+    than `threshold` (relative). Benchmarks missing from either side are
+    not compared.
+    """
+    regressions = []
+    for name, current in report['results'].items():
+        previous = baseline.get('results', {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_worse in COMPARED_METRICS.items():
+            before, after = previous.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change if higher_is_worse else -change) > threshold:
+                regressions.append({
+                    'benchmark': name,
+                    'metric': metric,
+                    'baseline': before,
+                    'current': after,
+                    'change': round(change, 4),
+                })
+    return regressions
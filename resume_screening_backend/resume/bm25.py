@@ -0,0 +1,542 @@
+# resume/bm25.py
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.conf import settings
+
+from .corpus_model import CURRENT_FILE, current_model_path, prune_versions, write_text_atomic
+from .models import Resume
+from .result_cache import bump_corpus_version
+
+# Same tokens as the TF-IDF model
+TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+SEGMENT_PREFIX = "seg-"
+TOMBSTONES_FILE = "deleted.i64"
+MERGE_LOCK_FILE = "merge.lock"
+
+# Resumes per segment when the index is built from scratch
+BUILD_CHUNK_SIZE = 5000
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+# Segments -------------------------------------------------------------------
+#
+# A segment is an immutable directory of .npy arrays, read through memory
+# maps. Documents are numbered by ascending resume id and each term's
+# postings are sorted by document number, so both can be binary-searched.
+
+def _write_segment(path, name, doc_ids, doc_lens, postings):
+    """
+    Write a segment from sorted `doc_ids`, their lengths and `postings`, an
+    iterable of `(term, docs, tfs)` in ascending term order.
+
+    The segment is written under a temporary name and renamed into place,
+    so readers never see it half-written.
+    """
+    lexicon, lexicon_offsets, offsets = bytearray(), [0], [0]
+    all_docs, all_tfs, max_tfs, min_lens = [], [], [], []
+    for term, docs, tfs in postings:
+        lexicon += term.encode('utf-8')
+        lexicon_offsets.append(len(lexicon))
+        offsets.append(offsets[-1] + len(docs))
+        all_docs.append(docs)
+        all_tfs.append(tfs)
+        max_tfs.append(tfs.max())
+        min_lens.append(doc_lens[docs].min())
+    if not all_docs:
+        return None
+
+    tmp = os.path.join(path, f".tmp-{name}")
+    os.makedirs(tmp)
+    arrays = {
+        'doc_ids': np.asarray(doc_ids, dtype=np.int64),
+        'doc_lens': np.asarray(doc_lens, dtype=np.int32),
+        'lexicon': np.frombuffer(bytes(lexicon), dtype=np.uint8),
+        'lexicon_offsets': np.asarray(lexicon_offsets, dtype=np.int64),
+        'offsets': np.asarray(offsets, dtype=np.int64),
+        'docs': np.concatenate(all_docs).astype(np.int32),
+        'tfs': np.concatenate(all_tfs).astype(np.int32),
+        'max_tfs': np.asarray(max_tfs, dtype=np.int32),
+        'min_lens': np.asarray(min_lens, dtype=np.int32),
+    }
+    for array_name, array in arrays.items():
+        np.save(os.path.join(tmp, array_name + ".npy"), array)
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({'docs': len(doc_ids), 'total_length': int(np.sum(doc_lens, dtype=np.int64))}, f)
+    os.rename(tmp, os.path.join(path, name))
+    return name
+
+
+def _new_segment_name():
+    # Names sort by creation time, which decides which copy of a resume is current
+    return f"{SEGMENT_PREFIX}{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}"
+
+
+def write_text_segment(path, resume_ids, texts):
+    """Tokenize resume texts into a new segment; returns its name (None if there was nothing to index)."""
+    latest = dict(zip(resume_ids, texts))  # The last text of a resume wins
+    doc_ids = sorted(latest)
+    doc_lens = np.zeros(len(doc_ids), dtype=np.int32)
+    term_docs = defaultdict(list)
+    term_tfs = defaultdict(list)
+    for doc, resume_id in enumerate(doc_ids):
+        tokens = tokenize(latest[resume_id])
+        doc_lens[doc] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            term_docs[term].append(doc)
+            term_tfs[term].append(tf)
+
+    postings = (
+        (term, np.asarray(term_docs[term], dtype=np.int32), np.asarray(term_tfs[term], dtype=np.int32))
+        for term in sorted(term_docs, key=lambda term: term.encode('utf-8'))
+    )
+    return _write_segment(path, _new_segment_name(), doc_ids, doc_lens, postings)
+
+
+class Segment:
+    """One memory-mapped segment."""
+
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        self.doc_count = meta['docs']
+        self.total_length = meta['total_length']
+        for array_name in ('doc_ids', 'doc_lens', 'lexicon', 'lexicon_offsets',
+                           'offsets', 'docs', 'tfs', 'max_tfs', 'min_lens'):
+            setattr(self, array_name, np.load(os.path.join(path, array_name + ".npy"), mmap_mode='r'))
+        self.term_count = len(self.offsets) - 1
+
+    def term(self, number):
+        start, end = self.lexicon_offsets[number], self.lexicon_offsets[number + 1]
+        return bytes(self.lexicon[start:end]).decode('utf-8')
+
+    def find(self, term):
+        """Binary-search the lexicon; returns the term number or -1."""
+        key = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            start, end = self.lexicon_offsets[mid], self.lexicon_offsets[mid + 1]
+            if bytes(self.lexicon[start:end]) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low < self.term_count and self.term(low) == term:
+            return low
+        return -1
+
+    def postings(self, number):
+        start, end = self.offsets[number], self.offsets[number + 1]
+        return self.docs[start:end], self.tfs[start:end]
+
+
+def _mark_dead(doc_ids, live, dead_ids):
+    """Clear `live` for the documents whose resume id is in `dead_ids`."""
+    if not len(dead_ids) or not len(doc_ids):
+        return
+    pos = np.minimum(np.searchsorted(doc_ids, dead_ids), len(doc_ids) - 1)
+    live[pos[doc_ids[pos] == dead_ids]] = False
+
+
+def _kth_largest(values, k):
+    if len(values) < k:
+        return 0.0
+    return float(np.partition(values, len(values) - k)[len(values) - k])
+
+
+# Index ----------------------------------------------------------------------
+
+class BM25Index:
+    """
+    Okapi BM25 over a list of segments.
+
+    New resumes arrive as small segments and are merged in the background.
+    A resume re-indexed in a newer segment, or listed in the tombstones
+    file, is masked out of the older segments. Nothing but the postings of
+    the query terms is read from disk.
+    """
+
+    def __init__(self, path, segments, lives, tombstone_count):
+        self.path = path
+        self.segments = segments
+        self.lives = lives
+        self.tombstone_count = tombstone_count
+        self.k1 = settings.BM25_K1
+        self.b = settings.BM25_B
+        # Statistics cover live documents only, so masked ones cannot push a
+        # term's document frequency past the document count
+        self.doc_count = int(sum(live.sum() for live in lives))
+        self.all_live = [bool(live.all()) for live in lives]
+        total_length = sum(
+            segment.total_length if all_live else int(segment.doc_lens[live].sum(dtype=np.int64))
+            for segment, live, all_live in zip(segments, lives, self.all_live)
+        )
+        self.avg_length = total_length / self.doc_count if self.doc_count else 0.0
+
+    @classmethod
+    def open(cls, path, previous=None):
+        """
+        Open the segments of `path`, reusing the live masks of `previous`.
+
+        Masks of segments already open are only updated with the resumes
+        of new segments and new tombstones, so appending a small segment
+        does not rescan the large ones.
+        """
+        names = sorted(name for name in os.listdir(path) if name.startswith(SEGMENT_PREFIX))
+        tombstones_path = os.path.join(path, TOMBSTONES_FILE)
+        if os.path.exists(tombstones_path):
+            tombstones = np.fromfile(tombstones_path, dtype=np.int64)
+        else:
+            tombstones = np.zeros(0, dtype=np.int64)
+
+        known = {}
+        new_tombstones = tombstones
+        if previous is not None and previous.path == path:
+            known = {segment.name: (segment, live) for segment, live in zip(previous.segments, previous.lives)}
+            new_tombstones = tombstones[previous.tombstone_count:]
+
+        segments = [known[name][0] if name in known else Segment(os.path.join(path, name)) for name in names]
+        lives = []
+        for number, segment in enumerate(segments):
+            newer = segments[number + 1:]
+            if segment.name in known:
+                live = known[segment.name][1].copy()
+                dead = [s.doc_ids for s in newer if s.name not in known] + [new_tombstones]
+            else:
+                live = np.ones(segment.doc_count, dtype=bool)
+                dead = [s.doc_ids for s in newer] + [tombstones]
+            for dead_ids in dead:
+                _mark_dead(segment.doc_ids, live, dead_ids)
+            lives.append(live)
+        return cls(path, segments, lives, len(tombstones))
+
+    @property
+    def resume_ids(self):
+        """Ids of every indexed resume."""
+        return np.concatenate(
+            [segment.doc_ids[live] for segment, live in zip(self.segments, self.lives)]
+            + [np.zeros(0, dtype=np.int64)]
+        )
+
+    def _live_df(self, number, term_number):
+        """Live documents of segment `number` containing the term."""
+        segment = self.segments[number]
+        if self.all_live[number]:
+            return int(segment.offsets[term_number + 1] - segment.offsets[term_number])
+        docs, _ = segment.postings(term_number)
+        return int(self.lives[number][docs].sum())
+
+    def _idf(self, segment_dfs):
+        df = max(segment_dfs, 1)
+        return float(np.log(1 + (self.doc_count - df + 0.5) / (df + 0.5)))
+
+    def _weights(self, idf, tfs, lengths):
+        norm = self.k1 * (1 - self.b + self.b * lengths / self.avg_length)
+        return idf * tfs * (self.k1 + 1) / (tfs + norm)
+
+    def _query_terms(self, text):
+        """`(term, idf, [term number per segment])` of the query terms, and the best possible score."""
+        terms = []
+        for term in sorted(set(tokenize(text))):
+            numbers = [segment.find(term) for segment in self.segments]
+            dfs = sum(
+                self._live_df(number, n) for number, n in enumerate(numbers) if n >= 0
+            )
+            if dfs:
+                terms.append((term, self._idf(dfs), numbers))
+        max_score = sum(idf * (self.k1 + 1) for _, idf, _ in terms)
+        return terms, max_score
+
+    def _search_segment(self, number, terms, k, threshold, prune):
+        """
+        MaxScore over one segment, term at a time.
+
+        Terms are taken in decreasing order of their score upper bound and
+        scored over their whole posting list only while a document seen in
+        none of them could still reach the top k. The remaining (frequent,
+        low-impact) terms are then only probed, by binary search, for the
+        candidates whose score can still cross the threshold.
+        """
+        segment, live = self.segments[number], self.lives[number]
+        entries = []
+        for _, idf, numbers in terms:
+            term_number = numbers[number]
+            if term_number < 0:
+                continue
+            bound = float(self._weights(idf, segment.max_tfs[term_number], segment.min_lens[term_number]))
+            entries.append((bound, idf, term_number))
+        if not entries:
+            return np.zeros(0, dtype=np.int64), np.zeros(0), threshold
+        entries.sort(reverse=True)
+        remaining = np.cumsum([bound for bound, _, _ in entries][::-1])[::-1]
+
+        scores = np.zeros(segment.doc_count, dtype=np.float64)
+        touched = []
+        essential = 0
+        while essential < len(entries) and remaining[essential] >= threshold:
+            _, idf, term_number = entries[essential]
+            docs, tfs = segment.postings(term_number)
+            keep = live[docs]
+            docs = docs[keep]
+            scores[docs] += self._weights(idf, tfs[keep], segment.doc_lens[docs])
+            touched.append(docs)
+            essential += 1
+            if prune:
+                threshold = max(threshold, _kth_largest(scores[docs], k))
+
+        candidates = np.unique(np.concatenate(touched)) if touched else np.zeros(0, dtype=np.int32)
+        for position in range(essential, len(entries)):
+            candidates = candidates[scores[candidates] + remaining[position] >= threshold]
+            if not len(candidates):
+                break
+            _, idf, term_number = entries[position]
+            docs, tfs = segment.postings(term_number)
+            pos = np.minimum(np.searchsorted(docs, candidates), len(docs) - 1)
+            hit = docs[pos] == candidates
+            hits = candidates[hit]
+            scores[hits] += self._weights(idf, tfs[pos[hit]], segment.doc_lens[hits])
+            if prune:
+                threshold = max(threshold, _kth_largest(scores[candidates], k))
+
+        candidates = candidates[scores[candidates] >= threshold]
+        return segment.doc_ids[candidates], scores[candidates], threshold
+
+    def search(self, text, k, min_score=None, after=None):
+        """
+        Return `(resume_ids, scores)` of the candidates for the top `k`;
+        scores are scaled to 0-1 by the best score the query allows.
+
+        Without a cursor the k-th best score so far prunes the search (it
+        carries over from one segment to the next). Past a cursor the top
+        rows are excluded, so only `min_score` can prune.
+        """
+        terms, max_score = self._query_terms(text)
+        if not terms:
+            return np.zeros(0, dtype=np.int64), np.zeros(0)
+        threshold = (min_score or 0.0) * max_score
+        prune = after is None
+
+        ids, scores, best = [], [], np.zeros(0)
+        for number in range(len(self.segments)):
+            segment_ids, segment_scores, threshold = self._search_segment(number, terms, k, threshold, prune)
+            ids.append(segment_ids)
+            scores.append(segment_scores)
+            if prune:
+                best = np.concatenate([best, segment_scores])
+                threshold = max(threshold, _kth_largest(best, k))
+        return np.concatenate(ids), np.concatenate(scores) / max_score
+
+    def similarities_for(self, text, candidate_ids):
+        """BM25 score of `text` for the given resumes only (0 for unknown ids), scaled to 0-1."""
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        scores = np.zeros(len(candidate_ids))
+        terms, max_score = self._query_terms(text)
+        if not terms or not len(candidate_ids):
+            return scores
+
+        for number, (segment, live) in enumerate(zip(self.segments, self.lives)):
+            pos = np.minimum(np.searchsorted(segment.doc_ids, candidate_ids), segment.doc_count - 1)
+            found = np.flatnonzero(segment.doc_ids[pos] == candidate_ids)
+            found = found[live[pos[found]]]
+            if not len(found):
+                continue
+            local = pos[found]
+            order = np.argsort(local)
+            found, local = found[order], local[order]
+            for _, idf, numbers in terms:
+                if numbers[number] < 0:
+                    continue
+                docs, tfs = segment.postings(numbers[number])
+                hit_pos = np.minimum(np.searchsorted(docs, local), len(docs) - 1)
+                hit = docs[hit_pos] == local
+                scores[found[hit]] += self._weights(idf, tfs[hit_pos[hit]], segment.doc_lens[local[hit]])
+        return scores / max_score
+
+
+# Merging --------------------------------------------------------------------
+
+def merge_segments(path, factor=None):
+    """
+    Merge the run of `factor` consecutive segments holding the fewest live
+    documents into one. Returns False when there was nothing to merge or
+    another process is already merging.
+
+    The merged segment sorts right after the newest segment it replaces,
+    so it stays older than anything appended during the merge.
+    """
+    factor = factor or settings.BM25_MERGE_FACTOR
+    with open(os.path.join(path, MERGE_LOCK_FILE), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            index = BM25Index.open(path)
+            if len(index.segments) <= settings.BM25_MAX_SEGMENTS:
+                return False
+            sizes = np.array([live.sum() for live in index.lives])
+            window = min(factor, len(sizes))
+            totals = np.convolve(sizes, np.ones(window, dtype=sizes.dtype), mode='valid')
+            start = int(np.argmin(totals))
+            inputs = list(range(start, start + window))
+
+            # Renumber the live documents of all inputs by ascending resume id
+            doc_ids = np.concatenate([index.segments[i].doc_ids[index.lives[i]] for i in inputs])
+            doc_lens = np.concatenate([index.segments[i].doc_lens[index.lives[i]] for i in inputs])
+            order = np.argsort(doc_ids, kind='stable')
+            rank = np.empty(len(order), dtype=np.int32)
+            rank[order] = np.arange(len(order), dtype=np.int32)
+
+            term_docs, term_tfs = defaultdict(list), defaultdict(list)
+            offset = 0
+            for i in inputs:
+                segment, live = index.segments[i], index.lives[i]
+                remap = np.full(segment.doc_count, -1, dtype=np.int32)
+                remap[live] = rank[offset:offset + int(live.sum())]
+                offset += int(live.sum())
+                for term_number in range(segment.term_count):
+                    docs, tfs = segment.postings(term_number)
+                    docs = remap[docs]
+                    keep = docs >= 0
+                    if keep.any():
+                        term = segment.term(term_number)
+                        term_docs[term].append(docs[keep])
+                        term_tfs[term].append(tfs[keep])
+
+            def postings():
+                for term in sorted(term_docs, key=lambda term: term.encode('utf-8')):
+                    docs = np.concatenate(term_docs[term])
+                    tfs = np.concatenate(term_tfs[term])
+                    by_doc = np.argsort(docs, kind='stable')
+                    yield term, docs[by_doc], tfs[by_doc]
+
+            name = index.segments[inputs[-1]].name + "-m"
+            _write_segment(path, name, doc_ids[order], doc_lens[order], postings())
+            for i in inputs:
+                shutil.rmtree(index.segments[i].path, ignore_errors=True)
+            return True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def merge_in_background(path):
+    """Start a daemon thread merging segments until few enough are left."""
+    def target():
+        try:
+            while merge_segments(path):
+                pass
+        except Exception:
+            pass  # Merging is retried after the next append
+
+    thread = threading.Thread(target=target, name="bm25-merge", daemon=True)
+    thread.start()
+    return thread
+
+
+# Building and updating ------------------------------------------------------
+
+def build_bm25_index():
+    """Index every stored resume text into a new index version and make it current."""
+    root = settings.BM25_INDEX_DIR
+    version = time.strftime("v%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+    path = os.path.join(root, version)
+    os.makedirs(path)
+
+    rows = (
+        Resume.objects.exclude(resume_text__isnull=True)
+        .exclude(parse_version=Resume.LEGACY_PARSE_VERSION)
+        .order_by('id').values_list('id', 'resume_text')
+    )
+    batch = []
+    for resume_id, text in rows.iterator(chunk_size=2000):
+        if text:
+            batch.append((resume_id, text))
+        if len(batch) >= BUILD_CHUNK_SIZE:
+            write_text_segment(path, *zip(*batch))
+            batch = []
+    if batch:
+        write_text_segment(path, *zip(*batch))
+    while merge_segments(path):
+        pass
+
+    write_text_atomic(os.path.join(root, CURRENT_FILE), version)
+    prune_versions(root, keep=2)
+    index = BM25Index.open(path)
+    with _lock:
+        _cached['index'] = index
+        _cached['key'] = _cache_key(path)
+    bump_corpus_version()
+    return index
+
+
+def append_to_bm25_index(resumes):
+    """Index newly stored resumes as a new segment; a no-op until the index was built."""
+    pairs = [
+        (resume.id, resume.resume_text) for resume in resumes
+        if resume.resume_text and resume.parse_version != Resume.LEGACY_PARSE_VERSION
+    ]
+    path = current_model_path(settings.BM25_INDEX_DIR)
+    if path is None or not pairs:
+        return
+    write_text_segment(path, *zip(*pairs))
+    if sum(name.startswith(SEGMENT_PREFIX) for name in os.listdir(path)) > settings.BM25_MAX_SEGMENTS:
+        merge_in_background(path)
+
+
+def remove_from_bm25_index(resume_ids):
+    """Record deleted resumes in the tombstones file."""
+    path = current_model_path(settings.BM25_INDEX_DIR)
+    if path is None or not resume_ids:
+        return
+    with open(os.path.join(path, TOMBSTONES_FILE), "ab") as f:
+        f.write(np.asarray(resume_ids, dtype=np.int64).tobytes())
+
+
+# Process-wide cache ---------------------------------------------------------
+
+_lock = threading.Lock()
+_cached = {'key': None, 'index': None}
+
+
+def _cache_key(path):
+    names = tuple(sorted(name for name in os.listdir(path) if name.startswith(SEGMENT_PREFIX)))
+    tombstones = os.path.join(path, TOMBSTONES_FILE)
+    return (path, names, os.path.getsize(tombstones) if os.path.exists(tombstones) else 0)
+
+
+def get_bm25_index():
+    """
+    Return the current BM25 index, or None if none was built.
+
+    Only segments added since the last call are opened; a merge that
+    removes a segment mid-open is retried.
+    """
+    path = current_model_path(settings.BM25_INDEX_DIR)
+    if path is None:
+        return None
+    with _lock:
+        for _ in range(3):
+            key = _cache_key(path)
+            if _cached['key'] == key:
+                break
+            try:
+                _cached['index'] = BM25Index.open(path, _cached['index'])
+            except FileNotFoundError:
+                continue
+            _cached['key'] = key
+            break
+        return _cached['index']
@@ -0,0 +1,223 @@
+# resume/corpus_generator.py
+
+import hashlib
+import os
+import random
+
+from django.conf import settings
+from django.db import transaction
+
+from .parsing import PARSE_VERSION
+from .skill_index import index_new_resumes
+from .skill_matcher import get_skill_matcher, load_taxonomy
+
+FIRST_NAMES = (
+    "Aarav", "Priya", "Rahul", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rohan", "Meera",
+    "James", "Olivia", "Liam", "Emma", "Noah", "Sophia", "Lucas", "Mia", "Ethan", "Amelia",
+)
+LAST_NAMES = (
+    "Sharma", "Patel", "Iyer", "Reddy", "Gupta", "Nair", "Mehta", "Kapoor", "Rao", "Singh",
+    "Smith", "Johnson", "Brown", "Garcia", "Miller", "Davis", "Wilson", "Moore", "Clark", "Lewis",
+)
+TITLES = (
+    "Software Engineer", "Backend Developer", "Data Scientist", "Frontend Developer",
+    "DevOps Engineer", "Machine Learning Engineer", "Full Stack Developer", "QA Engineer",
+)
+COMPANIES = ("Acme Corp", "Globex", "Initech", "Umbrella Labs", "Stark Industries", "Wayne Systems")
+FILLER = (
+    "designed", "built", "maintained", "scalable", "services", "pipelines", "customers", "latency",
+    "reduced", "improved", "migrated", "platform", "features", "team", "delivered", "reporting",
+    "automated", "deployments", "reviewed", "mentored", "production", "incidents", "quarterly",
+)
+
+# Characters per line and lines per page of generated PDFs
+PDF_LINE_WIDTH = 90
+PDF_PAGE_LINES = 60
+
+
+def skill_vocabulary():
+    """Canonical names of the configured taxonomy, so generated skills are all detectable."""
+    return sorted(set(load_taxonomy(settings.SKILL_TAXONOMY_PATH).values()))
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(FILLER) for _ in range(words)).capitalize() + "."
+
+
+def resume_lines(rng, number, vocabulary, skills_per_resume=12, paragraphs=6):
+    """
+    The lines of one synthetic resume and the skills it lists.
+
+    `number` makes the contact fields unique, so every generated document
+    has distinct content (and content hash).
+    """
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    skills = rng.sample(vocabulary, min(skills_per_resume, len(vocabulary)))
+    lines = [
+        f"{first} {last}",
+        f"{rng.choice(TITLES)}",
+        f"Email: {first.lower()}.{last.lower()}{number}@example.com",
+        f"Phone: +91 {rng.randint(70000, 99999)} {number % 100000:05d}",
+        "",
+        "Summary",
+        _sentence(rng, 20),
+        "",
+        "Skills",
+        ", ".join(skills),
+        "",
+        "Experience",
+    ]
+    for _ in range(paragraphs):
+        lines.append(f"{rng.choice(TITLES)} at {rng.choice(COMPANIES)}, {rng.randint(2010, 2024)}")
+        # Mention a few of the listed skills in context, as real resumes do
+        mentioned = ", ".join(rng.sample(skills, min(3, len(skills))))
+        lines.append(f"{_sentence(rng)} Used {mentioned}. {_sentence(rng)}")
+    lines += ["", "Education", f"B.Tech in Computer Science, {rng.randint(2005, 2020)}"]
+    return lines, skills
+
+
+def job_description(rng, vocabulary, must_have=4, nice_to_have=4):
+    """A synthetic JD with "Requirements" and "Nice to have" sections."""
+    skills = rng.sample(vocabulary, min(must_have + nice_to_have, len(vocabulary)))
+    return "\n".join([
+        f"We are hiring a {rng.choice(TITLES)} to join {rng.choice(COMPANIES)}.",
+        _sentence(rng, 25),
+        "Requirements:",
+        *(f"- {skill}" for skill in skills[:must_have]),
+        "Nice to have:",
+        *(f"- {skill}" for skill in skills[must_have:]),
+    ])
+
+
+def _wrap(lines, width):
+    for line in lines:
+        while len(line) > width:
+            cut = line.rfind(" ", 0, width)
+            cut = cut if cut > 0 else width
+            yield line[:cut]
+            line = line[cut:].lstrip()
+        yield line
+
+
+def _pdf_string(line):
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path, lines):
+    """
+    Write `lines` as a minimal text PDF (Helvetica, one text object per page).
+
+    Written by hand rather than through a PDF library so the generator only
+    needs the packages the backend already depends on.
+    """
+    wrapped = list(_wrap(lines, PDF_LINE_WIDTH))
+    pages = [wrapped[i:i + PDF_PAGE_LINES] for i in range(0, len(wrapped), PDF_PAGE_LINES)] or [[]]
+
+    # Object 1: catalog, 2: page tree, 3: font, then a page and its contents per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        text = "BT /F1 10 Tf 12 TL 50 800 Td " + " ".join(f"({_pdf_string(line)}) ' " for line in page) + "ET"
+        stream = text.encode('latin-1', 'replace')
+        page_number = len(objects) + 1
+        kids.append(f"{page_number} 0 R")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {page_number + 1} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_docx(path, lines):
+    from docx import Document
+
+    document = Document()
+    for line in lines:
+        document.add_paragraph(line)
+    document.save(path)
+
+
+WRITERS = {
+    '.pdf': write_pdf,
+    '.docx': write_docx,
+}
+
+
+def generate_files(out_dir, count, formats=('.pdf', '.docx'), jd_count=0, seed=0, start=0):
+    """
+    Write `count` resumes (alternating over `formats`) and `jd_count` JDs
+    under `out_dir`. Returns the resume paths.
+    """
+    rng = random.Random(seed)
+    vocabulary = skill_vocabulary()
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for number in range(start, start + count):
+        extension = formats[number % len(formats)]
+        lines, _ = resume_lines(rng, number, vocabulary)
+        # Fan out over subdirectories so a million files do not share one directory
+        directory = os.path.join(out_dir, f"{number // 1000:04d}")
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"resume-{number:07d}{extension}")
+        WRITERS[extension](path, lines)
+        paths.append(path)
+
+    if jd_count:
+        jd_dir = os.path.join(out_dir, "job_descriptions")
+        os.makedirs(jd_dir, exist_ok=True)
+        for number in range(jd_count):
+            with open(os.path.join(jd_dir, f"jd-{number:05d}.txt"), "w", encoding='utf-8') as f:
+                f.write(job_description(rng, vocabulary))
+    return paths
+
+
+def seed_database(count, seed=0, batch_size=2000, progress=None):
+    """
+    Insert `count` synthetic resumes straight into the database.
+
+    Skips document generation and parsing, which makes corpora of up to a
+    million rows practical for benchmarking the ranking paths. The search
+    indexes are not touched; rebuild them afterwards.
+    """
+    from .models import Resume
+    from .result_cache import bump_corpus_version
+
+    rng = random.Random(seed)
+    vocabulary = skill_vocabulary()
+    start = Resume.objects.count()
+    created = 0
+    while created < count:
+        batch = []
+        for number in range(start + created, start + min(created + batch_size, count)):
+            lines, skills = resume_lines(rng, number, vocabulary)
+            text = "\n".join(lines)
+            batch.append(Resume(
+                name=lines[0],
+                email=lines[2].split(": ", 1)[1],
+                phone=lines[3].split(": ", 1)[1],
+                skills=", ".join(skills),
+                resume_text=text,
+                content_hash=hashlib.sha256(text.encode()).hexdigest(),
+                parse_version=PARSE_VERSION,
+                taxonomy_version=get_skill_matcher().version,
+            ))
+        with transaction.atomic():
+            index_new_resumes(Resume.objects.bulk_create(batch))
+        created += len(batch)
+        if progress:
+            progress(created)
+    bump_corpus_version()
+    return created
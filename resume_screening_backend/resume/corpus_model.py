@@ -0,0 +1,516 @@
+# resume/corpus_model.py
+
+import fcntl
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from .models import Resume
+from .result_cache import bump_corpus_version
+
+CURRENT_FILE = "CURRENT"
+APPENDS_DIR = "appends"
+TOMBSTONES_FILE = "deleted.i64"
+MERGE_LOCK_FILE = "merge.lock"
+BASE_SEGMENT = "base"
+
+
+# Segments -------------------------------------------------------------------
+#
+# The rows fitted by a refit form the base segment; every append after it
+# writes a small delta segment under APPENDS_DIR. Both keep their rows
+# sorted by resume id, so membership is a binary search.
+
+class RowSegment:
+    """
+    Rows of the TF-IDF matrix written together: the fitted base or one delta.
+
+    A delta also carries the number of documents, tokens and out-of-vocabulary
+    tokens appended with it, from which the drift is summed, and the names
+    of the deltas it replaces when it is the result of a merge.
+    """
+
+    def __init__(self, name, matrix, ids, counts=None, replaces=()):
+        self.name = name
+        self.matrix = matrix
+        self.ids = ids
+        self.counts = counts if counts is not None else np.zeros(3, dtype=np.int64)
+        self.replaces = tuple(replaces)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def _sorted_rows(ids, rows):
+    """`(ids, rows)` ordered by resume id, keeping the last row of a repeated id."""
+    ids = np.asarray(ids, dtype=np.int64)
+    reversed_ids = ids[::-1]
+    _, last = np.unique(reversed_ids, return_index=True)
+    keep = len(ids) - 1 - last  # np.unique sorts, so these are in id order
+    return ids[keep], rows[keep]
+
+
+def _new_delta_name():
+    # Names sort by creation time, which decides which copy of a resume is current
+    return f"{time.time_ns():020d}-{os.getpid()}-{threading.get_ident()}"
+
+
+def _write_delta(path, segment):
+    """Write a delta segment; readers discover it by its .npz file, so it appears whole."""
+    appends = os.path.join(path, APPENDS_DIR)
+    tmp = os.path.join(appends, f".tmp-{segment.name}")
+    matrix = segment.matrix.tocsr()
+    with open(tmp, "wb") as f:
+        np.savez(
+            f, data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+            shape=np.asarray(matrix.shape), ids=segment.ids, counts=segment.counts,
+            replaces=np.asarray(segment.replaces, dtype=str),
+        )
+    os.replace(tmp, os.path.join(appends, segment.name + ".npz"))
+
+
+def _read_delta(path, name):
+    with np.load(os.path.join(path, APPENDS_DIR, name + ".npz")) as data:
+        matrix = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+        return RowSegment(name, matrix, data['ids'], data['counts'], data['replaces'].tolist())
+
+
+def _masked(ids, live, dead_ids):
+    """
+    `live` with the rows whose resume id is in `dead_ids` cleared. None
+    stands for "every row is live", and is only copied into a mask when a
+    row actually dies, so the base costs nothing until then.
+    """
+    if not len(dead_ids) or not len(ids):
+        return live
+    pos = np.minimum(np.searchsorted(ids, dead_ids), len(ids) - 1)
+    hits = pos[ids[pos] == dead_ids]
+    if not len(hits):
+        return live
+    live = np.ones(len(ids), dtype=bool) if live is None else live.copy()
+    live[hits] = False
+    return live
+
+
+def _live_masks(segments, tombstones, known=None, new_tombstones=None):
+    """
+    Live mask (or None) of each segment, oldest first: a row is dead once a
+    newer segment holds its resume or the resume is in the tombstones.
+
+    `known` maps the names of segments already open to their masks; those
+    are only updated with the newer segments not in it and `new_tombstones`.
+    """
+    known = known or {}
+    lives = []
+    for number, segment in enumerate(segments):
+        newer = segments[number + 1:]
+        if segment.name in known:
+            dead = [s.ids for s in newer if s.name not in known] + [new_tombstones]
+            live = known[segment.name]
+        else:
+            dead = [s.ids for s in newer] + [tombstones]
+            live = None
+        dead = [ids for ids in dead if ids is not None and len(ids)]
+        if dead:
+            live = _masked(segment.ids, live, np.unique(np.concatenate(dead)))
+        lives.append(live)
+    return lives
+
+
+def _read_tombstones(path):
+    tombstones = os.path.join(path, TOMBSTONES_FILE)
+    if not os.path.exists(tombstones):
+        return np.zeros(0, dtype=np.int64)
+    return np.fromfile(tombstones, dtype=np.int64)
+
+
+# Model ----------------------------------------------------------------------
+
+class CorpusModel:
+    """
+    TF-IDF model of the resume corpus, fitted once and persisted to disk.
+
+    The fitted state is the vocabulary, the IDF weights and L2-normalized
+    CSR rows, one per resume, split over the fitted base segment and the
+    deltas appended since. Queries only need to transform the job
+    description and multiply it against each segment. Rows of deleted or
+    re-appended resumes are masked out, so they never take a place in a
+    ranking.
+    """
+
+    def __init__(self, vocabulary, idf, segments, lives=None, meta=None, path=None, tombstone_count=0):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.segments = segments
+        self.lives = lives if lives is not None else [None] * len(segments)
+        self.meta = meta or {}
+        self.path = path
+        self.tombstone_count = tombstone_count
+        self._counter = CountVectorizer(vocabulary=vocabulary)
+        self._analyzer = self._counter.build_analyzer()
+
+    @classmethod
+    def fit(cls, resume_ids, texts):
+        vectorizer = TfidfVectorizer()
+        matrix = vectorizer.fit_transform(texts).tocsr()
+        vocabulary = {term: int(col) for term, col in vectorizer.vocabulary_.items()}
+        meta = {'fitted_at': time.time(), 'fitted_docs': len(resume_ids)}
+        ids, matrix = _sorted_rows(resume_ids, matrix)
+        return cls(vocabulary, vectorizer.idf_.astype(np.float64), [RowSegment(BASE_SEGMENT, matrix, ids)], meta=meta)
+
+    def _live_rows(self):
+        """`(segment, live)` pairs of the segments with at least one live row."""
+        return [
+            (segment, live) for segment, live in zip(self.segments, self.lives)
+            if len(segment) and (live is None or live.any())
+        ]
+
+    @property
+    def resume_ids(self):
+        """Ids of every live row."""
+        return np.concatenate(
+            [segment.ids if live is None else segment.ids[live] for segment, live in self._live_rows()]
+            + [np.zeros(0, dtype=np.int64)]
+        )
+
+    def transform(self, texts):
+        """Vectorize texts with the fitted vocabulary and IDF weights."""
+        counts = self._counter.transform(texts).astype(np.float64)
+        return normalize(counts.multiply(self.idf).tocsr())
+
+    def similarities(self, text):
+        """Return `(resume_ids, scores)`: cosine similarity of `text` against every live row."""
+        query = self.transform([text])
+        ids, scores = [], []
+        for segment, live in self._live_rows():
+            segment_scores = (segment.matrix @ query.T).toarray().ravel()
+            if live is None:
+                ids.append(segment.ids)
+                scores.append(segment_scores)
+            else:
+                ids.append(segment.ids[live])
+                scores.append(segment_scores[live])
+        if len(ids) == 1:
+            return ids[0], scores[0]
+        return np.concatenate(ids + [np.zeros(0, dtype=np.int64)]), np.concatenate(scores + [np.zeros(0)])
+
+    def similarities_for(self, text, candidate_ids):
+        """Cosine similarity of `text` against the given resumes only (0 for unknown ids)."""
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        scores = np.zeros(len(candidate_ids))
+        query = None
+        for segment, live in self._live_rows():
+            pos = np.minimum(np.searchsorted(segment.ids, candidate_ids), len(segment) - 1)
+            found = segment.ids[pos] == candidate_ids
+            if live is not None:
+                found &= live[pos]
+            if not found.any():
+                continue
+            if query is None:
+                query = self.transform([text])
+            scores[found] = (segment.matrix[pos[found]] @ query.T).toarray().ravel()
+        return scores
+
+    def iter_batch_similarities(self, texts, chunk_rows):
+        """
+        Yield `(resume_ids, scores)` per chunk of at most `chunk_rows` rows,
+        `scores` being a dense `len(texts)` x rows array.
+
+        All texts are vectorized at once and scored with a single sparse
+        product per chunk, so N queries cost about one pass over the matrix.
+        """
+        queries = self.transform(texts)
+        for segment, live in self._live_rows():
+            for start in range(0, len(segment), chunk_rows):
+                ids = segment.ids[start:start + chunk_rows]
+                scores = (queries @ segment.matrix[start:start + chunk_rows].T).toarray()
+                if live is not None:
+                    keep = live[start:start + chunk_rows]
+                    ids, scores = ids[keep], scores[:, keep]
+                yield ids, scores
+
+    @property
+    def appended(self):
+        """`(documents, tokens, out-of-vocabulary tokens)` appended since the fit."""
+        docs, tokens, oov = np.sum([segment.counts for segment in self.segments], axis=0).tolist()
+        return docs, tokens, oov
+
+    @property
+    def drift(self):
+        """Share of tokens in appended resumes that the fitted vocabulary does not know."""
+        _, tokens, oov = self.appended
+        return oov / tokens if tokens else 0.0
+
+    def make_delta(self, resume_ids, texts):
+        """Vectorize new (or re-uploaded) resumes into a delta segment, without refitting."""
+        tokens = oov = 0
+        for text in texts:
+            for term in self._analyzer(text):
+                tokens += 1
+                if term not in self.vocabulary:
+                    oov += 1
+        ids, rows = _sorted_rows(resume_ids, self.transform(texts))
+        counts = np.asarray([len(resume_ids), tokens, oov], dtype=np.int64)
+        return RowSegment(_new_delta_name(), rows, ids, counts)
+
+    # Persistence -----------------------------------------------------------
+
+    def save(self, root):
+        """Write the fitted model to a fresh version directory and make it current."""
+        version = time.strftime("v%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+        path = os.path.join(root, version)
+        os.makedirs(os.path.join(path, APPENDS_DIR))
+
+        base = self.segments[0]
+        with open(os.path.join(path, "vocabulary.json"), "w") as f:
+            json.dump(self.vocabulary, f)
+        np.save(os.path.join(path, "idf.npy"), self.idf)
+        np.save(os.path.join(path, "ids.npy"), base.ids)
+        sparse.save_npz(os.path.join(path, "matrix.npz"), base.matrix)
+        _write_json(os.path.join(path, "meta.json"), self.meta)
+
+        # Switch readers over atomically once every file is in place
+        write_text_atomic(os.path.join(root, CURRENT_FILE), version)
+        prune_versions(root, keep=2)
+        self.path = path
+        return path
+
+    @classmethod
+    def open(cls, path, previous=None):
+        """
+        Open the model of version `path`, reusing what `previous` already read.
+
+        Only deltas written (and tombstones recorded) since `previous` are
+        read, and only the masks of rows they supersede are updated, so an
+        append by another process costs about the size of the delta.
+        """
+        tombstones = _read_tombstones(path)
+        names = _list_appends(path)
+        if previous is not None and previous.path == path:
+            base = previous.segments[0]
+            vocabulary, idf, meta = previous.vocabulary, previous.idf, previous.meta
+            opened = {segment.name: segment for segment in previous.segments}
+            known = {segment.name: live for segment, live in zip(previous.segments, previous.lives)}
+            new_tombstones = tombstones[previous.tombstone_count:]
+        else:
+            with open(os.path.join(path, "vocabulary.json")) as f:
+                vocabulary = json.load(f)
+            with open(os.path.join(path, "meta.json")) as f:
+                meta = json.load(f)
+            idf = np.load(os.path.join(path, "idf.npy"))
+            base = RowSegment(
+                BASE_SEGMENT, sparse.load_npz(os.path.join(path, "matrix.npz")).tocsr(),
+                np.load(os.path.join(path, "ids.npy")),
+            )
+            opened, known, new_tombstones = {}, {}, None
+
+        deltas = [opened[name] if name in opened else _read_delta(path, name) for name in names]
+        # A merge writes its result before deleting its inputs; count each row and token once
+        replaced = {name for delta in deltas for name in delta.replaces}
+        segments = [base] + [delta for delta in deltas if delta.name not in replaced]
+        lives = _live_masks(segments, tombstones, known, new_tombstones)
+        return cls(vocabulary, idf, segments, lives, meta, path, len(tombstones))
+
+
+def write_text_atomic(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _write_json(path, data):
+    write_text_atomic(path, json.dumps(data))
+
+
+def prune_versions(root, keep):
+    """Delete all but the newest `keep` version directories."""
+    versions = sorted(
+        name for name in os.listdir(root)
+        if name.startswith("v") and os.path.isdir(os.path.join(root, name))
+    )
+    for name in versions[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _list_appends(path):
+    appends = os.path.join(path, APPENDS_DIR)
+    if not os.path.isdir(appends):
+        return []
+    return sorted(name[:-len(".npz")] for name in os.listdir(appends) if name.endswith(".npz"))
+
+
+def current_model_path(root=None):
+    """Return the directory of the current model version, or None if none was fitted."""
+    root = root or settings.TFIDF_MODEL_DIR
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+# Merging --------------------------------------------------------------------
+
+def merge_deltas(path, factor=None):
+    """
+    Merge the run of `factor` consecutive deltas holding the fewest live
+    rows into one. Returns False when there was nothing to merge or another
+    process is already merging.
+
+    The merged delta sorts right after the newest delta it replaces, so it
+    stays older than anything appended during the merge, and sums their
+    drift counts. The base is only rewritten by a refit.
+    """
+    factor = factor or settings.TFIDF_MERGE_FACTOR
+    with open(os.path.join(path, MERGE_LOCK_FILE), "a") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            deltas = [_read_delta(path, name) for name in _list_appends(path)]
+            if len(deltas) <= settings.TFIDF_MAX_DELTAS:
+                return False
+            lives = _live_masks(deltas, _read_tombstones(path))
+            sizes = np.array([len(delta) if live is None else live.sum() for delta, live in zip(deltas, lives)])
+            window = min(factor, len(sizes))
+            start = int(np.argmin(np.convolve(sizes, np.ones(window, dtype=sizes.dtype), mode='valid')))
+            inputs = list(range(start, start + window))
+
+            rows = [
+                (deltas[i].ids, deltas[i].matrix) if lives[i] is None
+                else (deltas[i].ids[lives[i]], deltas[i].matrix[np.flatnonzero(lives[i])])
+                for i in inputs
+            ]
+            # Live rows of the inputs never share a resume, so sorting them is enough
+            ids = np.concatenate([ids for ids, _ in rows])
+            order = np.argsort(ids, kind='stable')
+            merged = RowSegment(
+                deltas[inputs[-1]].name + "-m",
+                sparse.vstack([matrix for _, matrix in rows], format='csr')[order],
+                ids[order],
+                np.sum([deltas[i].counts for i in inputs], axis=0),
+                [deltas[i].name for i in inputs],
+            )
+            _write_delta(path, merged)
+            for i in inputs:
+                os.remove(os.path.join(path, APPENDS_DIR, deltas[i].name + ".npz"))
+            return True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def merge_in_background(path):
+    """Start a daemon thread merging deltas until few enough are left."""
+    def target():
+        try:
+            while merge_deltas(path):
+                pass
+        except Exception:
+            pass  # Merging is retried after the next append
+
+    thread = threading.Thread(target=target, name="tfidf-merge", daemon=True)
+    thread.start()
+    return thread
+
+
+# Process-wide cache ---------------------------------------------------------
+
+_lock = threading.Lock()
+_cached = {'key': None, 'model': None}
+
+
+def _cache_key(path):
+    tombstones = os.path.join(path, TOMBSTONES_FILE)
+    return (path, tuple(_list_appends(path)), os.path.getsize(tombstones) if os.path.exists(tombstones) else 0)
+
+
+def get_corpus_model():
+    """
+    Return the current corpus model, loading it from disk on first use.
+
+    After a refit the new version is loaded whole; deltas and tombstones
+    written by other processes are read on top of the model already open.
+    A merge that removes a delta mid-open is retried.
+    """
+    path = current_model_path()
+    if path is None:
+        return None
+    with _lock:
+        for _ in range(3):
+            key = _cache_key(path)
+            if _cached['key'] == key:
+                break
+            try:
+                _cached['model'] = CorpusModel.open(path, _cached['model'])
+            except FileNotFoundError:
+                continue
+            _cached['key'] = key
+            break
+        return _cached['model']
+
+
+def fit_corpus_model():
+    """Fit the model on every stored resume text and persist it."""
+    # Legacy rows hold no real text until `reextract_resumes` has run
+    rows = (
+        Resume.objects.exclude(resume_text__isnull=True)
+        .exclude(parse_version=Resume.LEGACY_PARSE_VERSION)
+        .order_by('id').values_list('id', 'resume_text')
+    )
+    ids, texts = [], []
+    for resume_id, text in rows.iterator(chunk_size=2000):
+        if text:
+            ids.append(resume_id)
+            texts.append(text)
+    if not ids:
+        return None
+
+    model = CorpusModel.fit(ids, texts)
+    path = model.save(settings.TFIDF_MODEL_DIR)
+    with _lock:
+        _cached['model'] = model
+        _cached['key'] = _cache_key(path)
+    # New IDF weights change every TF-IDF score
+    bump_corpus_version()
+    return model
+
+
+def append_to_corpus_model(resumes):
+    """
+    Write rows for newly stored resumes as a delta segment; a no-op until a
+    model was fitted. Its drift counts travel with the delta, so concurrent
+    appenders never overwrite each other's.
+    """
+    resumes = [
+        resume for resume in resumes
+        if resume.resume_text and resume.parse_version != Resume.LEGACY_PARSE_VERSION
+    ]
+    model = get_corpus_model()
+    if model is None or not resumes:
+        return
+    delta = model.make_delta(
+        [resume.id for resume in resumes],
+        [resume.resume_text for resume in resumes],
+    )
+    _write_delta(model.path, delta)
+    if len(_list_appends(model.path)) > settings.TFIDF_MAX_DELTAS:
+        merge_in_background(model.path)
+
+
+def remove_from_corpus_model(resume_ids):
+    """Record deleted resumes in the tombstones file."""
+    path = current_model_path()
+    if path is None or not resume_ids:
+        return
+    with open(os.path.join(path, TOMBSTONES_FILE), "ab") as f:
+        f.write(np.asarray(resume_ids, dtype=np.int64).tobytes())
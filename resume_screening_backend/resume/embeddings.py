@@ -0,0 +1,326 @@
+# resume/embeddings.py
+
+import fcntl
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from .corpus_model import CURRENT_FILE, current_model_path, prune_versions, write_text_atomic
+from .model_registry import registry
+from .models import Resume
+from .result_cache import bump_corpus_version
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+IVF_FILE = "ivf.npz"
+LOCK_FILE = "append.lock"
+TOMBSTONES_FILE = "deleted.i64"
+
+# Rows scored per matrix product when assigning vectors to IVF lists
+ASSIGN_CHUNK_ROWS = 50000
+
+
+# Embedders ------------------------------------------------------------------
+
+class HashingEmbedder:
+    """
+    Character 3-5-grams of every word, hashed with random signs into a
+    fixed-size vector.
+
+    Needs no model files, so it runs anywhere; "React.js" and "React" share
+    most of their n-grams, which plain word TF-IDF does not see.
+    """
+
+    def __init__(self, dim):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self._vectorizer = HashingVectorizer(
+            n_features=dim, analyzer='char_wb', ngram_range=(3, 5),
+            alternate_sign=True, norm='l2', dtype=np.float32,
+        )
+
+    def embed(self, texts):
+        return self._vectorizer.transform(texts).toarray()
+
+
+class SentenceTransformerEmbedder:
+    """A local sentence-transformers model, run on the CPU."""
+
+    def __init__(self, model_path):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_path, device='cpu')
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers:{os.path.basename(os.path.normpath(model_path))}"
+
+    def embed(self, texts):
+        vectors = self._model.encode(list(texts), batch_size=32, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def load_embedder():
+    """Build the configured embedder; called once per process through the model registry."""
+    if settings.EMBEDDING_BACKEND == 'hashing':
+        return HashingEmbedder(settings.EMBEDDING_DIM)
+    if settings.EMBEDDING_BACKEND == 'sentence-transformers':
+        return SentenceTransformerEmbedder(settings.EMBEDDING_MODEL)
+    raise ValueError(f"Unknown embedding backend: {settings.EMBEDDING_BACKEND}")
+
+
+# IVF quantizer --------------------------------------------------------------
+
+def train_ivf(vectors, rows, n_lists, iterations=10, seed=0):
+    """
+    Cluster `vectors[rows]` with spherical k-means into `n_lists` inverted lists.
+
+    Centroids are trained on a sample; every row is then assigned to its
+    nearest centroid. Returns `(centroids, offsets, list_rows)`: list `i`
+    holds the rows `list_rows[offsets[i]:offsets[i + 1]]`.
+    """
+    rng = np.random.default_rng(seed)
+    sample_rows = np.sort(rng.choice(rows, min(len(rows), n_lists * 64), replace=False))
+    sample = np.asarray(vectors[sample_rows])
+    centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        norms = np.linalg.norm(sums, axis=1)
+        filled = norms > 0  # An empty list keeps its previous centroid
+        centroids[filled] = sums[filled] / norms[filled, None]
+
+    assignment = np.empty(len(rows), dtype=np.int32)
+    for start in range(0, len(rows), ASSIGN_CHUNK_ROWS):
+        chunk = rows[start:start + ASSIGN_CHUNK_ROWS]
+        assignment[start:start + len(chunk)] = np.argmax(vectors[chunk] @ centroids.T, axis=1)
+
+    order = np.argsort(assignment, kind='stable')
+    offsets = np.searchsorted(assignment[order], np.arange(n_lists + 1))
+    return centroids, offsets.astype(np.int64), rows[order].astype(np.int64)
+
+
+# Index ----------------------------------------------------------------------
+
+def _latest_rows(ids):
+    """Mask of the rows that are the last record of their resume; re-extraction appends a new one."""
+    live = np.zeros(len(ids), dtype=bool)
+    _, last_from_end = np.unique(ids[::-1], return_index=True)
+    live[len(ids) - 1 - last_from_end] = True
+    return live
+
+
+class EmbeddingIndex:
+    """
+    Dense resume vectors in an append-only, memory-mapped float32 matrix.
+
+    Small corpora are scanned exactly. Once an IVF quantizer is built,
+    queries score only the rows in the `probes` lists closest to the query,
+    plus any rows appended since the build, which are always scanned.
+    Resumes listed in the tombstones file are masked out of both paths.
+    """
+
+    def __init__(self, path, vectors, ids, ivf=None, deleted=()):
+        self.path = path
+        self.vectors = vectors
+        self.ids = ids
+        self.live = _latest_rows(ids) & ~np.isin(ids, np.asarray(deleted, dtype=np.int64))
+        self.ivf = ivf
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        dim = meta['dim']
+        # Another process may be mid-append: only read rows that are complete in both files
+        rows = min(
+            os.path.getsize(os.path.join(path, VECTORS_FILE)) // (4 * dim),
+            os.path.getsize(os.path.join(path, IDS_FILE)) // 8,
+        )
+        if not rows:
+            return cls(path, np.zeros((0, dim), dtype=np.float32), np.zeros(0, dtype=np.int64))
+        vectors = np.memmap(os.path.join(path, VECTORS_FILE), dtype=np.float32, mode='r', shape=(rows, dim))
+        ids = np.array(np.memmap(os.path.join(path, IDS_FILE), dtype=np.int64, mode='r', shape=(rows,)))
+        deleted = ()
+        tombstones = os.path.join(path, TOMBSTONES_FILE)
+        if os.path.exists(tombstones):
+            deleted = np.fromfile(tombstones, dtype=np.int64)
+
+        ivf = None
+        ivf_path = os.path.join(path, IVF_FILE)
+        if os.path.exists(ivf_path):
+            with np.load(ivf_path) as data:
+                ivf = {name: data[name] for name in data.files}
+        return cls(path, vectors, ids, ivf, deleted)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _candidate_rows(self, query, probes):
+        if self.ivf is None or len(self.ivf['centroids']) <= probes:
+            return None  # Exact scan
+        centroids, offsets, list_rows = self.ivf['centroids'], self.ivf['offsets'], self.ivf['rows']
+        nearest = np.argpartition(-(centroids @ query), probes - 1)[:probes]
+        rows = [list_rows[offsets[i]:offsets[i + 1]] for i in nearest]
+        rows.append(np.arange(int(self.ivf['covered']), len(self.ids)))
+        rows = np.concatenate(rows)
+        # Sorted row numbers read the memory map front to back
+        rows = np.sort(rows[self.live[rows]])
+        return rows
+
+    def similarities(self, query, probes=None):
+        """Return `(resume_ids, scores)` for the candidate rows nearest to `query`."""
+        probes = probes or settings.EMBEDDING_IVF_PROBES
+        rows = self._candidate_rows(query, probes)
+        if rows is None:
+            scores = np.asarray(self.vectors @ query)
+            scores[~self.live] = -np.inf
+            return self.ids, scores
+        return self.ids[rows], np.asarray(self.vectors[rows] @ query)
+
+
+# Persistence ----------------------------------------------------------------
+
+def _append_rows(path, ids, vectors):
+    # Both files are appended under one lock so their rows stay aligned
+    with open(os.path.join(path, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(os.path.join(path, VECTORS_FILE), "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(os.path.join(path, IDS_FILE), "ab") as f:
+                f.write(np.asarray(ids, dtype=np.int64).tobytes())
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _resume_texts(resumes):
+    """(id, text) of the resumes with usable text."""
+    return [
+        (resume.id, resume.resume_text) for resume in resumes
+        if resume.resume_text and resume.parse_version != Resume.LEGACY_PARSE_VERSION
+    ]
+
+
+def build_embedding_index(n_lists=None):
+    """
+    Embed every stored resume into a new index version and make it current.
+
+    An IVF quantizer is trained once the corpus has EMBEDDING_ANN_MIN_ROWS
+    vectors; smaller indexes are scanned exactly.
+    """
+    embedder = registry.get('embedder')
+    root = settings.EMBEDDING_DIR
+    version = time.strftime("v%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({'embedder': embedder.name, 'dim': embedder.dim, 'built_at': time.time()}, f)
+    open(os.path.join(path, VECTORS_FILE), "wb").close()
+    open(os.path.join(path, IDS_FILE), "wb").close()
+
+    rows = (
+        Resume.objects.exclude(resume_text__isnull=True)
+        .exclude(parse_version=Resume.LEGACY_PARSE_VERSION)
+        .order_by('id').values_list('id', 'resume_text')
+    )
+    batch = []
+    for resume_id, text in rows.iterator(chunk_size=500):
+        if text:
+            batch.append((resume_id, text))
+        if len(batch) >= 500:
+            _append_rows(path, [i for i, _ in batch], embedder.embed([t for _, t in batch]))
+            batch = []
+    if batch:
+        _append_rows(path, [i for i, _ in batch], embedder.embed([t for _, t in batch]))
+
+    index = EmbeddingIndex.load(path)
+    if len(index) >= settings.EMBEDDING_ANN_MIN_ROWS:
+        live_rows = np.flatnonzero(index.live)
+        n_lists = n_lists or settings.EMBEDDING_IVF_LISTS or int(np.sqrt(len(live_rows)))
+        n_lists = min(max(n_lists, 1), len(live_rows))
+        centroids, offsets, list_rows = train_ivf(index.vectors, live_rows, n_lists)
+        tmp = os.path.join(path, IVF_FILE + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=centroids, offsets=offsets, rows=list_rows, covered=len(index))
+        os.replace(tmp, os.path.join(path, IVF_FILE))
+        index = EmbeddingIndex.load(path)
+
+    # Resumes stored while the build ran are in the old version only; they
+    # are picked up by the next build.
+    write_text_atomic(os.path.join(root, CURRENT_FILE), version)
+    prune_versions(root, keep=2)
+    with _lock:
+        _cached['index'] = index
+        _cached['key'] = _cache_key(path)
+    bump_corpus_version()
+    return index
+
+
+# Process-wide cache ---------------------------------------------------------
+
+_lock = threading.Lock()
+_cached = {'key': None, 'index': None}
+
+
+def _cache_key(path):
+    tombstones = os.path.join(path, TOMBSTONES_FILE)
+    return (
+        path,
+        os.path.getsize(os.path.join(path, IDS_FILE)),
+        os.path.exists(os.path.join(path, IVF_FILE)),
+        os.path.getsize(tombstones) if os.path.exists(tombstones) else 0,
+    )
+
+
+def get_embedding_index():
+    """
+    Return the current embedding index, or None if none was built for the
+    configured embedder.
+
+    The memory map is reopened when another process appended rows or
+    deleted resumes, which is detected from the size of the ids and
+    tombstones files.
+    """
+    path = current_model_path(settings.EMBEDDING_DIR)
+    if path is None:
+        return None
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    if meta['embedder'] != registry.get('embedder').name:
+        return None  # Built by another embedder; its vectors are not comparable
+    key = _cache_key(path)
+    with _lock:
+        if _cached['key'] != key:
+            _cached['index'] = EmbeddingIndex.load(path)
+            _cached['key'] = key
+        return _cached['index']
+
+
+def embed_query(text):
+    return registry.get('embedder').embed([text])[0]
+
+
+def append_to_embedding_index(resumes):
+    """Embed newly stored resumes into the current index; a no-op until one was built."""
+    pairs = _resume_texts(resumes)
+    if not pairs or get_embedding_index() is None:
+        return
+    path = current_model_path(settings.EMBEDDING_DIR)
+    vectors = registry.get('embedder').embed([text for _, text in pairs])
+    _append_rows(path, [resume_id for resume_id, _ in pairs], vectors)
+
+
+def remove_from_embedding_index(resume_ids):
+    """Record deleted resumes in the tombstones file."""
+    path = current_model_path(settings.EMBEDDING_DIR)
+    if path is None or not resume_ids:
+        return
+    with open(os.path.join(path, TOMBSTONES_FILE), "ab") as f:
+        f.write(np.asarray(resume_ids, dtype=np.int64).tobytes())
@@ -0,0 +1,107 @@
+# resume/executors.py
+
+import asyncio
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+from django.conf import settings
+
+from .extractors import parser_process_context, start_parser_process
+from .instrumentation import collect_spans, current_profiler, record
+
+
+class ExecutorBusy(Exception):
+    """Raised instead of queueing work on a saturated executor."""
+
+    def __init__(self, retry_after):
+        super().__init__("Server is busy, please retry later")
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    A thread or process pool that takes at most `max_pending` queued or
+    running tasks.
+
+    Async views await CPU-bound work here instead of running it on the event
+    loop. When the pool is saturated `run` fails fast with `ExecutorBusy`,
+    so the client is told to come back (429) rather than every request
+    queueing up behind a few slow documents.
+    """
+
+    def __init__(self, factory, max_pending, retry_after):
+        self._factory = factory
+        self.max_pending = max_pending
+        self.retry_after = retry_after
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def is_full(self):
+        return self._pending >= self.max_pending
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ExecutorBusy(self.retry_after)
+            if self._pool is None:
+                self._pool = self._factory()
+            pool = self._pool
+            profiler = current_profiler()
+            if profiler is not None and isinstance(pool, ThreadPoolExecutor):
+                # cProfile follows the worker thread, not the event loop the request waits on
+                fn = partial(profiler.profile_call, fn)
+            future = pool.submit(partial(collect_spans, fn, *args))
+            self._pending += 1
+        # The slot is freed when the task ends, even if the request went away
+        future.add_done_callback(self._release)
+        try:
+            result, spans = await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            with self._lock:
+                if self._pool is pool:
+                    self._pool = None
+            raise
+        # Stages timed in the worker count towards the request that waited for them
+        for stage, seconds in spans:
+            record(stage, seconds)
+        return result
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name, factory):
+    with _executors_lock:
+        if name not in _executors:
+            _executors[name] = BoundedExecutor(
+                factory, settings.EXECUTOR_MAX_PENDING, settings.EXECUTOR_RETRY_AFTER
+            )
+        return _executors[name]
+
+
+def get_extraction_executor():
+    """Processes parsing uploaded documents (parsing holds the GIL)."""
+    return _get_executor('extraction', lambda: ProcessPoolExecutor(
+        max_workers=settings.EXTRACTION_WORKERS,
+        mp_context=parser_process_context(), initializer=start_parser_process,
+    ))
+
+
+def get_scoring_executor():
+    """Threads ranking JDs; they share this process's loaded models and indexes."""
+    return _get_executor('scoring', lambda: ThreadPoolExecutor(
+        max_workers=settings.SCORING_WORKERS, thread_name_prefix='scoring',
+    ))
@@ -0,0 +1,417 @@
+# resume/extractors.py
+
+import io
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+import django
+from django.conf import settings
+
+# Parser libraries are imported on first use to keep startup cheap
+
+
+class ExtractionError(ValueError):
+    """A document could not be turned into text (or exceeded a limit)."""
+
+
+class ExtractionTimeout(ExtractionError):
+    pass
+
+
+def parser_process_context():
+    """
+    The multiprocessing context for pools whose workers parse documents.
+
+    A process forked from a threaded server inherits locks held by its
+    other threads and can hang on them. Workers started by a fork server
+    have a clean single-threaded parent instead.
+    """
+    return multiprocessing.get_context('forkserver')
+
+
+def start_parser_process(niceness=0):
+    """
+    Initializer for `parser_process_context` workers, which start without
+    Django. A positive `niceness` lowers their CPU priority.
+    """
+    django.setup()
+    if niceness:
+        os.nice(niceness)
+
+
+# PDF backends ---------------------------------------------------------------
+
+def _pypdf2_pages(path, limit):
+    import PyPDF2
+
+    with open(path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        count = len(reader.pages) if limit is None else min(limit, len(reader.pages))
+        for number in range(count):
+            yield reader.pages[number].extract_text() or ""
+
+
+def _pdfminer_pages(path, limit):
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    resources = PDFResourceManager()
+    with open(path, 'rb') as f:
+        for page in PDFPage.get_pages(f, maxpages=limit or 0):
+            output = io.StringIO()
+            device = TextConverter(resources, output, laparams=LAParams())
+            PDFPageInterpreter(resources, device).process_page(page)
+            device.close()
+            yield output.getvalue()
+
+
+# Each backend yields the text of a PDF's first `limit` pages (None: all), opening the document once
+PDF_BACKENDS = {
+    'pypdf2': _pypdf2_pages,
+    'pdfminer': _pdfminer_pages,
+}
+
+
+def _get_backend(name):
+    try:
+        return PDF_BACKENDS[name]
+    except KeyError:
+        raise ExtractionError(f"Unknown PDF backend: {name}") from None
+
+
+def iter_pdf_pages(path, backend, limit=None):
+    """Yield the text of the first `limit` pages (default: all), one page at a time."""
+    yield from _get_backend(backend)(path, limit)
+
+
+class _Deadline(BaseException):
+    """Raised by the SIGALRM handler; not an Exception, so parsers' `except Exception` let it through."""
+
+
+def _timed_out(signum, frame):
+    raise _Deadline
+
+
+@contextmanager
+def _time_limit(seconds):
+    """
+    Interrupt the enclosed block with ExtractionTimeout after `seconds`.
+
+    The parsers are pure Python, so a SIGALRM handler stops them wherever
+    they are; the alarm repeats until the block exits, in case a bare
+    `except:` swallows the first one. Signals only reach the main thread:
+    on any other thread the block runs unbounded.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    previous = signal.signal(signal.SIGALRM, _timed_out)
+    signal.setitimer(signal.ITIMER_REAL, seconds, 0.1)
+    try:
+        yield
+    except _Deadline:
+        raise ExtractionTimeout("PDF extraction timed out") from None
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+def extract_pdf_text(path, backend=None):
+    """
+    Extract the text of a PDF within the configured limits.
+
+    Files over PDF_MAX_BYTES are rejected and only the first PDF_MAX_PAGES
+    pages are read. Parsing is abandoned once PDF_TIMEOUT seconds have
+    passed, so a pathological file cannot pin a worker: the parser runs in
+    the calling process, which should be a `parser_process_context`
+    worker's main thread (the timeout needs SIGALRM); elsewhere the limit
+    is only checked between pages.
+    """
+    backend = backend or settings.PDF_BACKEND
+    _get_backend(backend)
+    if os.path.getsize(path) > settings.PDF_MAX_BYTES:
+        raise ExtractionError(f"PDF is larger than {settings.PDF_MAX_BYTES} bytes")
+
+    deadline = time.monotonic() + settings.PDF_TIMEOUT
+    pages = []
+    with _time_limit(settings.PDF_TIMEOUT):
+        for page in iter_pdf_pages(path, backend, settings.PDF_MAX_PAGES):
+            if time.monotonic() > deadline:
+                raise ExtractionTimeout("PDF extraction timed out")
+            pages.append(page)
+
+    return "\n".join(page for page in pages if page)
+
+
+# DOCX -----------------------------------------------------------------------
+
+WORD_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+
+
+def _w(tag):
+    return f"{{{WORD_NS}}}{tag}"
+
+
+W_P, W_T, W_TAB, W_BR, W_CR = _w('p'), _w('t'), _w('tab'), _w('br'), _w('cr')
+W_TR, W_TC = _w('tr'), _w('tc')
+W_BODY, W_HDR, W_FTR = _w('body'), _w('hdr'), _w('ftr')
+# Text boxes are stored twice: as DrawingML and, under mc:Fallback, as VML
+MC_FALLBACK = f"{{{MC_NS}}}Fallback"
+
+
+def _paragraph_text(paragraph):
+    parts = []
+    for node in paragraph.iter(W_T, W_TAB, W_BR, W_CR):
+        if node.tag == W_T:
+            parts.append(node.text or "")
+        elif node.tag == W_TAB:
+            parts.append("\t")
+        else:
+            parts.append("\n")
+    return "".join(parts).strip()
+
+
+def _release(element):
+    # Drop the parsed element and the siblings already handled, so the tree
+    # iterparse builds never holds more than the current paragraph or row
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+
+
+def iter_docx_part_lines(stream):
+    """
+    Yield the lines of one WordprocessingML part (document body, header or
+    footer) from a streaming parse.
+
+    Each paragraph is one line, each table row one tab-separated line.
+    Paragraphs in text boxes come out on their own, before the paragraph
+    anchoring them; the VML fallback copy of a text box is skipped.
+    """
+    from lxml import etree
+
+    fallback_depth = 0
+    rows = []  # Cells of the table rows being read, innermost last
+    cells = []  # Paragraphs of the table cells being read, innermost last
+    context = etree.iterparse(
+        stream, events=('start', 'end'), resolve_entities=False, no_network=True, huge_tree=False,
+    )
+    for event, element in context:
+        tag = element.tag
+        if event == 'start':
+            if tag == MC_FALLBACK:
+                fallback_depth += 1
+            elif tag == W_TR:
+                rows.append([])
+            elif tag == W_TC:
+                cells.append([])
+            continue
+
+        if tag == W_P:
+            text = "" if fallback_depth else _paragraph_text(element)
+            _release(element)
+            if not text:
+                continue
+            if cells:
+                cells[-1].append(text)
+            else:
+                yield text
+        elif tag == W_TC:
+            text = " ".join(cells.pop())
+            if rows:
+                rows[-1].append(text)
+        elif tag == W_TR:
+            line = "\t".join(cell for cell in rows.pop() if cell)
+            _release(element)
+            if not line:
+                continue
+            if cells:
+                cells[-1].append(line)  # A table nested in a cell
+            else:
+                yield line
+        elif tag == MC_FALLBACK:
+            fallback_depth -= 1
+            _release(element)
+        elif tag in (W_BODY, W_HDR, W_FTR):
+            _release(element)
+
+
+def _docx_parts(names):
+    """Headers first (names and contact details often live there), then the body, then footers."""
+    headers = sorted(name for name in names if name.startswith("word/header") and name.endswith(".xml"))
+    footers = sorted(name for name in names if name.startswith("word/footer") and name.endswith(".xml"))
+    body = [name for name in names if name == "word/document.xml"]
+    return headers + body + footers
+
+
+def extract_docx_text(path):
+    """
+    Extract the text of a .docx from its XML parts, including tables,
+    headers, footers and text boxes.
+
+    The parts are streamed out of the archive with `iterparse`, so memory
+    stays bounded by the text, not the document model. Files over
+    DOCX_MAX_BYTES, or whose XML inflates past DOCX_MAX_XML_BYTES, are
+    rejected.
+    """
+    import zipfile
+
+    if os.path.getsize(path) > settings.DOCX_MAX_BYTES:
+        raise ExtractionError(f"DOCX is larger than {settings.DOCX_MAX_BYTES} bytes")
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise ExtractionError("Not a valid .docx file") from None
+
+    with archive:
+        parts = _docx_parts(archive.namelist())
+        if "word/document.xml" not in parts:
+            raise ExtractionError("Not a valid .docx file: word/document.xml is missing")
+        if sum(archive.getinfo(name).file_size for name in parts) > settings.DOCX_MAX_XML_BYTES:
+            raise ExtractionError(f"DOCX expands to more than {settings.DOCX_MAX_XML_BYTES} bytes of XML")
+
+        lines = []
+        for name in parts:
+            with archive.open(name) as stream:
+                lines.extend(iter_docx_part_lines(stream))
+    return "\n".join(lines)
+
+
+# Legacy and plain-text formats ----------------------------------------------
+
+# RTF destinations whose content is not document text
+RTF_SKIPPED_DESTINATIONS = {
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'header', 'footer',
+    'headerl', 'headerr', 'footerl', 'footerr', 'listtable', 'listoverridetable',
+    'rsidtbl', 'generator', 'themedata', 'colorschememapping', 'datastore', 'latentstyles',
+    'xmlnstbl', 'filetbl', 'revtbl', 'pgdsctbl', 'fldinst',
+}
+RTF_TOKEN_RE = re.compile(
+    r"\\([a-z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\([^a-z])|([{}])|[\r\n]+|([^\\{}\r\n]+)"
+)
+RTF_SPECIAL = {'par': "\n", 'line': "\n", 'row': "\n", 'sect': "\n", 'page': "\n", 'tab': "\t", 'cell': "\t"}
+
+
+def rtf_to_text(rtf):
+    """
+    Plain text of an RTF document: control words are dropped, paragraph and
+    cell marks become newlines and tabs, and `\\'hh` / `\\uN` escapes are decoded.
+    """
+    out = []
+    stack = []
+    skip = False
+    unicode_skip = 1  # Fallback characters after each \uN, set by \ucN
+    pending_skip = 0
+    for word, arg, hex_code, symbol, brace, text in RTF_TOKEN_RE.findall(rtf):
+        if brace == '{':
+            stack.append((skip, unicode_skip))
+        elif brace == '}':
+            if stack:
+                skip, unicode_skip = stack.pop()
+        elif symbol:
+            if symbol == '*':
+                skip = True  # An optional destination the reader does not know
+            elif symbol in '\\{}' and not skip:
+                out.append(symbol)
+            elif symbol == '~' and not skip:
+                out.append(" ")
+            elif symbol in '\r\n' and not skip:
+                out.append("\n")  # An escaped line break is a paragraph mark
+        elif word:
+            if word in RTF_SKIPPED_DESTINATIONS:
+                skip = True
+            elif word == 'uc':
+                unicode_skip = int(arg or 1)
+            elif word == 'u' and not skip:
+                code = int(arg or 0)
+                out.append(chr(code + 65536 if code < 0 else code))
+                pending_skip = unicode_skip
+            elif word in RTF_SPECIAL and not skip:
+                out.append(RTF_SPECIAL[word])
+        elif hex_code:
+            if pending_skip:
+                pending_skip -= 1
+            elif not skip:
+                out.append(bytes([int(hex_code, 16)]).decode('cp1252', errors='replace'))
+        elif text and not skip:
+            if pending_skip:
+                dropped = min(pending_skip, len(text))
+                text = text[dropped:]
+                pending_skip -= dropped
+            out.append(text)
+    return "".join(out)
+
+
+def _read_limited(path, limit):
+    if os.path.getsize(path) > limit:
+        raise ExtractionError(f"File is larger than {limit} bytes")
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _decode_text(data):
+    """Decode UTF-8 (or UTF-16 with a byte order mark), falling back to Windows-1252."""
+    if data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return data.decode('utf-16', errors='replace')
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('cp1252', errors='replace')
+
+
+def extract_txt_text(path):
+    return _decode_text(_read_limited(path, settings.TEXT_MAX_BYTES))
+
+
+def extract_rtf_text(path):
+    # RTF is 7-bit ASCII; anything else arrives through escapes
+    return rtf_to_text(_read_limited(path, settings.TEXT_MAX_BYTES).decode('latin-1'))
+
+
+def extract_doc_text(path):
+    """
+    Text of a legacy binary .doc through the external converter in
+    DOC_CONVERTER (antiword by default), which prints it to stdout.
+    """
+    import shutil
+    import subprocess
+
+    command = shutil.which(settings.DOC_CONVERTER[0])
+    if command is None:
+        raise ExtractionError(f".doc files need {settings.DOC_CONVERTER[0]} to be installed")
+    _read_limited(path, settings.DOCX_MAX_BYTES)  # Only the size check
+    try:
+        result = subprocess.run(
+            [command, *settings.DOC_CONVERTER[1:], path],
+            capture_output=True, timeout=settings.PDF_TIMEOUT, check=False,
+        )
+    except subprocess.TimeoutExpired:
+        raise ExtractionTimeout(".doc extraction timed out") from None
+    if result.returncode != 0:
+        raise ExtractionError(result.stderr.decode('utf-8', errors='replace').strip() or ".doc conversion failed")
+    return _decode_text(result.stdout)
+
+
+# Handler per file extension; other formats can be plugged in with `register_extractor`
+EXTRACTORS = {
+    '.pdf': extract_pdf_text,
+    '.docx': extract_docx_text,
+    '.doc': extract_doc_text,
+    '.rtf': extract_rtf_text,
+    '.txt': extract_txt_text,
+}
+
+
+def register_extractor(extension, handler):
+    """Extract files ending in `extension` with `handler(path) -> text`, replacing any built-in one."""
+    EXTRACTORS[extension.lower()] = handler
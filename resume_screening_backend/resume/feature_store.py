@@ -0,0 +1,322 @@
+# resume/feature_store.py
+
+import fcntl
+import json
+import os
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from .corpus_model import CURRENT_FILE, current_model_path, prune_versions, write_text_atomic
+from .embeddings import _latest_rows
+from .model_registry import registry
+from .models import Resume, Skill
+from .skill_index import parse_skills
+from .skill_matcher import get_skill_matcher
+
+IDS_FILE = "ids.i64"
+UPLOADED_FILE = "uploaded.f64"
+SKILL_WORDS_PREFIX = "skills-"
+TEXT_NNZ_FILE = "text_nnz.i32"
+TEXT_DATA_FILE = "text_data.f32"
+TEXT_INDICES_FILE = "text_indices.i32"
+TOMBSTONES_FILE = "deleted.i64"
+LOCK_FILE = "append.lock"
+
+# Resumes read from the database per appended block while building
+BUILD_CHUNK_ROWS = 2000
+
+
+def _skill_words_file(word):
+    return f"{SKILL_WORDS_PREFIX}{word:04d}.u64"
+
+
+def _read_column(path, name, dtype, rows):
+    if not rows:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(os.path.join(path, name), dtype=dtype, mode='r', shape=(rows,))
+
+
+def _file_rows(path, name, itemsize):
+    return os.path.getsize(os.path.join(path, name)) // itemsize
+
+
+class FeatureStore:
+    """
+    A read-only, columnar copy of the resume table for the query path.
+
+    One row per stored resume version holds its id, its upload time, its
+    skills as a bitset over the skill columns fixed at build time and its
+    TF-IDF vector as a CSR row. Every column is a memory-mapped file, so
+    all workers of a host share one page-cache copy; each 64 skill columns
+    are one uint64 file, and a skill filter only reads the words it needs.
+
+    Rows are only ever appended: the last row of a resume wins and deleted
+    resumes are masked out through the tombstones file.
+    """
+
+    def __init__(self, path, meta, ids, uploaded, skill_words, text, deleted):
+        self.path = path
+        self.meta = meta
+        self.ids = ids
+        self.uploaded = uploaded
+        self.skill_words = skill_words
+        self.text = text
+        self.columns = {name: column for column, name in enumerate(meta['skills'])}
+        self.live = _latest_rows(ids) & ~np.isin(ids, deleted)
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        words = meta['words']
+        # Another process may be mid-append: only read rows that are complete in every
+        # column. The text arrays are written first, so their nnz counts are covered.
+        rows = min(
+            _file_rows(path, IDS_FILE, 8),
+            _file_rows(path, UPLOADED_FILE, 8),
+            _file_rows(path, TEXT_NNZ_FILE, 4),
+            *(_file_rows(path, _skill_words_file(word), 8) for word in range(words)),
+        )
+        ids = np.array(_read_column(path, IDS_FILE, np.int64, rows))
+        uploaded = _read_column(path, UPLOADED_FILE, np.float64, rows)
+        skill_words = [_read_column(path, _skill_words_file(word), np.uint64, rows) for word in range(words)]
+
+        nnz = _read_column(path, TEXT_NNZ_FILE, np.int32, rows)
+        indptr = np.zeros(rows + 1, dtype=np.int64)
+        np.cumsum(nnz, out=indptr[1:])
+        total = int(indptr[-1])
+        text = sparse.csr_matrix(
+            (
+                _read_column(path, TEXT_DATA_FILE, np.float32, total),
+                _read_column(path, TEXT_INDICES_FILE, np.int32, total),
+                indptr,
+            ),
+            shape=(rows, meta['features']), copy=False,
+        )
+
+        deleted = np.zeros(0, dtype=np.int64)
+        tombstones = os.path.join(path, TOMBSTONES_FILE)
+        if os.path.exists(tombstones):
+            deleted = np.fromfile(tombstones, dtype=np.int64)
+        return cls(path, meta, ids, uploaded, skill_words, text, deleted)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def covers(self, names):
+        """Whether every skill in `names` is a column; other skills must go through the posting lists."""
+        return all(name in self.columns for name in names)
+
+    def has_skill(self, name):
+        """Boolean mask of the rows listing the (column) skill `name`."""
+        word, bit = divmod(self.columns[name], 64)
+        return (self.skill_words[word] & np.uint64(1 << bit)) != 0
+
+    def rows_with_all_skills(self, names):
+        """
+        Mask of the live rows listing every skill in `names`: one bitwise AND
+        per 64-bit word of skill columns the query touches.
+        """
+        query = {}
+        for name in names:
+            word, bit = divmod(self.columns[name], 64)
+            query[word] = query.get(word, 0) | (1 << bit)
+        mask = self.live.copy()
+        for word, bits in query.items():
+            bits = np.uint64(bits)
+            mask &= (self.skill_words[word] & bits) == bits
+        return mask
+
+    def resumes_with_all_skills(self, names):
+        """Sorted ids of the resumes listing every skill in `names`, or None when one is not a column."""
+        names = set(names)
+        if not names or not self.covers(names):
+            return None
+        return np.sort(self.ids[self.rows_with_all_skills(names)])
+
+    def skill_counts(self, names, postings=None):
+        """
+        Per row, how many of the skills in `names` it lists. A skill that is
+        not a column is read from `postings` (skill name to resume ids) when
+        given, and counts as unlisted otherwise.
+        """
+        counts = np.zeros(len(self.ids), dtype=np.int32)
+        for name in names:
+            if name in self.columns:
+                counts += self.has_skill(name)
+            elif postings and name in postings:
+                counts += np.isin(self.ids, postings[name])
+        return counts
+
+    def has_text_for(self, model):
+        """Whether the text vectors were made with `model`'s (TF-IDF) vocabulary and IDF weights."""
+        fitted_at = getattr(model, 'meta', {}).get('fitted_at')
+        return fitted_at is not None and self.meta['tfidf_fitted_at'] == fitted_at
+
+    def text_similarities(self, query, rows):
+        """Cosine similarity of a transformed query row against the text vectors of `rows`."""
+        return (self.text[rows] @ query.T).toarray().ravel()
+
+
+# Persistence ----------------------------------------------------------------
+
+def _append_rows(path, words, ids, uploaded, skill_rows, vectors):
+    # Every column is appended under one lock so the rows stay aligned; the
+    # text arrays go first so a reader never sees nnz counts without data
+    vectors = sparse.csr_matrix(vectors, dtype=np.float32)
+    vectors.sort_indices()
+    with open(os.path.join(path, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(os.path.join(path, TEXT_DATA_FILE), "ab") as f:
+                f.write(vectors.data.astype(np.float32).tobytes())
+            with open(os.path.join(path, TEXT_INDICES_FILE), "ab") as f:
+                f.write(vectors.indices.astype(np.int32).tobytes())
+            with open(os.path.join(path, TEXT_NNZ_FILE), "ab") as f:
+                f.write(np.diff(vectors.indptr).astype(np.int32).tobytes())
+            for word in range(words):
+                with open(os.path.join(path, _skill_words_file(word)), "ab") as f:
+                    f.write(np.ascontiguousarray(skill_rows[:, word]).tobytes())
+            with open(os.path.join(path, UPLOADED_FILE), "ab") as f:
+                f.write(np.asarray(uploaded, dtype=np.float64).tobytes())
+            with open(os.path.join(path, IDS_FILE), "ab") as f:
+                f.write(np.asarray(ids, dtype=np.int64).tobytes())
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _skill_bitsets(columns, words, skill_fields):
+    """One row of `words` uint64 bitsets per `Resume.skills` value; skills without a column are left out."""
+    bitsets = np.zeros((len(skill_fields), words), dtype=np.uint64)
+    for row, skills in enumerate(skill_fields):
+        for name in parse_skills(skills):
+            column = columns.get(name)
+            if column is not None:
+                bitsets[row, column // 64] |= np.uint64(1 << (column % 64))
+    return bitsets
+
+
+def _append_resumes(path, meta, model, rows):
+    """Append `(id, skills, uploaded_at, text)` rows; text vectors are left empty without a matching model."""
+    columns = {name: column for column, name in enumerate(meta['skills'])}
+    if model is not None and meta['tfidf_fitted_at'] == model.meta.get('fitted_at'):
+        vectors = model.transform([text or "" for _, _, _, text in rows])
+    else:
+        vectors = sparse.csr_matrix((len(rows), meta['features']), dtype=np.float32)
+    _append_rows(
+        path, meta['words'],
+        [resume_id for resume_id, _, _, _ in rows],
+        [uploaded_at.timestamp() for _, _, uploaded_at, _ in rows],
+        _skill_bitsets(columns, meta['words'], [skills for _, skills, _, _ in rows]),
+        vectors,
+    )
+
+
+def build_feature_store(root=None, resumes=None):
+    """
+    Copy every resume (or those of the `resumes` queryset) into a new
+    store version under `root` and make it current.
+
+    The skill columns are the taxonomy's canonical skills plus any skill
+    already indexed; the text vectors come from the current TF-IDF model,
+    whose fit time is recorded so queries only use them with that model.
+    """
+    model = registry.get('tfidf')
+    names = set(get_skill_matcher().canonical_names()) | set(Skill.objects.values_list('name', flat=True))
+    meta = {
+        'skills': sorted(names),
+        'words': max((len(names) + 63) // 64, 1),
+        'tfidf_fitted_at': model.meta.get('fitted_at') if model is not None else None,
+        'features': len(model.vocabulary) if model is not None else 0,
+        'built_at': time.time(),
+    }
+
+    root = str(root or settings.FEATURE_STORE_DIR)
+    version = time.strftime("v%Y%m%dT%H%M%S") + f"-{time.time_ns() % 10**9:09d}"
+    path = os.path.join(root, version)
+    os.makedirs(path)
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump(meta, f)
+    for name in (IDS_FILE, UPLOADED_FILE, TEXT_NNZ_FILE, TEXT_DATA_FILE, TEXT_INDICES_FILE):
+        open(os.path.join(path, name), "wb").close()
+    for word in range(meta['words']):
+        open(os.path.join(path, _skill_words_file(word)), "wb").close()
+
+    resumes = Resume.objects.all() if resumes is None else resumes
+    rows = resumes.order_by('id').values_list('id', 'skills', 'uploaded_at', 'resume_text')
+    batch = []
+    for row in rows.iterator(chunk_size=BUILD_CHUNK_ROWS):
+        batch.append(row)
+        if len(batch) >= BUILD_CHUNK_ROWS:
+            _append_resumes(path, meta, model, batch)
+            batch = []
+    if batch:
+        _append_resumes(path, meta, model, batch)
+
+    # Resumes stored while the build ran are in the old version only; they
+    # are picked up by the next build.
+    write_text_atomic(os.path.join(root, CURRENT_FILE), version)
+    prune_versions(root, keep=2)
+    store = FeatureStore.load(path)
+    with _lock:
+        _cached[root] = (_cache_key(path), store)
+    return store
+
+
+# Process-wide cache ---------------------------------------------------------
+
+_lock = threading.Lock()
+_cached = {}  # Store root: (key, store)
+
+
+def _cache_key(path):
+    tombstones = os.path.join(path, TOMBSTONES_FILE)
+    return (
+        path,
+        os.path.getsize(os.path.join(path, IDS_FILE)),
+        os.path.getsize(tombstones) if os.path.exists(tombstones) else 0,
+    )
+
+
+def get_feature_store(root=None):
+    """
+    Return the current feature store under `root`, or None if none was built.
+
+    The memory maps are reopened when another process appended rows or
+    tombstones, which is detected from the size of those files.
+    """
+    root = str(root or settings.FEATURE_STORE_DIR)
+    path = current_model_path(root)
+    if path is None:
+        return None
+    key = _cache_key(path)
+    with _lock:
+        cached_key, store = _cached.get(root, (None, None))
+        if cached_key != key:
+            store = FeatureStore.load(path)
+            _cached[root] = (key, store)
+        return store
+
+
+def append_to_feature_store(resumes, root=None):
+    """Copy newly stored or re-extracted resumes into the current store; a no-op until one was built."""
+    path = current_model_path(str(root or settings.FEATURE_STORE_DIR))
+    if path is None or not resumes:
+        return
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    rows = [(resume.id, resume.skills, resume.uploaded_at, resume.resume_text) for resume in resumes]
+    _append_resumes(path, meta, registry.get('tfidf'), rows)
+
+
+def remove_from_feature_store(resume_ids, root=None):
+    """Record deleted resumes in the tombstones file."""
+    path = current_model_path(str(root or settings.FEATURE_STORE_DIR))
+    if path is None or not resume_ids:
+        return
+    with open(os.path.join(path, TOMBSTONES_FILE), "ab") as f:
+        f.write(np.asarray(resume_ids, dtype=np.int64).tobytes())
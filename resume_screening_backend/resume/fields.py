@@ -0,0 +1,48 @@
+# resume/fields.py
+
+import zlib
+
+from django.db import models
+
+
+class CompressedTextField(models.BinaryField):
+    """
+    Text stored zlib-compressed in a binary column.
+
+    The attribute is a plain `str` on the model; compression happens only on
+    the way to and from the database. Values written before the column was
+    compressed (plain text) are still read back as-is.
+    """
+
+    def __init__(self, *args, compression_level=6, **kwargs):
+        self.compression_level = compression_level
+        kwargs.setdefault('editable', True)
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.compression_level != 6:
+            kwargs['compression_level'] = self.compression_level
+        return name, path, args, kwargs
+
+    def from_db_value(self, value, expression, connection):
+        return self.to_python(value)
+
+    def to_python(self, value):
+        if value is None or isinstance(value, str):
+            return value
+        value = bytes(value)
+        try:
+            return zlib.decompress(value).decode('utf-8')
+        except zlib.error:
+            return value.decode('utf-8', errors='replace')
+
+    def get_prep_value(self, value):
+        if value is None:
+            return None
+        if not isinstance(value, str):
+            value = str(value)
+        return zlib.compress(value.encode('utf-8'), self.compression_level)
+
+    def value_to_string(self, obj):
+        return self.value_from_object(obj)
@@ -0,0 +1,182 @@
+# resume/hybrid.py
+
+import math
+import re
+import time
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from .model_registry import registry
+from .models import Resume, ResumeSkill, Skill
+from .skill_index import chunked
+from .skill_matcher import get_skill_matcher
+
+SIGNALS = ('must_have', 'nice_to_have', 'text', 'recency')
+
+# JD lines that open a section of required or optional skills
+MUST_HAVE_MARKERS = re.compile(r"must[\s-]have|required|requirements|mandatory|essential", re.IGNORECASE)
+NICE_TO_HAVE_MARKERS = re.compile(
+    r"nice[\s-]to[\s-]have|good[\s-]to[\s-]have|preferred|bonus|a plus|optional", re.IGNORECASE
+)
+
+
+def split_jd_skills(job_description):
+    """
+    Return the JD's `(must_have, nice_to_have)` skills.
+
+    Skills under a "Requirements" / "Must have" line are must-haves, those
+    under "Nice to have" / "Preferred" are nice-to-haves. Skills outside
+    any marked section only add to the score, so they are nice-to-haves.
+    """
+    matcher = get_skill_matcher()
+    must, nice = set(), set()
+    section = nice
+    for line in job_description.splitlines():
+        if NICE_TO_HAVE_MARKERS.search(line):
+            section = nice
+        elif MUST_HAVE_MARKERS.search(line):
+            section = must
+        section.update(matcher.find(line))
+    return sorted(must), sorted(nice - must)
+
+
+def _postings(names):
+    """Resume ids listing each skill, as one array per skill (empty for unknown skills)."""
+    skill_ids = dict(Skill.objects.filter(name__in=names).values_list('name', 'id'))
+    postings = []
+    for name in names:
+        if name not in skill_ids:
+            postings.append(np.zeros(0, dtype=np.int64))
+            continue
+        resume_ids = ResumeSkill.objects.filter(skill_id=skill_ids[name]).values_list('resume_id', flat=True)
+        postings.append(np.fromiter(resume_ids.iterator(chunk_size=5000), dtype=np.int64))
+    return postings
+
+
+def _coverage(candidates, postings):
+    """Share of the posting lists each (sorted) candidate appears in."""
+    if not postings:
+        return np.zeros(len(candidates))
+    hits = np.concatenate(postings)
+    hits = hits[np.isin(hits, candidates)]
+    counts = np.bincount(np.searchsorted(candidates, hits), minlength=len(candidates))
+    return counts / len(postings)
+
+
+def _recency(candidates, half_life_days):
+    """1.0 for a resume uploaded now, halving every `half_life_days`."""
+    now = timezone.now()
+    age_days = np.zeros(len(candidates))
+    position = {resume_id: i for i, resume_id in enumerate(candidates.tolist())}
+    for chunk in chunked(candidates.tolist()):
+        for resume_id, uploaded_at in Resume.objects.filter(id__in=chunk).values_list('id', 'uploaded_at'):
+            age_days[position[resume_id]] = max((now - uploaded_at).total_seconds(), 0) / 86400
+    return np.power(0.5, age_days / half_life_days)
+
+
+def _text_scorer():
+    """The configured text model (TF-IDF or BM25), or None until it was built."""
+    return registry.get('bm25' if settings.HYBRID_TEXT_SCORER == 'bm25' else 'tfidf')
+
+
+def _combine(candidates, breakdown, weights):
+    # Signals without input (e.g. no nice-to-haves) drop out of the weighting
+    total_weight = sum(weights.get(signal, 0) for signal in breakdown)
+    scores = np.zeros(len(candidates))
+    if total_weight:
+        for signal, values in breakdown.items():
+            scores += weights.get(signal, 0) * values
+        scores /= total_weight
+    return candidates, scores, breakdown
+
+
+def score_store(store, must_have, nice_to_have, weights, min_must_coverage, text_scores=None, postings=None):
+    """
+    `score_resumes` over a feature store's columns, without a database query.
+
+    `text_scores(rows, candidates)` returns the text signal of the candidate
+    rows and resume ids; without it the text signal is left out. `postings`
+    maps skills that are not columns to the ids of the resumes listing them.
+    """
+    if must_have:
+        must_counts = store.skill_counts(must_have, postings)
+        required = math.ceil(min_must_coverage * len(must_have))
+        mask = store.live & (must_counts >= max(required, 1))
+    elif nice_to_have:
+        mask = store.live & (store.skill_counts(nice_to_have, postings) > 0)
+    elif text_scores is not None:
+        mask = store.live.copy()  # No skills in the JD: rank on text alone
+    else:
+        mask = np.zeros(len(store), dtype=bool)
+    rows = np.flatnonzero(mask)
+    candidates = store.ids[rows]
+
+    breakdown = {}
+    if must_have:
+        breakdown['must_have'] = must_counts[rows] / len(must_have)
+    if nice_to_have:
+        breakdown['nice_to_have'] = store.skill_counts(nice_to_have, postings)[rows] / len(nice_to_have)
+    if text_scores is not None:
+        breakdown['text'] = text_scores(rows, candidates)
+    if weights.get('recency'):
+        age_days = np.maximum(time.time() - store.uploaded[rows], 0) / 86400
+        breakdown['recency'] = np.power(0.5, age_days / settings.HYBRID_RECENCY_HALF_LIFE_DAYS)
+    return _combine(candidates, breakdown, weights)
+
+
+def score_resumes(job_description, must_have, nice_to_have, weights, min_must_coverage):
+    """
+    Score every resume that survives the skill filter.
+
+    Candidates are pruned through the skill posting lists first: a resume
+    needs at least `min_must_coverage` of the must-have skills, or (without
+    must-haves) at least one nice-to-have. Only the survivors are scored,
+    each signal as one vectorized NumPy pass. Returns `(ids, scores,
+    breakdown)` where `breakdown` maps each active signal to its scores.
+
+    With a feature store covering the JD's skills, the filter, the skill
+    coverage and the recency signal are read from its memory-mapped
+    columns instead of the posting lists and the resume table.
+    """
+    model = _text_scorer()
+    store = registry.get('feature_store')
+    if store is not None and store.covers([*must_have, *nice_to_have]):
+        query = model.transform([job_description]) if store.has_text_for(model) else None
+
+        def text_scores(rows, candidates):
+            if query is not None:
+                return store.text_similarities(query, rows)
+            # The store's vectors predate the current model (or BM25 is the scorer)
+            return model.similarities_for(job_description, candidates)
+
+        return score_store(
+            store, must_have, nice_to_have, weights, min_must_coverage,
+            text_scores if model is not None else None,
+        )
+
+    must_postings = _postings(must_have)
+    nice_postings = _postings(nice_to_have)
+
+    if must_postings:
+        hits, counts = np.unique(np.concatenate(must_postings), return_counts=True)
+        required = math.ceil(min_must_coverage * len(must_postings))
+        candidates = hits[counts >= max(required, 1)]
+    elif nice_postings:
+        candidates = np.unique(np.concatenate(nice_postings))
+    elif model is not None:
+        candidates = np.unique(model.resume_ids)  # No skills in the JD: rank on text alone
+    else:
+        candidates = np.zeros(0, dtype=np.int64)
+
+    breakdown = {}
+    if must_have:
+        breakdown['must_have'] = _coverage(candidates, must_postings)
+    if nice_to_have:
+        breakdown['nice_to_have'] = _coverage(candidates, nice_postings)
+    if model is not None:
+        breakdown['text'] = model.similarities_for(job_description, candidates)
+    if weights.get('recency'):
+        breakdown['recency'] = _recency(candidates, settings.HYBRID_RECENCY_HALF_LIFE_DAYS)
+    return _combine(candidates, breakdown, weights)
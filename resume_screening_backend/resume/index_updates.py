@@ -0,0 +1,76 @@
+# resume/index_updates.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# One thread per process, so index writes land in the order they were queued
+_writer_lock = threading.Lock()
+_writer = {'pool': None}
+
+
+def _index_writer():
+    with _writer_lock:
+        if _writer['pool'] is None:
+            _writer['pool'] = ThreadPoolExecutor(max_workers=1, thread_name_prefix='index-writer')
+        return _writer['pool']
+
+
+def _run(fn, *args):
+    try:
+        fn(*args)
+    except Exception:
+        # The rows are committed; the rebuild commands bring the index back in sync
+        logger.exception("Index update %s failed", fn.__name__)
+
+
+def after_commit(fn, *args):
+    """
+    Run the index write `fn(*args)` once the current transaction commits
+    (right away outside one), on this process's index writer thread.
+
+    Only the skill posting lists and the corpus version are updated inside
+    the transaction changing the resumes. The on-disk indexes are written
+    after it, so a save does not hold its transaction open for them and a
+    rolled-back save leaves them untouched. With INDEX_UPDATES_IN_BACKGROUND
+    off, `fn` runs on the committing thread instead.
+    """
+    def submit():
+        if settings.INDEX_UPDATES_IN_BACKGROUND:
+            _index_writer().submit(_run, fn, *args)
+        else:
+            fn(*args)
+
+    transaction.on_commit(submit)
+
+
+def wait_for_index_updates():
+    """Block until the index writes queued so far have landed."""
+    with _writer_lock:
+        pool = _writer['pool']
+    if pool is not None:
+        pool.submit(lambda: None).result()
+
+
+def append_to_search_indexes(resumes):
+    """Add newly stored resumes to every on-disk search index."""
+    from .bm25 import append_to_bm25_index
+    from .corpus_model import append_to_corpus_model
+    from .embeddings import append_to_embedding_index
+    from .feature_store import append_to_feature_store
+    from .result_cache import bump_corpus_version
+    from .sharding import append_to_shard_stores
+
+    append_to_corpus_model(resumes)
+    append_to_embedding_index(resumes)
+    append_to_bm25_index(resumes)
+    # After the TF-IDF append, so the rows get text vectors from the same model
+    append_to_feature_store(resumes)
+    append_to_shard_stores(resumes)
+    # Results cached between the commit and these writes miss the new rows
+    bump_corpus_version()
@@ -0,0 +1,216 @@
+# resume/ingest.py
+
+import os
+import shutil
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .extractors import EXTRACTORS, parser_process_context, start_parser_process
+from .index_updates import after_commit, append_to_search_indexes, wait_for_index_updates
+from .models import IngestItem, IngestJob, Resume
+from .parsing import PARSE_VERSION
+from .result_cache import bump_corpus_version
+from .storage import cached_extraction, hash_file
+from .skill_index import index_new_resumes
+from .skill_matcher import get_skill_matcher
+
+def resume_from_extracted(extracted_data, text, content_hash=None):
+    """Build an unsaved `Resume` from a document's text and its extracted fields."""
+    return Resume(
+        name=extracted_data['name'] or "",
+        email=extracted_data['email'] or "",
+        phone=extracted_data['phone'] or "",
+        skills=", ".join(extracted_data['skills']),  # Save skills as a string
+        resume_text=text,
+        content_hash=content_hash,
+        parse_version=PARSE_VERSION,
+        taxonomy_version=get_skill_matcher().version,
+    )
+
+
+def _is_supported(name):
+    """Whether an extractor is registered for the file's extension."""
+    return os.path.splitext(name)[1].lower() in EXTRACTORS
+
+
+def _collect_files(source, dest_dir):
+    """
+    List the resume files in a ZIP archive or directory.
+
+    Archive members are extracted into `dest_dir` first; member names are
+    flattened so a crafted archive cannot write outside of it, and members
+    larger than UPLOAD_MAX_BYTES are skipped like any oversized upload.
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for name in sorted(files):
+                if _is_supported(name):
+                    paths.append(os.path.join(root, name))
+        return sorted(paths)
+
+    if not zipfile.is_zipfile(source):
+        raise ValueError("Bulk uploads must be a ZIP archive or a directory")
+
+    os.makedirs(dest_dir, exist_ok=True)
+    paths = []
+    with zipfile.ZipFile(source) as archive:
+        for index, member in enumerate(archive.infolist()):
+            name = os.path.basename(member.filename)
+            if member.is_dir() or not _is_supported(name) or member.file_size > settings.UPLOAD_MAX_BYTES:
+                continue
+            path = os.path.join(dest_dir, f"{index:06d}_{name}")
+            with archive.open(member) as src, open(path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            paths.append(path)
+    return paths
+
+
+def create_job(source):
+    """
+    Queue `source` as a new ingest job.
+
+    Only its type is checked here: an archive is unpacked, and its files
+    listed, by `run_job`, so a large upload does not hold up the request.
+    """
+    if not os.path.isdir(source) and not zipfile.is_zipfile(source):
+        raise ValueError("Bulk uploads must be a ZIP archive or a directory")
+    return IngestJob.objects.create(source=str(source))
+
+
+def _queue_items(job):
+    """Unpack or list the job's source and create one pending item per resume file."""
+    dest_dir = os.path.join(settings.BULK_UPLOAD_DIR, str(job.pk))
+    paths = _collect_files(job.source, dest_dir)
+    IngestItem.objects.bulk_create(
+        [IngestItem(job=job, path=path) for path in paths], batch_size=settings.INGEST_BATCH_SIZE
+    )
+    job.total = len(paths)
+    job.save(update_fields=['total', 'updated_at'])
+
+
+def _parse_file(path):
+    """
+    Process-pool worker: hash and parse one file, returning `(extracted_data, error)`.
+
+    Content already in the extraction cache is not parsed again.
+    """
+    try:
+        content_hash = hash_file(path)
+        text, extracted_data = cached_extraction(content_hash, path)
+        extracted_data['content_hash'] = content_hash
+        extracted_data['text'] = text
+        return extracted_data, None
+    except Exception as e:
+        return None, str(e)
+
+
+def _store_batch(job, batch):
+    """Insert the parsed resumes of one batch and record the items' outcome."""
+    parsed = [(item, data) for item, data, error in batch if error is None]
+
+    # Files already stored (or repeated within the batch) link to one Resume
+    resume_ids = dict(
+        Resume.objects.filter(content_hash__in={data['content_hash'] for _, data in parsed})
+        .values_list('content_hash', 'id')
+    )
+    new_rows = {}
+    for _, data in parsed:
+        if data['content_hash'] not in resume_ids:
+            new_rows.setdefault(data['content_hash'], data)
+
+    with transaction.atomic():
+        resumes = Resume.objects.bulk_create(
+            [
+                resume_from_extracted(data, data['text'], content_hash)
+                for content_hash, data in new_rows.items()
+            ]
+        )
+        index_new_resumes(resumes)
+        if resumes:
+            bump_corpus_version()  # bulk_create sends no post_save
+            after_commit(append_to_search_indexes, resumes)
+        resume_ids.update((resume.content_hash, resume.id) for resume in resumes)
+        for item, data in parsed:
+            item.status = IngestItem.STATUS_DONE
+            item.resume_id = resume_ids[data['content_hash']]
+        for item, _, error in batch:
+            if error is not None:
+                item.status = IngestItem.STATUS_FAILED
+                item.error = error
+        IngestItem.objects.bulk_update(
+            [item for item, _, _ in batch], ['status', 'error', 'resume']
+        )
+        IngestJob.objects.filter(pk=job.pk).update(
+            processed=F('processed') + len(batch),
+            failed=F('failed') + len(batch) - len(parsed),
+            updated_at=timezone.now(),
+        )
+
+
+def run_job(job_id, workers=None, batch_size=None, progress=None):
+    """
+    Parse the pending items of a job across a process pool, first unpacking
+    the source of a job that has no items yet.
+
+    Items are stored in batches with `bulk_create`, so an interrupted job
+    can be resumed by running it again: only pending items are picked up.
+    """
+    workers = workers or os.cpu_count() or 1
+    batch_size = batch_size or settings.INGEST_BATCH_SIZE
+    job = IngestJob.objects.get(pk=job_id)
+    job.status = IngestJob.STATUS_RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    try:
+        if not job.items.exists():
+            _queue_items(job)
+        items = list(job.items.filter(status=IngestItem.STATUS_PENDING).order_by('id'))
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=parser_process_context(), initializer=start_parser_process,
+        ) as pool:
+            results = pool.map(_parse_file, [item.path for item in items], chunksize=8)
+            batch = []
+            for item, (data, error) in zip(items, results):
+                batch.append((item, data, error))
+                if len(batch) >= batch_size:
+                    _store_batch(job, batch)
+                    batch = []
+                    if progress:
+                        progress(IngestJob.objects.get(pk=job.pk))
+            if batch:
+                _store_batch(job, batch)
+        # The job is done once its resumes are searchable
+        wait_for_index_updates()
+    except Exception as e:
+        IngestJob.objects.filter(pk=job.pk).update(
+            status=IngestJob.STATUS_FAILED, error=str(e), updated_at=timezone.now()
+        )
+        raise
+
+    IngestJob.objects.filter(pk=job.pk).update(status=IngestJob.STATUS_DONE, updated_at=timezone.now())
+    job.refresh_from_db()
+    if progress:
+        progress(job)
+    return job
+
+
+def run_job_in_background(job_id):
+    """Run `run_job` on a daemon thread so the request can return immediately."""
+    def target():
+        try:
+            run_job(job_id)
+        except Exception:
+            pass  # The failure is recorded on the job for the status endpoint
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=target, name=f"ingest-job-{job_id}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,223 @@
+# resume/instrumentation.py
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Stage timings recorded while serving the current request; None outside one
+_request_spans = ContextVar('request_spans', default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Histogram:
+    """
+    A Prometheus-style histogram with labels, kept in process memory.
+
+    Each worker process exports its own series; Prometheus sums them over
+    the scraped targets.
+    """
+
+    def __init__(self, name, documentation, labelnames, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *labels):
+        position = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            if position < len(self.buckets):
+                series[0][position] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def _labels(self, labels, **extra):
+        pairs = [*zip(self.labelnames, labels), *extra.items()]
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def render(self):
+        """The histogram in the Prometheus text exposition format."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total, count) for labels, (counts, total, count) in sorted(self._series.items())]
+        for labels, counts, total, count in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._labels(labels, le=repr(float(bound)))} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._labels(labels, le='+Inf')} {count}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {total!r}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    'resume_stage_duration_seconds', "Time spent in each stage of the screening pipeline.",
+    ['stage'], settings.METRICS_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    'resume_request_duration_seconds', "Time to build the response of each view.",
+    ['view', 'method', 'status'], settings.METRICS_BUCKETS,
+)
+
+
+def render_metrics():
+    return STAGE_SECONDS.render() + REQUEST_SECONDS.render()
+
+
+# Spans ----------------------------------------------------------------------
+
+def record(stage, seconds):
+    """Record a stage's duration for the current request, or straight into the histogram outside one."""
+    spans = _request_spans.get()
+    if spans is None:
+        STAGE_SECONDS.observe(seconds, stage)
+    else:
+        spans.append((stage, seconds))
+
+
+@contextmanager
+def span(stage):
+    """Time the enclosed block as `stage`; also usable as a function decorator."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def collect_spans(fn, *args):
+    """
+    Run `fn(*args)` in an executor worker and return `(result, spans)`.
+
+    Worker threads and processes do not see the request's spans, so the
+    stages timed inside them travel back with the result and are recorded
+    by the caller.
+    """
+    token = _request_spans.set([])
+    try:
+        return fn(*args), _request_spans.get()
+    finally:
+        _request_spans.reset(token)
+
+
+def start_request():
+    return _request_spans.set([])
+
+
+def finish_request(token):
+    """Observe the current request's spans; returns them summed per stage, in first-seen order."""
+    spans = _request_spans.get() or []
+    _request_spans.reset(token)
+    totals = {}
+    for stage, seconds in spans:
+        STAGE_SECONDS.observe(seconds, stage)
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    return totals
+
+
+def server_timing(totals, total_seconds):
+    """A `Server-Timing` header value with one entry per stage plus the whole view."""
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in totals.items()]
+    entries.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(entries)
+
+
+# Profiling ------------------------------------------------------------------
+
+# Held while a request is profiled; profilers of one process cannot overlap
+_profiling = threading.Lock()
+
+# The profiler of an async request whose executor work is to be profiled
+_request_profiler = ContextVar('request_profiler', default=None)
+
+
+def current_profiler():
+    """The profiler waiting for the current request's executor work, if any."""
+    return _request_profiler.get()
+
+
+class RequestProfiler:
+    """
+    Profile one request with cProfile, or pyinstrument when asked for and
+    installed, and dump the result under PROFILE_DIR.
+
+    On the sync path the thread serving the request is profiled. cProfile
+    cannot tell the coroutines of an event loop apart, so for a request
+    served on one (`on_loop`) it would time every other request the loop
+    ran meanwhile; it then only profiles the work the request hands to the
+    scoring executor (see `profile_call`). pyinstrument's async mode
+    follows the request's own context, so it also covers the async view,
+    and is the one to ask for there. Work in the extraction processes
+    shows up as the wait for its result.
+
+    One request per process is profiled at a time; `start` returns False
+    while another one is.
+    """
+
+    def __init__(self, kind, label):
+        self.kind = kind
+        self.label = label
+        self.path = None
+        self._profiler = None
+        self._token = None
+
+    def start(self, on_loop=False):
+        if not _profiling.acquire(blocking=False):
+            return False
+        if self.kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                self.kind = 'cprofile'
+            else:
+                self._profiler = Profiler(async_mode='enabled')
+                self._profiler.start()
+                return True
+        import cProfile
+
+        self._profiler = cProfile.Profile()
+        if on_loop:
+            self._token = _request_profiler.set(self)
+        else:
+            self._profiler.enable()
+        return True
+
+    def profile_call(self, fn, *args):
+        """Run `fn(*args)` under the profiler, on the calling (executor) thread."""
+        return self._profiler.runcall(fn, *args)
+
+    def stop(self):
+        try:
+            if self.kind == 'pyinstrument':
+                self._profiler.stop()
+            elif self._token is not None:
+                _request_profiler.reset(self._token)
+            else:
+                self._profiler.disable()
+        finally:
+            _profiling.release()
+
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        name = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09d}-{self.label}"
+        if self.kind == 'pyinstrument':
+            self.path = os.path.join(settings.PROFILE_DIR, name + ".html")
+            with open(self.path, "w", encoding='utf-8') as f:
+                f.write(self._profiler.output_html())
+        else:
+            self.path = os.path.join(settings.PROFILE_DIR, name + ".prof")
+            self._profiler.dump_stats(self.path)
+        return self.path
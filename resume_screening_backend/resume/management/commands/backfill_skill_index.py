@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from resume.models import Resume
+from resume.skill_index import index_resumes, recount_skills
+
+
+class Command(BaseCommand):
+    help = "Build the skill posting lists for resumes that were stored before the index existed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Number of resumes to index per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        resumes = Resume.objects.only('id', 'skills').order_by('id')
+
+        batch = []
+        indexed = 0
+        for resume in resumes.iterator(chunk_size=batch_size):
+            batch.append(resume)
+            if len(batch) >= batch_size:
+                index_resumes(batch)
+                indexed += len(batch)
+                batch = []
+                self.stdout.write(f"Indexed {indexed} resumes...")
+        if batch:
+            index_resumes(batch)
+            indexed += len(batch)
+
+        recount_skills()
+        self.stdout.write(self.style.SUCCESS(f"Skill index built for {indexed} resumes."))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from resume.bm25 import build_bm25_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the BM25 postings index from every stored resume text. Uploads "
+        "keep it up to date afterwards, so this is only needed once, or after "
+        "changing the tokenizer."
+    )
+
+    def handle(self, *args, **options):
+        index = build_bm25_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {index.doc_count} resumes in {len(index.segments)} segments."
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from resume.embeddings import build_embedding_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-embed every resume into a new semantic search index. Run it after "
+        "changing the embedder, and as the corpus grows so that the IVF lists "
+        "are retrained and cover newly appended vectors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lists', type=int, default=None,
+            help="Number of IVF lists (defaults to EMBEDDING_IVF_LISTS or sqrt of the corpus size).",
+        )
+
+    def handle(self, *args, **options):
+        index = build_embedding_index(n_lists=options['lists'])
+        kind = f"IVF with {len(index.ivf['centroids'])} lists" if index.ivf else "exact scan"
+        self.stdout.write(self.style.SUCCESS(
+            f"Embedded {int(index.live.sum())} resumes ({kind})."
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from resume.feature_store import build_feature_store
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy every resume into a new memory-mapped feature store (skill bitsets, "
+        "TF-IDF rows and upload times) for the skill filter and hybrid ranking. "
+        "Run it after refitting TF-IDF or changing the skill taxonomy."
+    )
+
+    def handle(self, *args, **options):
+        store = build_feature_store()
+        text = "with" if store.meta['tfidf_fitted_at'] is not None else "without"
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored {int(store.live.sum())} resumes over {len(store.columns)} skill columns, "
+            f"{text} text vectors."
+        ))
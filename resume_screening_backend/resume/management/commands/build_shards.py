@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.sharding import build_shard_stores, shard_root
+
+
+class Command(BaseCommand):
+    help = (
+        "Build one feature store per shard of SEARCH_SHARDS from the resumes it owns "
+        "(by SEARCH_SHARD_STRATEGY). Run it after refitting TF-IDF or changing the "
+        "shard layout, on each host serving shards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shard', type=int, action='append', help="Only build this shard (may be repeated).",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SEARCH_SHARDS:
+            raise CommandError("SEARCH_SHARDS is empty; there are no shards to build")
+        shards = options['shard']
+        for shard in shards or ():
+            if not 0 <= shard < len(settings.SEARCH_SHARDS):
+                raise CommandError(f"Shard {shard} is not in SEARCH_SHARDS")
+
+        for shard, store in build_shard_stores(shards).items():
+            self.stdout.write(f"Shard {shard}: {int(store.live.sum())} resumes in {shard_root(shard)}")
+        self.stdout.write(self.style.SUCCESS("Shard indexes built."))
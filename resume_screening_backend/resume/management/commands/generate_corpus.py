@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.corpus_generator import WRITERS, generate_files, seed_database
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic corpus of PDF/DOCX resumes and job descriptions for benchmarking."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1000, help="Number of resumes (1k to 1M).")
+        parser.add_argument('--out', help="Directory the documents are written to.")
+        parser.add_argument(
+            '--formats', default='pdf,docx', help="Comma-separated document formats, used in turn.",
+        )
+        parser.add_argument('--jds', type=int, default=20, help="Number of job descriptions to write.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same corpus.")
+        parser.add_argument(
+            '--into-db', action='store_true',
+            help="Insert the resumes straight into the database instead of writing documents.",
+        )
+        parser.add_argument('--batch-size', type=int, default=2000, help="Resumes per bulk_create batch with --into-db.")
+
+    def handle(self, *args, **options):
+        if options['count'] < 1:
+            raise CommandError("--count must be at least 1")
+
+        if options['into_db']:
+            def progress(created):
+                self.stdout.write(f"{created}/{options['count']} resumes inserted")
+
+            created = seed_database(
+                options['count'], seed=options['seed'], batch_size=options['batch_size'], progress=progress
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Inserted {created} synthetic resumes; rebuild the search indexes before benchmarking"
+            ))
+            return
+
+        if not options['out']:
+            raise CommandError("Pass --out, or --into-db to seed the database")
+        formats = tuple(f".{name.strip().lstrip('.').lower()}" for name in options['formats'].split(",") if name.strip())
+        unknown = [extension for extension in formats if extension not in WRITERS]
+        if unknown or not formats:
+            raise CommandError(f"Unsupported formats: {', '.join(unknown) or options['formats']}")
+
+        paths = generate_files(
+            options['out'], options['count'], formats=formats, jd_count=options['jds'], seed=options['seed']
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(paths)} resumes and {options['jds']} job descriptions to {options['out']}"
+        ))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.ingest import create_job, run_job
+from resume.models import IngestJob
+
+
+class Command(BaseCommand):
+    help = "Bulk-ingest resumes from a ZIP archive or a directory using a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', nargs='?', help="ZIP archive or directory of .pdf/.docx/.doc/.rtf/.txt resumes.")
+        parser.add_argument(
+            '--job', type=int,
+            help="Resume the pending items of an existing ingest job instead of queueing a new one.",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=None,
+            help="Number of parser processes (defaults to the number of CPU cores).",
+        )
+        parser.add_argument('--batch-size', type=int, default=None, help="Resumes per bulk_create batch.")
+
+    def handle(self, *args, **options):
+        if options['job']:
+            job_id = options['job']
+            if not IngestJob.objects.filter(pk=job_id).exists():
+                raise CommandError(f"Ingest job {job_id} does not exist")
+        elif options['source']:
+            try:
+                job_id = create_job(options['source']).pk
+            except ValueError as e:
+                raise CommandError(str(e))
+        else:
+            raise CommandError("Pass a ZIP archive or directory, or --job to resume a job")
+
+        def progress(job):
+            self.stdout.write(f"Job {job.pk}: {job.processed}/{job.total} processed, {job.failed} failed")
+
+        job = run_job(
+            job_id, workers=options['workers'], batch_size=options['batch_size'], progress=progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Ingested {job.processed - job.failed} of {job.total} resumes ({job.failed} failed)."
+        ))
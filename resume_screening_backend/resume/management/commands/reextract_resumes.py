@@ -0,0 +1,101 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from resume.extractors import EXTRACTORS
+from resume.models import Resume
+from resume.parsing import PARSE_VERSION, normalize_phone
+from resume.skill_matcher import get_skill_matcher
+from resume.storage import cached_extraction, hash_file
+
+
+def contact_key(email, phone):
+    """
+    `(email, phone)` in the form extraction stores them: lowercased, E.164.
+
+    Legacy rows hold the phone number as it was written, so both sides are
+    normalized before they are compared.
+    """
+    phone = normalize_phone(phone, settings.PHONE_DEFAULT_COUNTRY_CODE) if phone else None
+    return (email or "").strip().lower(), phone or ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-extract text and fields for resumes stored by an older parser, reading "
+        "the original files from the upload directory."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--upload-dir', default=None,
+            help="Directory holding the uploaded files (defaults to UPLOAD_DIR).",
+        )
+
+    def _scan_files(self, upload_dir):
+        """Hash and extract every resume file under `upload_dir`."""
+        for root, _, files in os.walk(upload_dir):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() not in EXTRACTORS:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    content_hash = hash_file(path)
+                    text, extracted_data = cached_extraction(content_hash, path)
+                except Exception as e:
+                    self.stderr.write(f"Skipping {path}: {e}")
+                    continue
+                yield content_hash, text, extracted_data
+
+    def handle(self, *args, **options):
+        upload_dir = options['upload_dir'] or settings.UPLOAD_DIR
+        stale = Resume.objects.filter(parse_version__lt=PARSE_VERSION)
+        if not stale.exists():
+            self.stdout.write("Every resume is at the current parse version.")
+            return
+
+        # Rows are matched to files by content hash; legacy rows carry no hash,
+        # so they are matched on the contact details extracted from the file.
+        by_hash = {}
+        by_contact = {}
+        for content_hash, text, extracted_data in self._scan_files(upload_dir):
+            by_hash[content_hash] = (text, extracted_data)
+            contact = contact_key(extracted_data['email'], extracted_data['phone'])
+            if any(contact):
+                by_contact.setdefault(contact, (content_hash, text, extracted_data))
+
+        assigned_hashes = set(
+            Resume.objects.exclude(content_hash__isnull=True).values_list('content_hash', flat=True)
+        )
+        updated = unmatched = 0
+        for resume in stale.order_by('id').iterator(chunk_size=500):
+            if resume.content_hash in by_hash:
+                content_hash = resume.content_hash
+                text, extracted_data = by_hash[content_hash]
+            elif contact_key(resume.email, resume.phone) in by_contact:
+                content_hash, text, extracted_data = by_contact[contact_key(resume.email, resume.phone)]
+                if content_hash in assigned_hashes:
+                    content_hash = resume.content_hash  # The file already belongs to another row
+            else:
+                unmatched += 1
+                continue
+
+            resume.name = extracted_data['name'] or ""
+            resume.email = extracted_data['email'] or ""
+            resume.phone = extracted_data['phone'] or ""
+            resume.skills = ", ".join(extracted_data['skills'])
+            resume.resume_text = text
+            resume.content_hash = content_hash
+            resume.parse_version = PARSE_VERSION
+            resume.taxonomy_version = get_skill_matcher().version
+            resume.save()
+            if content_hash:
+                assigned_hashes.add(content_hash)
+            updated += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Re-extracted {updated} resumes."))
+        if unmatched:
+            self.stdout.write(self.style.WARNING(
+                f"{unmatched} resumes have no matching file in {upload_dir} and were left as they are."
+            ))
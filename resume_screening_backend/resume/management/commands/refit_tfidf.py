@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from resume.corpus_model import fit_corpus_model, get_corpus_model
+
+
+class Command(BaseCommand):
+    help = (
+        "Refit the persisted TF-IDF corpus model. Meant to be run on a schedule "
+        "(e.g. from cron); with --if-drifted it only refits once vocabulary drift "
+        "crosses TFIDF_DRIFT_THRESHOLD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-drifted', action='store_true',
+            help="Skip the refit unless the drift threshold has been crossed.",
+        )
+
+    def handle(self, *args, **options):
+        if options['if_drifted']:
+            model = get_corpus_model()
+            if model is not None and model.drift < settings.TFIDF_DRIFT_THRESHOLD:
+                self.stdout.write(f"Vocabulary drift is {model.drift:.1%}; no refit needed.")
+                return
+
+        model = fit_corpus_model()
+        if model is None:
+            self.stdout.write("No resume text to fit on.")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Fitted TF-IDF model on {len(model.resume_ids)} resumes "
+            f"({len(model.vocabulary)} terms)."
+        ))
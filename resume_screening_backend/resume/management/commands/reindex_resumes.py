@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.models import ReindexJob
+from resume.reindex import create_reindex_job, run_reindex
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-derive skills and contact fields of stored resumes after the parser or the "
+        "skill taxonomy changed, then rebuild the search indexes. Resumes already at the "
+        "current versions are skipped; an interrupted run resumes from its checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--job', type=int, help="Resume a specific reindex job.")
+        parser.add_argument('--workers', type=int, default=None, help="Number of parser processes.")
+        parser.add_argument('--chunk-size', type=int, default=None, help="Resumes per chunk.")
+        parser.add_argument('--pause', type=float, default=None, help="Seconds to sleep after each chunk.")
+        parser.add_argument(
+            '--max-load', type=float, default=None,
+            help="Wait between chunks while the load average per CPU is above this.",
+        )
+        parser.add_argument(
+            '--skip-indexes', action='store_true', help="Do not rebuild the search indexes afterwards.",
+        )
+
+    def handle(self, *args, **options):
+        if options['job']:
+            try:
+                job = ReindexJob.objects.get(pk=options['job'])
+            except ReindexJob.DoesNotExist:
+                raise CommandError(f"Reindex job {options['job']} does not exist")
+        else:
+            job = create_reindex_job()
+            if not job.total:
+                job.status = ReindexJob.STATUS_DONE
+                job.save(update_fields=['status', 'updated_at'])
+                self.stdout.write("Every resume is at the current parse and taxonomy version.")
+                return
+
+        def progress(job):
+            self.stdout.write(f"Job {job.pk}: {job.processed}/{job.total} resumes re-derived")
+
+        job = run_reindex(
+            job.pk, workers=options['workers'], chunk_size=options['chunk_size'], pause=options['pause'],
+            max_load=options['max_load'], rebuild_indexes=not options['skip_indexes'], progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Reindex job {job.pk} finished: {job.processed} resumes re-derived, "
+            f"{job.reextracted} of them from their original file."
+        ))
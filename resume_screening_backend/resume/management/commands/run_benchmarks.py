@@ -0,0 +1,134 @@
+import json
+import os
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.benchmarks import BENCHMARKS, DEFAULT_REGRESSION_THRESHOLD, compare_to_baseline, run_benchmarks
+from resume.corpus_generator import WRITERS, generate_files, job_description, skill_vocabulary
+from resume.parsing import extract_resume_text
+
+RANKING_MODES = ('skills', 'tfidf', 'bm25', 'semantic', 'hybrid')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark extraction, the upload and get_results endpoints and the scoring kernels, "
+        "and report throughput, p50/p95/p99 latency and peak RSS as JSON. The upload "
+        "benchmark stores new resumes, so run it against a scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--corpus',
+            help="Directory from generate_corpus; a small sample is generated when omitted.",
+        )
+        parser.add_argument('--sample-size', type=int, default=40, help="Documents sampled from the corpus.")
+        parser.add_argument(
+            '--benchmarks', default=",".join(BENCHMARKS),
+            help=f"Comma-separated benchmarks to run ({', '.join(BENCHMARKS)}).",
+        )
+        parser.add_argument('--iterations', type=int, default=50, help="Timed calls per benchmark.")
+        parser.add_argument(
+            '--modes', default=",".join(RANKING_MODES), help="get_results modes to benchmark.",
+        )
+        parser.add_argument(
+            '--kernel-rows', type=int, default=1_000_000, help="Scores per call of the top-k kernel.",
+        )
+        parser.add_argument('--output', help="Write the JSON report here instead of to stdout.")
+        parser.add_argument('--baseline', help="JSON report of an earlier run to compare against.")
+        parser.add_argument(
+            '--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+            help="Relative slowdown that counts as a regression (default 0.10).",
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true', help="Exit with an error if a regression is found.",
+        )
+
+    def _load_inputs(self, corpus, sample_size, tmp):
+        """Sample documents and JDs from `corpus`, or generate them under `tmp`."""
+        if corpus is None:
+            corpus = os.path.join(tmp, "corpus")
+            generate_files(corpus, sample_size, jd_count=10)
+        elif not os.path.isdir(corpus):
+            raise CommandError(f"{corpus} is not a directory")
+
+        paths = []
+        for root, _, files in sorted(os.walk(corpus)):
+            paths += [
+                os.path.join(root, name) for name in sorted(files)
+                if os.path.splitext(name)[1].lower() in WRITERS
+            ]
+            if len(paths) >= sample_size:
+                break
+        paths = paths[:sample_size]
+        if not paths:
+            raise CommandError(f"No .pdf or .docx files under {corpus}")
+
+        jd_dir = os.path.join(corpus, "job_descriptions")
+        jds = []
+        if os.path.isdir(jd_dir):
+            for name in sorted(os.listdir(jd_dir)):
+                with open(os.path.join(jd_dir, name), encoding='utf-8') as f:
+                    jds.append(f.read())
+        if not jds:
+            import random
+
+            rng, vocabulary = random.Random(0), skill_vocabulary()
+            jds = [job_description(rng, vocabulary) for _ in range(10)]
+        return paths, jds
+
+    def handle(self, *args, **options):
+        names = [name.strip() for name in options['benchmarks'].split(",") if name.strip()]
+        unknown = [name for name in names if name not in BENCHMARKS]
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(unknown)}")
+        modes = [mode.strip() for mode in options['modes'].split(",") if mode.strip()]
+        if any(mode not in RANKING_MODES for mode in modes):
+            raise CommandError(f"Modes must be among: {', '.join(RANKING_MODES)}")
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1")
+
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            paths, jds = self._load_inputs(options['corpus'], options['sample_size'], tmp)
+            texts = [extract_resume_text(path) for path in paths]
+            upload_paths = []
+            if 'upload_resume' in names:
+                # Fresh documents: uploads of files already stored only measure the duplicate check
+                upload_paths = generate_files(
+                    os.path.join(tmp, "uploads"), options['iterations'] + 1,
+                    seed=time.time_ns(), start=time.time_ns() % 10**6 * 1000,
+                )
+
+            report = run_benchmarks(
+                names,
+                progress=lambda name: self.stderr.write(f"Running {name}..."),
+                paths=paths, texts=texts, jds=jds, upload_paths=upload_paths, modes=modes,
+                iterations=options['iterations'], kernel_rows=options['kernel_rows'],
+            )
+
+        if baseline is not None:
+            report['baseline'] = baseline.get('meta', {}).get('started_at')
+            report['threshold'] = options['threshold']
+            report['regressions'] = compare_to_baseline(report, baseline, options['threshold'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], "w") as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
+
+        for regression in report.get('regressions', []):
+            self.stderr.write(self.style.WARNING(
+                f"Regression in {regression['benchmark']} {regression['metric']}: "
+                f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.1%})"
+            ))
+        if options['fail_on_regression'] and report.get('regressions'):
+            raise CommandError(f"{len(report['regressions'])} regressions against {options['baseline']}")
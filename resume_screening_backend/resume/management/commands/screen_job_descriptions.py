@@ -0,0 +1,74 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from resume.batch_screening import batch_shortlists, create_batch, run_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Rank the corpus against many job descriptions in one pass over the TF-IDF matrix "
+        "and store a top-k shortlist per job description."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'sources', nargs='+',
+            help="Text files with one job description each, or directories of .txt files.",
+        )
+        parser.add_argument('--top-k', type=int, default=settings.RESULTS_DEFAULT_TOP_K)
+        parser.add_argument(
+            '--min-score', type=float, default=settings.RESULTS_DEFAULT_MIN_SCORE,
+            help="Minimum similarity in percent.",
+        )
+        parser.add_argument('--output', help="Also write the shortlists to this JSON file.")
+
+    def _read_sources(self, sources):
+        files = []
+        for source in sources:
+            if os.path.isdir(source):
+                files += sorted(
+                    os.path.join(source, name) for name in os.listdir(source) if name.lower().endswith(".txt")
+                )
+            elif os.path.isfile(source):
+                files.append(source)
+            else:
+                raise CommandError(f"{source} does not exist")
+        job_descriptions = []
+        for path in files:
+            with open(path, encoding='utf-8') as f:
+                text = f.read()
+            if text.strip():
+                job_descriptions.append((path, text))
+        return job_descriptions
+
+    def handle(self, *args, **options):
+        job_descriptions = self._read_sources(options['sources'])
+        if not job_descriptions:
+            raise CommandError("No job descriptions found")
+        if options['top_k'] < 1:
+            raise CommandError("--top-k must be at least 1")
+
+        batch = create_batch([text for _, text in job_descriptions], options['top_k'], options['min_score'])
+        batch = run_batch(batch.pk)
+        shortlists = batch_shortlists(batch)
+
+        if options['output']:
+            with open(options['output'], "w") as f:
+                json.dump(
+                    {
+                        'batch_id': batch.pk,
+                        'shortlists': [
+                            {'source': path, 'resumes': shortlist}
+                            for (path, _), shortlist in zip(job_descriptions, shortlists)
+                        ],
+                    },
+                    f, indent=2,
+                )
+        for (path, _), shortlist in zip(job_descriptions, shortlists):
+            self.stdout.write(f"{path}: {len(shortlist)} resumes shortlisted")
+        self.stdout.write(self.style.SUCCESS(
+            f"Screening batch {batch.pk}: {len(job_descriptions)} job descriptions ranked in one pass."
+        ))
@@ -0,0 +1,53 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from resume.sharding import make_shard_server
+
+
+def serve_shard(shard):
+    make_shard_server(shard).serve_forever()
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the shards of SEARCH_SHARDS, one worker process per shard, each "
+        "answering queries from its own feature store (see build_shards)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shard', type=int, action='append',
+            help="Only serve this shard (may be repeated); by default every shard is served.",
+        )
+
+    def handle(self, *args, **options):
+        if not settings.SEARCH_SHARDS:
+            raise CommandError("SEARCH_SHARDS is empty; there are no shards to serve")
+        shards = options['shard'] or range(len(settings.SEARCH_SHARDS))
+        for shard in shards:
+            if not 0 <= shard < len(settings.SEARCH_SHARDS):
+                raise CommandError(f"Shard {shard} is not in SEARCH_SHARDS")
+
+        # Shard servers never touch the database; do not hand them this process's connections
+        connections.close_all()
+        processes = []
+        for shard in shards:
+            process = multiprocessing.Process(target=serve_shard, args=(shard,), name=f"shard-{shard}", daemon=True)
+            process.start()
+            processes.append(process)
+            self.stdout.write(f"Shard {shard} serving on {settings.SEARCH_SHARDS[shard]} (pid {process.pid})")
+
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                process.join()
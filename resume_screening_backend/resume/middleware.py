@@ -0,0 +1,82 @@
+# resume/middleware.py
+
+import os
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .instrumentation import REQUEST_SECONDS, RequestProfiler, finish_request, server_timing, start_request
+
+PROFILE_KINDS = ('cprofile', 'pyinstrument')
+
+
+class InstrumentationMiddleware:
+    """
+    Time every request and the pipeline stages it went through.
+
+    The stage spans recorded while the view ran go into the stage
+    histograms and, summed per stage, into a `Server-Timing` header.
+    With PROFILE_REQUESTS on, a request sent with `X-Profile: cprofile`
+    (or `pyinstrument`) is profiled as well; the dump's file name under
+    PROFILE_DIR comes back in `X-Profile-Path`. On the event loop cProfile
+    only sees the scoring executor's share of the request (see
+    `RequestProfiler`).
+
+    Streamed responses are timed up to their first byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        state = self._start(request, on_loop=False)
+        response = None
+        try:
+            response = self.get_response(request)
+        finally:
+            self._finish(request, response, *state)
+        return response
+
+    async def __acall__(self, request):
+        state = self._start(request, on_loop=True)
+        response = None
+        try:
+            response = await self.get_response(request)
+        finally:
+            self._finish(request, response, *state)
+        return response
+
+    def _start(self, request, on_loop):
+        profiler = None
+        kind = request.headers.get('X-Profile', '').strip().lower()
+        if settings.PROFILE_REQUESTS and kind in PROFILE_KINDS:
+            label = request.path.strip('/').replace('/', '-') or 'root'
+            profiler = RequestProfiler(kind, label)
+            if not profiler.start(on_loop):
+                profiler = None  # Another request is being profiled
+        return start_request(), profiler, time.perf_counter()
+
+    def _finish(self, request, response, token, profiler, start):
+        elapsed = time.perf_counter() - start
+        totals = finish_request(token)
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unresolved'
+        status = response.status_code if response is not None else 500
+        REQUEST_SECONDS.observe(elapsed, view, request.method, status)
+
+        path = profiler.stop() if profiler is not None else None
+        if response is None:
+            return
+        if settings.SERVER_TIMING_ENABLED:
+            response['Server-Timing'] = server_timing(totals, elapsed)
+        if path:
+            response['X-Profile-Path'] = os.path.basename(path)
@@ -0,0 +1,106 @@
+# resume/model_registry.py
+
+import logging
+import threading
+import time
+
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# What each on-disk search index the registry loads is, and the command building it
+BUILD_COMMANDS = {
+    'tfidf': ("TF-IDF model", 'refit_tfidf'),
+    'bm25': ("BM25 index", 'build_bm25_index'),
+    'embedding_index': ("embedding index", 'build_embedding_index'),
+    'feature_store': ("feature store", 'build_feature_store'),
+}
+
+
+class IndexNotBuilt(Exception):
+    """
+    A request needs a search index that was never built.
+
+    Building one means a pass over the whole corpus, so requests never do
+    it themselves; the message names the management command that does.
+    """
+
+    def __init__(self, name):
+        label, command = BUILD_COMMANDS[name]
+        super().__init__(f"The {label} has not been built yet; run `python manage.py {command}`")
+        self.name = name
+
+
+class ModelRegistry:
+    """
+    Lazily loaded, process-wide models (spaCy pipelines, indexes, ...).
+
+    Loaders are registered by dotted path and only imported and run on the
+    first `get`, so commands and requests that never touch NLP never pay for
+    it. `preload` loads everything up front, e.g. in the gunicorn master
+    before workers fork so they share the pages copy-on-write.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._load_times = {}
+        # Reentrant: a loader may get the models it depends on (an index its embedder)
+        self._lock = threading.RLock()
+
+    def register(self, name, loader, cache=True):
+        """
+        Register `loader` (a callable or dotted path) under `name`.
+
+        With `cache=False` the loader keeps its own cache (e.g. to pick up a
+        refitted index) and is called on every `get`; the registry then only
+        times the first load and takes part in `preload`.
+        """
+        self._loaders[name] = (loader, cache)
+
+    def get(self, name):
+        try:
+            return self._models[name]
+        except KeyError:
+            pass
+        loader, cache = self._loaders[name]
+        if isinstance(loader, str):
+            loader = import_string(loader)
+        if not cache and name in self._load_times:
+            return loader()
+        with self._lock:
+            if name in self._models:
+                return self._models[name]
+            start = time.perf_counter()
+            model = loader()
+            self._load_times[name] = time.perf_counter() - start
+            logger.info("Loaded model %r in %.2fs", name, self._load_times[name])
+            if cache:
+                self._models[name] = model
+            return model
+
+    def require(self, name):
+        """`get` for an on-disk index, raising `IndexNotBuilt` rather than returning None."""
+        model = self.get(name)
+        if model is None:
+            raise IndexNotBuilt(name)
+        return model
+
+    def preload(self, names=None):
+        """Load the given (default: all registered) models; returns their load times."""
+        for name in names or list(self._loaders):
+            self.get(name)
+        return self.load_times
+
+    @property
+    def load_times(self):
+        return dict(self._load_times)
+
+
+registry = ModelRegistry()
+registry.register('skill_matcher', 'resume.skill_matcher.load_skill_matcher')
+registry.register('tfidf', 'resume.corpus_model.get_corpus_model', cache=False)
+registry.register('embedder', 'resume.embeddings.load_embedder')
+registry.register('embedding_index', 'resume.embeddings.get_embedding_index', cache=False)
+registry.register('bm25', 'resume.bm25.get_bm25_index', cache=False)
+registry.register('feature_store', 'resume.feature_store.get_feature_store', cache=False)
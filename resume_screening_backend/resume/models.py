@@ -1,15 +1,180 @@
 # resume/models.py
 
 from django.db import models
+from django.utils import timezone
+
+from .fields import CompressedTextField
 
 class Resume(models.Model):
+    # Rows stored before the text was kept hold no usable `resume_text`
+    LEGACY_PARSE_VERSION = 0
+
     name = models.CharField(max_length=255)
     email = models.EmailField(max_length=255)
     phone = models.CharField(max_length=20)
     skills = models.TextField(blank=True)# Stores skills as comma-separated values
-    resume_text = models.TextField(null=True, blank=True)  
+    resume_text = CompressedTextField(null=True, blank=True)  # Full extracted text, zlib-compressed
+    content_hash = models.CharField(max_length=64, unique=True, null=True, blank=True)  # SHA-256 of the uploaded file
+    parse_version = models.PositiveSmallIntegerField(default=LEGACY_PARSE_VERSION, db_index=True)  # PARSE_VERSION of the extractor that produced this row
+    taxonomy_version = models.CharField(max_length=16, blank=True, db_index=True)  # Fingerprint of the skill taxonomy `skills` was matched with
+    uploaded_at = models.DateTimeField(default=timezone.now)  # Feeds the recency signal of hybrid ranking
 
     # Add any other fields that you need to store
 
     def __str__(self):
         return self.name
+
+
+class Skill(models.Model):
+    """Canonical skill name with the number of resumes that list it."""
+    name = models.CharField(max_length=100, unique=True)
+    resume_count = models.PositiveIntegerField(default=0)  # Document frequency, used to pick the rarest skill first
+
+    def __str__(self):
+        return self.name
+
+
+class ResumeSkill(models.Model):
+    """Posting-list entry linking a canonical skill to a resume."""
+    skill = models.ForeignKey(Skill, on_delete=models.CASCADE, related_name='postings')
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='skill_postings')
+
+    class Meta:
+        # Leading with `skill` makes the unique index double as the posting list
+        unique_together = ('skill', 'resume')
+
+    def __str__(self):
+        return f"{self.skill_id} -> {self.resume_id}"
+
+
+class IngestJob(models.Model):
+    """A bulk upload (ZIP archive or directory) being parsed into resumes."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    source = models.CharField(max_length=1024)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ingest job {self.pk} ({self.status})"
+
+
+class IngestItem(models.Model):
+    """One file of an ingest job; pending items form the work queue."""
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job = models.ForeignKey(IngestJob, on_delete=models.CASCADE, related_name='items')
+    path = models.CharField(max_length=1024)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    error = models.TextField(blank=True)
+    resume = models.ForeignKey(Resume, null=True, blank=True, on_delete=models.SET_NULL)
+
+    class Meta:
+        indexes = [models.Index(fields=['job', 'status'])]
+
+    def __str__(self):
+        return self.path
+
+
+class CorpusVersion(models.Model):
+    """Single-row counter bumped whenever the searchable resumes change; cached results are keyed on it."""
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Corpus version {self.version}"
+
+
+class ReindexJob(models.Model):
+    """
+    A pass re-deriving the fields of stored resumes after the parser or the
+    skill taxonomy changed.
+
+    Resumes are processed in id order; `last_resume_id` is the checkpoint
+    an interrupted job resumes from.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    parse_version = models.PositiveSmallIntegerField()  # Versions the resumes are brought to
+    taxonomy_version = models.CharField(max_length=16)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    total = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    reextracted = models.PositiveIntegerField(default=0)  # Of which the original file was parsed again
+    last_resume_id = models.PositiveBigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Reindex job {self.pk} ({self.status})"
+
+
+class ScreeningBatch(models.Model):
+    """Job descriptions ranked against the corpus together, in one pass over the resumes."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job_descriptions = models.JSONField()  # List of JD texts; shortlists refer to them by index
+    top_k = models.PositiveIntegerField()
+    min_score = models.FloatField()  # Percent, like `similarity`
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Screening batch {self.pk} ({self.status})"
+
+
+class ShortlistEntry(models.Model):
+    """One ranked resume of a JD's shortlist within a screening batch."""
+    batch = models.ForeignKey(ScreeningBatch, on_delete=models.CASCADE, related_name='entries')
+    jd_index = models.PositiveIntegerField()
+    rank = models.PositiveIntegerField()
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='shortlist_entries')
+    score = models.FloatField()
+
+    class Meta:
+        # Doubles as the index reading one JD's shortlist in rank order
+        unique_together = ('batch', 'jd_index', 'rank')
+
+    def __str__(self):
+        return f"{self.batch_id}/{self.jd_index} #{self.rank} -> {self.resume_id}"
@@ -0,0 +1,170 @@
+# resume/parsing.py
+
+import os
+import re
+
+from django.conf import settings
+
+from .extractors import EXTRACTORS
+from .instrumentation import span
+from .skill_matcher import get_skill_matcher
+
+# Bump whenever text or field extraction changes; rows (and cached
+# extractions) with an older version are re-extracted
+PARSE_VERSION = 3
+
+# Name and contact details are expected in the header of a resume; fields
+# found past it get a lower confidence, and nothing past CONTACT_SCAN_CHARS
+# is read, so long documents cost a bounded amount of work per field
+CONTACT_HEADER_CHARS = 1500
+CONTACT_SCAN_CHARS = 20000
+NAME_HEADER_LINES = 5
+
+EMAIL_RE = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+PHONE_RE = re.compile(r"\+?\d{1,3}[-.\s]?\(?\d{2,4}\)?[-.\s]?\d{2,4}[-.\s]?\d{4,10}")
+NON_DIGITS_RE = re.compile(r"\D")
+# "First Last", optionally with a middle name or initials
+NAME_RE = re.compile(r"[A-Z][a-z]+(?:\s+(?:[A-Z][a-z]+|[A-Z]\.)){0,2}\s+[A-Z][a-z]+")
+UPPERCASE_NAME_RE = re.compile(r"[A-Z]{2,}(?:\s+[A-Z]{2,}){1,3}")
+
+
+# Function to extract data from uploaded resume (example)
+def extract_resume_data(file_path):
+    text = extract_resume_text(file_path)
+    return extract_fields(text)
+
+
+def extract_fields(text):
+    """Extract the contact fields and skills from a resume's text."""
+    # Extract dynamic information using regex
+    extracted_data = extract_contact_fields(text)
+    extracted_data['skills'] = extract_skills_nlp(text)
+
+    return extracted_data
+
+
+def extract_resume_text(file_path):
+    """Extract the plain text of a resume with the handler registered for its extension."""
+    file_extension = os.path.splitext(file_path)[1].lower()
+    extractor = EXTRACTORS.get(file_extension)
+    if extractor is None:
+        raise ValueError(f"Unsupported file format: Only {', '.join(EXTRACTORS)} files are supported")
+
+    try:
+        # Extract text from the file
+        with span(f"extract.{file_extension.lstrip('.')}"):
+            text = extractor(file_path)
+    except Exception as e:
+        raise ValueError(f"Error extracting data from resume: {str(e)}")
+
+    if not text.strip():
+        raise ValueError("No text could be extracted from the file")
+
+    return text
+
+
+def extract_contact_fields(text):
+    """
+    Extract the name, email and phone fields of a resume, with a
+    confidence in [0, 1] for each field that was found.
+    """
+    name, name_confidence = find_name(text)
+    email, email_confidence = find_email(text)
+    phone, phone_confidence = find_phone(text)
+    return {
+        'name': name,
+        'email': email,
+        'phone': phone,
+        'confidence': {'name': name_confidence, 'email': email_confidence, 'phone': phone_confidence},
+    }
+
+
+def extract_email(text):
+    return find_email(text)[0]
+
+
+def extract_phone(text):
+    return find_phone(text)[0]
+
+
+def extract_name(text):
+    return find_name(text)[0]
+
+
+@span('extract.email')
+def find_email(text):
+    """The first email address, lowercased, and its confidence."""
+    match = EMAIL_RE.search(text, 0, CONTACT_SCAN_CHARS)
+    if match is None:
+        return None, 0.0
+    email = match.group().rstrip(".-").lower()
+    return email, 1.0 if match.start() < CONTACT_HEADER_CHARS else 0.7
+
+
+def normalize_phone(raw, default_country_code=None):
+    """
+    `raw` as an E.164 number ("+919876543210"), or None if it cannot be one.
+
+    Numbers written without a country code (10 digits, or 11 with a
+    leading trunk 0) get `default_country_code`.
+    """
+    digits = NON_DIGITS_RE.sub("", raw)
+    if raw.startswith("+"):
+        number = digits
+    elif digits.startswith("00"):
+        number = digits[2:]  # International call prefix
+    elif len(digits) == 10 and default_country_code:
+        number = default_country_code + digits
+    elif len(digits) == 11 and digits.startswith("0") and default_country_code:
+        number = default_country_code + digits[1:]
+    else:
+        number = digits
+    if not 10 <= len(number) <= 15 or number.startswith("0"):
+        return None
+    return "+" + number
+
+
+@span('extract.phone')
+def find_phone(text):
+    """The first phone number that normalizes to E.164, and its confidence."""
+    default_country_code = settings.PHONE_DEFAULT_COUNTRY_CODE
+    for match in PHONE_RE.finditer(text, 0, CONTACT_SCAN_CHARS):
+        phone = normalize_phone(match.group(), default_country_code)
+        if phone is None:
+            continue  # e.g. a date range or an ID number
+        confidence = 1.0 if match.group().startswith("+") else 0.8
+        if match.start() >= CONTACT_HEADER_CHARS:
+            confidence -= 0.3
+        return phone, round(confidence, 2)
+    return None, 0.0
+
+
+@span('extract.name')
+def find_name(text):
+    """
+    The name heading the resume and its confidence.
+
+    Only the first NAME_HEADER_LINES non-blank lines are looked at; a name
+    on a later line, or written in capitals, is less certain.
+    """
+    header = text[:CONTACT_HEADER_CHARS]
+    position = 0
+    for line in header.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if position >= NAME_HEADER_LINES:
+            break
+        confidence = 0.9 - 0.1 * position
+        if NAME_RE.fullmatch(line):
+            return line, round(confidence, 2)
+        if UPPERCASE_NAME_RE.fullmatch(line):
+            return line.title(), round(confidence - 0.2, 2)
+        position += 1
+    return None, 0.0
+
+
+@span('extract.skills')
+def extract_skills_nlp(text):
+    """Extract skills with the compiled skill taxonomy matcher."""
+    return get_skill_matcher().find(text)
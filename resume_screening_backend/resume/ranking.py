@@ -0,0 +1,60 @@
+# resume/ranking.py
+
+import base64
+import binascii
+import json
+import math
+
+
+def top_k_indices(scores, ids, k, min_score=None, after=None):
+    """
+    Return the positions of the `k` best rows, best first.
+
+    Rows are ordered by score (descending) then id (ascending), which is a
+    total order, so `after=(score, id)` of the last row of one page resumes
+    exactly where that page stopped. Only the winners are ever sorted;
+    everything else is handled with NumPy masks and `argpartition`.
+    """
+    # Imported here so that importing the views does not pull in NumPy
+    import numpy as np
+
+    eligible = np.ones(len(scores), dtype=bool)
+    if min_score is not None:
+        eligible &= scores >= min_score
+    if after is not None:
+        last_score, last_id = after
+        eligible &= (scores < last_score) | ((scores == last_score) & (ids > last_id))
+
+    candidates = np.flatnonzero(eligible)
+    if len(candidates) > k:
+        candidate_scores = scores[candidates]
+        kth = np.argpartition(-candidate_scores, k - 1)[:k]
+        cutoff = candidate_scores[kth].min()
+        # argpartition breaks ties arbitrarily; settle them by id so pages stay stable
+        above = candidates[candidate_scores > cutoff]
+        tied = candidates[candidate_scores == cutoff]
+        tied = tied[np.argsort(ids[tied], kind='stable')[:k - len(above)]]
+        candidates = np.concatenate([above, tied])
+
+    order = np.lexsort((ids[candidates], -scores[candidates]))
+    return candidates[order]
+
+
+def encode_cursor(score, resume_id):
+    """Opaque pagination cursor pointing just past `(score, resume_id)`."""
+    payload = json.dumps([float(score), int(resume_id)]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of `encode_cursor`; raises ValueError for a malformed cursor (or one that is not a string)."""
+    if not isinstance(cursor, str):
+        raise ValueError("Invalid cursor")
+    try:
+        score, resume_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        score, resume_id = float(score), int(resume_id)
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not math.isfinite(score):
+        raise ValueError("Invalid cursor")
+    return score, resume_id
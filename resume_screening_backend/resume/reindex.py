@@ -0,0 +1,225 @@
+# resume/reindex.py
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .corpus_model import current_model_path
+from .extractors import EXTRACTORS, parser_process_context, start_parser_process
+from .models import ReindexJob, Resume
+from .parsing import PARSE_VERSION, extract_fields, extract_resume_text
+from .result_cache import bump_corpus_version
+from .skill_index import index_resumes, recount_skills
+from .skill_matcher import get_skill_matcher
+from .storage import content_path
+
+REDERIVED_FIELDS = ['name', 'email', 'phone', 'skills', 'resume_text', 'parse_version', 'taxonomy_version']
+
+
+def stale_resumes(parse_version, taxonomy_version):
+    """Resumes with usable text whose fields came from an older parser or taxonomy."""
+    return (
+        Resume.objects.exclude(resume_text__isnull=True)
+        .exclude(parse_version=Resume.LEGACY_PARSE_VERSION)
+        .filter(Q(parse_version__lt=parse_version) | ~Q(taxonomy_version=taxonomy_version))
+    )
+
+
+def create_reindex_job():
+    """
+    Queue a pass over the stale resumes, or return the unfinished job
+    targeting the current versions, which then resumes from its checkpoint.
+    """
+    taxonomy_version = get_skill_matcher().version
+    job = (
+        ReindexJob.objects.filter(parse_version=PARSE_VERSION, taxonomy_version=taxonomy_version)
+        .exclude(status=ReindexJob.STATUS_DONE).order_by('-id').first()
+    )
+    if job is None:
+        job = ReindexJob.objects.create(
+            parse_version=PARSE_VERSION, taxonomy_version=taxonomy_version,
+            total=stale_resumes(PARSE_VERSION, taxonomy_version).count(),
+        )
+    return job
+
+
+def _original_file(content_hash):
+    if not content_hash:
+        return None
+    for extension in EXTRACTORS:
+        path = content_path(content_hash, extension)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _rederive(rows):
+    """
+    Process-pool worker: fresh fields for one chunk of `(id, content_hash, text)` rows.
+
+    The original upload is parsed again when it is still on disk, so text
+    extraction changes are picked up too; otherwise the stored text is reused.
+    Returns `(id, fields, reextracted)` per row.
+    """
+    results = []
+    for resume_id, content_hash, text in rows:
+        reextracted = False
+        path = _original_file(content_hash)
+        if path is not None:
+            try:
+                text = extract_resume_text(path)
+                reextracted = True
+            except ValueError:
+                pass  # Keep the stored text
+        results.append((resume_id, dict(extract_fields(text), text=text), reextracted))
+    return results
+
+
+def _store_chunk(job, results):
+    """Write one chunk's fields and postings and move the checkpoint past it."""
+    with transaction.atomic():
+        # Resumes deleted while the chunk was parsed are skipped rather than written
+        existing = set(
+            Resume.objects.filter(id__in=[resume_id for resume_id, _, _ in results]).values_list('id', flat=True)
+        )
+        resumes = [
+            Resume(
+                id=resume_id,
+                name=fields['name'] or "",
+                email=fields['email'] or "",
+                phone=fields['phone'] or "",
+                skills=", ".join(fields['skills']),
+                resume_text=fields['text'],
+                parse_version=job.parse_version,
+                taxonomy_version=job.taxonomy_version,
+            )
+            for resume_id, fields, _ in results if resume_id in existing
+        ]
+        Resume.objects.bulk_update(resumes, REDERIVED_FIELDS, batch_size=200)
+        # Document frequencies are recounted once the pass is finished
+        index_resumes(resumes)
+        bump_corpus_version()  # bulk_update sends no post_save
+        ReindexJob.objects.filter(pk=job.pk).update(
+            processed=F('processed') + len(results),
+            reextracted=F('reextracted') + sum(
+                reextracted for resume_id, _, reextracted in results if resume_id in existing
+            ),
+            last_resume_id=max(resume_id for resume_id, _, _ in results),
+            updated_at=timezone.now(),
+        )
+
+
+def _wait_for_capacity(max_load, max_wait):
+    """Sleep while the load average per CPU is above `max_load`, for at most `max_wait` seconds."""
+    if not max_load:
+        return
+    cpus = os.cpu_count() or 1
+    deadline = time.monotonic() + max_wait
+    while os.getloadavg()[0] / cpus > max_load and time.monotonic() < deadline:
+        time.sleep(1)
+
+
+def _iter_chunks(job, chunk_size):
+    """Stale rows past the checkpoint, in id order, one keyset-paginated query per chunk."""
+    after = job.last_resume_id
+    stale = stale_resumes(job.parse_version, job.taxonomy_version).order_by('id')
+    while True:
+        rows = list(stale.filter(id__gt=after).values_list('id', 'content_hash', 'resume_text')[:chunk_size])
+        if not rows:
+            return
+        after = rows[-1][0]
+        yield rows
+
+
+def rebuild_search_indexes():
+    """
+    Rebuild every search index that exists, each into a new version that
+    replaces the current one atomically once complete.
+    """
+    from .bm25 import build_bm25_index
+    from .corpus_model import fit_corpus_model
+    from .embeddings import build_embedding_index
+    from .feature_store import build_feature_store
+    from .sharding import build_shard_stores, local_shards
+
+    rebuilt = []
+    for name, root, build in (
+        ('tfidf', settings.TFIDF_MODEL_DIR, fit_corpus_model),
+        ('bm25', settings.BM25_INDEX_DIR, build_bm25_index),
+        ('embeddings', settings.EMBEDDING_DIR, build_embedding_index),
+        # Last: it copies the text vectors of the freshly fitted TF-IDF model
+        ('features', settings.FEATURE_STORE_DIR, build_feature_store),
+    ):
+        if current_model_path(root) is not None:
+            build()
+            rebuilt.append(name)
+    shards = local_shards()
+    if shards:
+        build_shard_stores(shards)
+        rebuilt.append('shards')
+    return rebuilt
+
+
+def run_reindex(job_id, workers=None, chunk_size=None, pause=None, max_load=None,
+                rebuild_indexes=True, progress=None):
+    """
+    Re-derive the fields of the job's stale resumes across a process pool.
+
+    Chunks are parsed in parallel but stored in id order, so the checkpoint
+    only ever covers finished rows and an interrupted job picks up where it
+    stopped. Between chunks the job sleeps `pause` seconds and waits for
+    the load average to drop below `max_load` per CPU. The search indexes
+    are rebuilt and swapped in once every chunk is stored.
+    """
+    workers = workers or settings.REINDEX_WORKERS
+    chunk_size = chunk_size or settings.REINDEX_CHUNK_SIZE
+    pause = settings.REINDEX_PAUSE if pause is None else pause
+    max_load = settings.REINDEX_MAX_LOAD if max_load is None else max_load
+
+    job = ReindexJob.objects.get(pk=job_id)
+    job.status = ReindexJob.STATUS_RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    try:
+        # Lower priority so live uploads and queries keep their share of the CPU
+        initializer = partial(start_parser_process, settings.REINDEX_WORKER_NICENESS)
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=parser_process_context(), initializer=initializer,
+        ) as pool:
+            pending = []
+            chunks = _iter_chunks(job, chunk_size)
+            while True:
+                # Keep every worker busy, with a bounded number of chunks in memory
+                while len(pending) < workers * 2:
+                    rows = next(chunks, None)
+                    if rows is None:
+                        break
+                    pending.append(pool.submit(_rederive, rows))
+                if not pending:
+                    break
+                _store_chunk(job, pending.pop(0).result())
+                if progress:
+                    progress(ReindexJob.objects.get(pk=job.pk))
+                time.sleep(pause)
+                _wait_for_capacity(max_load, settings.REINDEX_MAX_WAIT)
+
+        recount_skills()
+        if rebuild_indexes:
+            rebuild_search_indexes()
+    except Exception as e:
+        ReindexJob.objects.filter(pk=job.pk).update(
+            status=ReindexJob.STATUS_FAILED, error=str(e), updated_at=timezone.now()
+        )
+        raise
+
+    ReindexJob.objects.filter(pk=job.pk).update(status=ReindexJob.STATUS_DONE, updated_at=timezone.now())
+    job.refresh_from_db()
+    if progress:
+        progress(job)
+    return job
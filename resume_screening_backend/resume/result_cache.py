@@ -0,0 +1,181 @@
+# resume/result_cache.py
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from .models import CorpusVersion
+
+CORPUS_VERSION_PK = 1
+
+
+def current_corpus_version():
+    """Return the corpus version; 0 until the first resume is stored."""
+    return CorpusVersion.objects.filter(pk=CORPUS_VERSION_PK).values_list('version', flat=True).first() or 0
+
+
+async def acurrent_corpus_version():
+    return await CorpusVersion.objects.filter(pk=CORPUS_VERSION_PK).values_list('version', flat=True).afirst() or 0
+
+
+def bump_corpus_version():
+    """
+    Invalidate every cached result by moving the corpus to a new version.
+
+    The counter lives in the database, so the bump commits (or rolls back)
+    together with the change that caused it and every worker sees it.
+    """
+    if not CorpusVersion.objects.filter(pk=CORPUS_VERSION_PK).update(version=F('version') + 1):
+        CorpusVersion.objects.get_or_create(pk=CORPUS_VERSION_PK, defaults={'version': 1})
+
+
+def make_key(corpus_version, *parts):
+    """Cache key for a query; `parts` must be JSON-serializable."""
+    digest = hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+    return f"resume-results:{corpus_version}:{digest}"
+
+
+class ResultCache:
+    """
+    Two-tier cache of serialized `get_results` payloads.
+
+    The first tier is a per-process LRU bounded by the total size of the
+    cached responses; the optional second tier is a Django cache shared by
+    all workers, whose backend does its own eviction. Keys embed the corpus
+    version, so entries for an older corpus are never served: the local tier
+    drops them as soon as a newer version is seen, the shared tier lets
+    them expire.
+    """
+
+    def __init__(self, max_bytes, shared_alias=None, shared_timeout=None):
+        self.max_bytes = max_bytes
+        # A single response may take at most a quarter of the local tier
+        self.max_entry_bytes = max_bytes // 4
+        self.shared_alias = shared_alias
+        self.shared_timeout = shared_timeout
+        self._entries = OrderedDict()
+        self._size = 0
+        self._corpus_version = None
+        self._lock = threading.Lock()
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    @property
+    def _shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    def get(self, key, corpus_version):
+        """Return the cached payload for `key`, or None."""
+        value = self._get_local(key, corpus_version)
+        if value is None and self._shared is not None:
+            value = self._shared_hit(key, self._shared.get(key))
+        return self._result(value)
+
+    async def aget(self, key, corpus_version):
+        """`get` for async views: the shared tier is read without blocking the event loop."""
+        value = self._get_local(key, corpus_version)
+        if value is None and self._shared is not None:
+            value = self._shared_hit(key, await self._shared.aget(key))
+        return self._result(value)
+
+    def set(self, key, payload):
+        value = self._serialize(key, payload)
+        if self._shared is not None:
+            self._shared.set(key, value, self.shared_timeout)
+
+    async def aset(self, key, payload):
+        value = self._serialize(key, payload)
+        if self._shared is not None:
+            await self._shared.aset(key, value, self.shared_timeout)
+
+    def _get_local(self, key, corpus_version):
+        with self._lock:
+            if corpus_version != self._corpus_version:
+                self._clear_local(corpus_version)
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.local_hits += 1
+            return value
+
+    def _shared_hit(self, key, value):
+        if value is not None:
+            with self._lock:
+                self.shared_hits += 1
+                self._store_local(key, value)
+        return value
+
+    def _result(self, value):
+        if value is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        return json.loads(value)
+
+    def _serialize(self, key, payload):
+        value = json.dumps(payload, cls=DjangoJSONEncoder).encode('utf-8')
+        with self._lock:
+            self._store_local(key, value)
+        return value
+
+    def _store_local(self, key, value):
+        if len(value) > self.max_entry_bytes:
+            return
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._size -= len(previous)
+        self._entries[key] = value
+        self._size += len(value)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def _clear_local(self, corpus_version):
+        self._entries.clear()
+        self._size = 0
+        self._corpus_version = corpus_version
+
+    def clear(self):
+        with self._lock:
+            self._clear_local(None)
+
+    def stats(self):
+        with self._lock:
+            hits = self.local_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                'hits': hits,
+                'local_hits': self.local_hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'shared_alias': self.shared_alias,
+            }
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """The process-wide result cache, built from settings on first use."""
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache(
+                    settings.RESULTS_CACHE_MAX_BYTES,
+                    shared_alias=settings.RESULTS_CACHE_ALIAS,
+                    shared_timeout=settings.RESULTS_CACHE_TIMEOUT,
+                )
+    return _result_cache
@@ -0,0 +1,397 @@
+# resume/sharding.py
+
+import heapq
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F
+from scipy import sparse
+
+from .corpus_model import current_model_path
+from .feature_store import append_to_feature_store, build_feature_store, get_feature_store, remove_from_feature_store
+from .hybrid import _postings, score_store
+from .model_registry import registry
+from .models import Resume
+from .ranking import top_k_indices
+
+# Messages are a 4-byte big-endian length followed by that many bytes of JSON
+FRAME_HEADER = struct.Struct(">I")
+
+
+class ShardError(Exception):
+    """A shard answered with an error (e.g. its index is missing or stale)."""
+
+
+# Partitioning ---------------------------------------------------------------
+
+def _range_bounds(shards):
+    bounds = list(settings.SEARCH_SHARD_BOUNDS)
+    if len(bounds) != shards - 1 or bounds != sorted(bounds):
+        raise ImproperlyConfigured("SEARCH_SHARD_BOUNDS needs one ascending bound fewer than there are shards")
+    return bounds
+
+
+def shard_of(resume_ids, shards=None):
+    """
+    The shard owning each resume id: the id modulo the shard count
+    ('hash'), or its position among SEARCH_SHARD_BOUNDS ('range').
+    """
+    shards = shards or len(settings.SEARCH_SHARDS)
+    ids = np.asarray(resume_ids, dtype=np.int64)
+    if settings.SEARCH_SHARD_STRATEGY == 'range':
+        return np.searchsorted(np.asarray(_range_bounds(shards), dtype=np.int64), ids, side='right')
+    return ids % shards
+
+
+def shard_resumes(shard, shards=None):
+    """Queryset of the resumes owned by `shard`."""
+    shards = shards or len(settings.SEARCH_SHARDS)
+    if settings.SEARCH_SHARD_STRATEGY == 'range':
+        bounds = _range_bounds(shards)
+        resumes = Resume.objects.all()
+        if shard > 0:
+            resumes = resumes.filter(id__gte=bounds[shard - 1])
+        if shard < len(bounds):
+            resumes = resumes.filter(id__lt=bounds[shard])
+        return resumes
+    return Resume.objects.annotate(shard=F('id') % shards).filter(shard=shard)
+
+
+def shard_root(shard):
+    return os.path.join(settings.SHARD_INDEX_DIR, f"shard-{shard:02d}")
+
+
+def local_shards():
+    """The shards whose store was built on this host."""
+    return [
+        shard for shard in range(len(settings.SEARCH_SHARDS))
+        if current_model_path(shard_root(shard)) is not None
+    ]
+
+
+def build_shard_stores(shards=None):
+    """Build the feature store of each shard in `shards` (default: all) from the resumes it owns."""
+    shards = range(len(settings.SEARCH_SHARDS)) if shards is None else shards
+    return {shard: build_feature_store(shard_root(shard), shard_resumes(shard)) for shard in shards}
+
+
+def append_to_shard_stores(resumes):
+    """
+    Route newly stored resumes to their shards' stores.
+
+    Only stores on this host's SHARD_INDEX_DIR are kept in sync; shards on
+    other nodes pick the resumes up when their store is next rebuilt.
+    """
+    if not settings.SEARCH_SHARDS or not resumes:
+        return
+    owners = shard_of([resume.id for resume in resumes])
+    for shard in np.unique(owners).tolist():
+        append_to_feature_store([r for r, owner in zip(resumes, owners) if owner == shard], shard_root(shard))
+
+
+def remove_from_shard_stores(resume_ids):
+    if not settings.SEARCH_SHARDS or not resume_ids:
+        return
+    owners = shard_of(resume_ids)
+    for shard in np.unique(owners).tolist():
+        remove_from_feature_store([i for i, owner in zip(resume_ids, owners) if owner == shard], shard_root(shard))
+
+
+# Wire protocol --------------------------------------------------------------
+
+def _connect(address, timeout):
+    """Open a socket to 'unix:/path' or 'host:port'."""
+    if address.startswith("unix:"):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        target = address[len("unix:"):]
+    else:
+        host, port = address.rsplit(":", 1)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        target = (host, int(port))
+    sock.settimeout(timeout)
+    try:
+        sock.connect(target)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def send_message(sock, message):
+    data = json.dumps(message).encode('utf-8')
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size, deadline=None):
+    chunks = []
+    while size:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout("timed out")
+            sock.settimeout(remaining)
+        chunk = sock.recv(min(size, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed mid-message")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock, deadline=None):
+    (length,) = FRAME_HEADER.unpack(_recv_exactly(sock, FRAME_HEADER.size, deadline))
+    if length > settings.SEARCH_SHARD_MAX_MESSAGE_BYTES:
+        raise ConnectionError(f"Message of {length} bytes exceeds SEARCH_SHARD_MAX_MESSAGE_BYTES")
+    return json.loads(_recv_exactly(sock, length, deadline))
+
+
+# Shard server ---------------------------------------------------------------
+
+class ShardWorker:
+    """
+    Answers the coordinator's queries from one shard's feature store.
+
+    The store holds the shard's slice of the skill bitsets and TF-IDF rows;
+    queries arrive already vectorized with the coordinator's TF-IDF model,
+    so a shard needs neither the database nor the model.
+    """
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.root = shard_root(shard)
+
+    def store(self):
+        store = get_feature_store(self.root)
+        if store is None:
+            raise ShardError(f"Shard {self.shard} has no index; run build_shards")
+        return store
+
+    def handle(self, message):
+        op = message.get('op')
+        if op == 'ping':
+            return {'status': 'ok', 'shard': self.shard, 'resumes': int(self.store().live.sum())}
+        if op == 'search':
+            return self.search(message)
+        raise ShardError(f"Unknown op: {op}")
+
+    def search(self, message):
+        """
+        Score the shard's resumes and return its own top k, best first.
+
+        A skill the store has no column for (new to the taxonomy since the
+        shard was built) needs its posting list in the message's `postings`;
+        without it the reply only names the `uncovered` skills.
+        """
+        store = self.store()
+        postings = {name: np.asarray(ids, dtype=np.int64) for name, ids in (message.get('postings') or {}).items()}
+        uncovered = sorted(
+            name for name in {*message['must_have'], *message['nice_to_have']}
+            if name not in store.columns and name not in postings
+        )
+        if uncovered:
+            return {'status': 'ok', 'uncovered': uncovered}
+
+        text_scores = None
+        if message.get('query') is not None:
+            if store.meta['tfidf_fitted_at'] != message['tfidf_fitted_at']:
+                raise ShardError(f"Shard {self.shard} was built with another TF-IDF fit; rebuild it")
+            indices, values = message['query']
+            query = sparse.csr_matrix(
+                (np.asarray(values, dtype=np.float32), np.asarray(indices, dtype=np.int32), [0, len(indices)]),
+                shape=(1, store.meta['features']),
+            )
+
+            def text_scores(rows, candidates):
+                return store.text_similarities(query, rows)
+
+        ids, scores, breakdown = score_store(
+            store, message['must_have'], message['nice_to_have'], message['weights'],
+            message['min_must_coverage'], text_scores, postings,
+        )
+        after = tuple(message['after']) if message.get('after') else None
+        winners = top_k_indices(scores, ids, message['k'], message.get('min_score'), after)
+        return {
+            'status': 'ok',
+            'ids': ids[winners].tolist(),
+            'scores': scores[winners].tolist(),
+            'breakdown': {signal: values[winners].tolist() for signal, values in breakdown.items()},
+        }
+
+
+class ShardRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # A connection may carry several requests, answered in order
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, OSError, ValueError):
+                return
+            try:
+                reply = self.server.worker.handle(message)
+            except Exception as e:
+                reply = {'status': 'error', 'message': str(e) or type(e).__name__}
+            send_message(self.request, reply)
+
+
+class TCPShardServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class UnixShardServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_shard_server(shard, address=None):
+    """A threaded server answering for `shard` on its SEARCH_SHARDS address."""
+    address = address or settings.SEARCH_SHARDS[shard]
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            os.remove(path)  # Left behind by a previous run
+        server = UnixShardServer(path, ShardRequestHandler)
+    else:
+        host, port = address.rsplit(":", 1)
+        server = TCPShardServer((host, int(port)), ShardRequestHandler)
+    server.worker = ShardWorker(shard)
+    return server
+
+
+# Coordinator ----------------------------------------------------------------
+
+_fanout_lock = threading.Lock()
+_fanout = {'pool': None}
+
+
+def _fanout_pool():
+    with _fanout_lock:
+        if _fanout['pool'] is None:
+            _fanout['pool'] = ThreadPoolExecutor(
+                max_workers=len(settings.SEARCH_SHARDS) * settings.SCORING_WORKERS, thread_name_prefix='shard',
+            )
+        return _fanout['pool']
+
+
+def _call_shard(address, message, deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise socket.timeout("timed out")
+    with _connect(address, remaining) as sock:
+        send_message(sock, message)
+        reply = recv_message(sock, deadline)
+    if reply.get('status') != 'ok':
+        raise ShardError(reply.get('message', "error"))
+    return reply
+
+
+def scatter(message, timeout=None, shards=None):
+    """
+    Send `message` to every shard (or those numbered in `shards`) at once
+    and collect what comes back within `timeout` seconds (SEARCH_SHARD_TIMEOUT).
+
+    Returns `(replies, missing)`: the replies by shard number, and a list
+    of `{'shard', 'error'}` for the shards that failed or timed out.
+    """
+    timeout = settings.SEARCH_SHARD_TIMEOUT if timeout is None else timeout
+    deadline = time.monotonic() + timeout
+    pool = _fanout_pool()
+    futures = {
+        pool.submit(_call_shard, address, message, deadline): shard
+        for shard, address in enumerate(settings.SEARCH_SHARDS)
+        if shards is None or shard in shards
+    }
+    # Every call gives up at the deadline by itself; the grace covers thread hand-off
+    done, _ = wait(futures, timeout=timeout + 0.1)
+
+    replies, missing = {}, []
+    for future, shard in futures.items():
+        if future not in done:
+            missing.append({'shard': shard, 'error': "timed out"})
+            continue
+        try:
+            replies[shard] = future.result()
+        except socket.timeout:
+            missing.append({'shard': shard, 'error': "timed out"})
+        except (OSError, ShardError, ValueError) as e:
+            missing.append({'shard': shard, 'error': str(e) or type(e).__name__})
+    missing.sort(key=lambda entry: entry['shard'])
+    return replies, missing
+
+
+def merge_top_k(replies, k):
+    """
+    Merge the shards' best-first lists into the overall top k.
+
+    Each list is already ordered by score (descending) then id, so a heap
+    merge over the list heads only looks at about k rows in total.
+    """
+    def rows(shard, reply):
+        for position, (resume_id, score) in enumerate(zip(reply['ids'], reply['scores'])):
+            yield -score, resume_id, shard, position
+
+    merged = list(islice(heapq.merge(*(rows(shard, reply) for shard, reply in replies.items())), k))
+    ids = np.asarray([resume_id for _, resume_id, _, _ in merged], dtype=np.int64)
+    scores = np.asarray([-negated for negated, _, _, _ in merged], dtype=np.float64)
+    signals = set().union(*(reply['breakdown'] for reply in replies.values())) if replies else set()
+    breakdown = {
+        signal: np.asarray([replies[shard]['breakdown'][signal][position] for _, _, shard, position in merged])
+        for signal in signals
+    }
+    return ids, scores, breakdown
+
+
+def search_shards(job_description, top_k, min_score, after=None, options=None):
+    """
+    Rank the JD across every shard: TF-IDF alone, or the hybrid signals
+    when `options` (from `parse_hybrid_params`) are given.
+
+    The JD is vectorized once here with the current TF-IDF model, each
+    shard returns its own top k, and those are merged. Shards that fail or
+    miss SEARCH_SHARD_TIMEOUT are left out: the result then only covers
+    the others. Returns `(ids, scores, breakdown, missing)`.
+    """
+    # Hybrid ranking goes on without its text signal until TF-IDF is fitted
+    model = registry.get('tfidf') if options else registry.require('tfidf')
+    query = None
+    if model is not None:
+        row = model.transform([job_description])
+        query = [row.indices.tolist(), row.data.tolist()]
+    message = {
+        'op': 'search',
+        'query': query,
+        'tfidf_fitted_at': model.meta.get('fitted_at') if model is not None else None,
+        'must_have': options['must_have'] if options else [],
+        'nice_to_have': options['nice_to_have'] if options else [],
+        # Shards hold TF-IDF vectors only, so that is the text signal whatever HYBRID_TEXT_SCORER says
+        'weights': options['weights'] if options else {'text': 1.0},
+        'min_must_coverage': options['min_must_coverage'] if options else 0.0,
+        'k': top_k,
+        'min_score': min_score,
+        'after': list(after) if after else None,
+    }
+    replies, missing = scatter(message)
+
+    uncovered = {shard: reply['uncovered'] for shard, reply in replies.items() if reply.get('uncovered')}
+    if uncovered:
+        # Skills a shard has no column for are read from the posting lists, as
+        # `score_resumes` does on a single node, so both rank the same way
+        names = sorted(set().union(*uncovered.values()))
+        message['postings'] = {name: ids.tolist() for name, ids in zip(names, _postings(names))}
+        retried, failed = scatter(message, shards=set(uncovered))
+        for shard in uncovered:
+            del replies[shard]
+        replies.update(retried)
+        missing = sorted(missing + failed, key=lambda entry: entry['shard'])
+
+    ids, scores, breakdown = merge_top_k(replies, top_k)
+    return ids, scores, breakdown, missing
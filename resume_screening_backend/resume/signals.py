@@ -0,0 +1,124 @@
+# resume/signals.py
+
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .index_updates import after_commit
+from .models import Resume
+from .result_cache import bump_corpus_version
+from .skill_index import index_resume, unindex_resume
+
+
+@receiver(post_save, sender=Resume)
+def update_skill_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Keep the skill posting lists in sync whenever a resume is saved."""
+    if raw:
+        return
+    if update_fields is not None and 'skills' not in update_fields:
+        return
+    index_resume(instance)
+
+
+@receiver(pre_delete, sender=Resume)
+def remove_from_skill_index(sender, instance, **kwargs):
+    """Drop the resume from the skill document frequencies before it is deleted."""
+    unindex_resume(instance)
+
+
+@receiver(post_save, sender=Resume)
+def update_corpus_model(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Append the resume to the persisted TF-IDF model without refitting it."""
+    if raw:
+        return
+    if update_fields is not None and 'resume_text' not in update_fields:
+        return
+    # Imported here so that loading the app does not import scikit-learn
+    from .corpus_model import append_to_corpus_model
+
+    after_commit(append_to_corpus_model, [instance])
+
+
+@receiver(post_delete, sender=Resume)
+def remove_from_corpus_model(sender, instance, **kwargs):
+    """Drop the deleted resume's row from the TF-IDF model."""
+    from .corpus_model import remove_from_corpus_model
+
+    after_commit(remove_from_corpus_model, [instance.pk])
+
+
+@receiver(post_save, sender=Resume)
+def update_embedding_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Embed the resume into the semantic search index."""
+    if raw:
+        return
+    if update_fields is not None and 'resume_text' not in update_fields:
+        return
+    from .embeddings import append_to_embedding_index
+
+    after_commit(append_to_embedding_index, [instance])
+
+
+@receiver(post_delete, sender=Resume)
+def remove_from_embedding_index(sender, instance, **kwargs):
+    """Mask the deleted resume out of the semantic search index."""
+    from .embeddings import remove_from_embedding_index
+
+    after_commit(remove_from_embedding_index, [instance.pk])
+
+
+@receiver(post_save, sender=Resume)
+def update_bm25_index(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Index the resume text as a new BM25 segment."""
+    if raw:
+        return
+    if update_fields is not None and 'resume_text' not in update_fields:
+        return
+    from .bm25 import append_to_bm25_index
+
+    after_commit(append_to_bm25_index, [instance])
+
+
+@receiver(post_delete, sender=Resume)
+def remove_from_bm25_index(sender, instance, **kwargs):
+    """Mask the deleted resume out of the BM25 segments."""
+    from .bm25 import remove_from_bm25_index
+
+    after_commit(remove_from_bm25_index, [instance.pk])
+
+
+@receiver(post_save, sender=Resume)
+def update_feature_store(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Append the resume's current skills and text to the feature store."""
+    if raw:
+        return
+    if update_fields is not None and not {'skills', 'resume_text', 'uploaded_at'} & set(update_fields):
+        return
+    from .feature_store import append_to_feature_store
+    from .sharding import append_to_shard_stores
+
+    after_commit(append_to_feature_store, [instance])
+    after_commit(append_to_shard_stores, [instance])
+
+
+@receiver(post_delete, sender=Resume)
+def remove_from_feature_store(sender, instance, **kwargs):
+    """Mask the deleted resume out of the feature store (and its shard's)."""
+    from .feature_store import remove_from_feature_store
+    from .sharding import remove_from_shard_stores
+
+    after_commit(remove_from_feature_store, [instance.pk])
+    after_commit(remove_from_shard_stores, [instance.pk])
+
+
+@receiver(post_save, sender=Resume)
+@receiver(post_delete, sender=Resume)
+def invalidate_cached_results(sender, instance, raw=False, **kwargs):
+    """
+    Any insert, update or delete of a resume makes cached results stale:
+    once with the change itself, and again once the indexes have it.
+    """
+    if raw:
+        return
+    bump_corpus_version()
+    # Queued after the index writes above, so it runs once they have landed
+    after_commit(bump_corpus_version)
@@ -0,0 +1,168 @@
+# resume/skill_index.py
+
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import ResumeSkill, Skill
+from .skill_matcher import get_skill_matcher
+
+# Keep `__in` lookups below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 900
+
+
+def canonical_skill(skill):
+    """Normalize a skill name (and resolve synonyms) so JD and resume skills compare equal."""
+    return get_skill_matcher().canonical(skill)
+
+
+def parse_skills(skills):
+    """Split the comma-separated `Resume.skills` field into canonical skills."""
+    if not skills:
+        return set()
+    return {canonical_skill(skill) for skill in skills.split(",") if skill.strip()}
+
+
+def chunked(items, size=QUERY_CHUNK_SIZE):
+    """Yield successive lists of at most `size` items; `items` may be a lazy iterator."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _get_or_create_skills(names):
+    """Return a {name: Skill} mapping, creating missing rows in bulk."""
+    skills = {}
+    for chunk in chunked(names):
+        skills.update((skill.name, skill) for skill in Skill.objects.filter(name__in=chunk))
+    missing = [name for name in names if name not in skills]
+    if missing:
+        Skill.objects.bulk_create([Skill(name=name) for name in missing], ignore_conflicts=True)
+        for chunk in chunked(missing):
+            skills.update((skill.name, skill) for skill in Skill.objects.filter(name__in=chunk))
+    return skills
+
+
+@transaction.atomic
+def index_resume(resume):
+    """Bring the posting lists for one resume in line with its `skills` field."""
+    wanted = parse_skills(resume.skills)
+    current = dict(
+        ResumeSkill.objects.filter(resume_id=resume.pk).values_list('skill__name', 'skill_id')
+    )
+
+    removed = [skill_id for name, skill_id in current.items() if name not in wanted]
+    if removed:
+        ResumeSkill.objects.filter(resume_id=resume.pk, skill_id__in=removed).delete()
+        Skill.objects.filter(id__in=removed).update(resume_count=F('resume_count') - 1)
+
+    added = [name for name in wanted if name not in current]
+    if added:
+        skills = _get_or_create_skills(added)
+        ResumeSkill.objects.bulk_create(
+            [ResumeSkill(skill=skills[name], resume_id=resume.pk) for name in added]
+        )
+        Skill.objects.filter(id__in=[skills[name].id for name in added]).update(
+            resume_count=F('resume_count') + 1
+        )
+
+
+def unindex_resume(resume):
+    """Decrement document frequencies before a resume (and its postings) is deleted."""
+    skill_ids = ResumeSkill.objects.filter(resume_id=resume.pk).values_list('skill_id', flat=True)
+    Skill.objects.filter(id__in=list(skill_ids)).update(resume_count=F('resume_count') - 1)
+
+
+def _create_postings(resumes):
+    """Bulk-insert postings for `resumes`; returns the {resume_id: skill names} map."""
+    wanted = {resume.pk: parse_skills(resume.skills) for resume in resumes}
+    skills = _get_or_create_skills(set().union(*wanted.values()))
+    ResumeSkill.objects.bulk_create(
+        [
+            ResumeSkill(skill=skills[name], resume_id=resume_id)
+            for resume_id, names in wanted.items()
+            for name in names
+        ],
+        batch_size=QUERY_CHUNK_SIZE,
+    )
+    return wanted, skills
+
+
+@transaction.atomic
+def index_resumes(resumes):
+    """
+    Rebuild the postings for a batch of resumes at once.
+
+    Document frequencies are not touched here; call `recount_skills` once the
+    whole batch run is finished.
+    """
+    resumes = list(resumes)
+    for chunk in chunked(resume.pk for resume in resumes):
+        ResumeSkill.objects.filter(resume_id__in=chunk).delete()
+    _create_postings(resumes)
+
+
+@transaction.atomic
+def index_new_resumes(resumes):
+    """
+    Index resumes inserted with `bulk_create`, which does not send `post_save`.
+
+    The resumes must not have postings yet; document frequencies are bumped
+    with one UPDATE per distinct increment.
+    """
+    wanted, skills = _create_postings(list(resumes))
+    increments = Counter(name for names in wanted.values() for name in names)
+    by_increment = defaultdict(list)
+    for name, increment in increments.items():
+        by_increment[increment].append(skills[name].id)
+    for increment, skill_ids in by_increment.items():
+        for chunk in chunked(skill_ids):
+            Skill.objects.filter(id__in=chunk).update(resume_count=F('resume_count') + increment)
+
+
+def recount_skills():
+    """Recompute `Skill.resume_count` from the posting lists."""
+    counts = dict(ResumeSkill.objects.values_list('skill_id').annotate(n=Count('id')))
+    skills = list(Skill.objects.all())
+    for skill in skills:
+        skill.resume_count = counts.get(skill.id, 0)
+    Skill.objects.bulk_update(skills, ['resume_count'], batch_size=QUERY_CHUNK_SIZE)
+
+
+def iter_resumes_with_all_skills(skills, chunk_size=QUERY_CHUNK_SIZE):
+    """
+    Yield, chunk by chunk in ascending order, the ids of resumes that list
+    every skill in `skills`.
+
+    Posting lists are intersected starting from the rarest skill, so the
+    work is bounded by the smallest posting list rather than the table size.
+    That list is walked lazily and each chunk is filtered on its own, so the
+    first matches are available at once and memory does not grow with the
+    number of matches.
+    """
+    names = {canonical_skill(skill) for skill in skills}
+    if not names:
+        return
+
+    rows = list(Skill.objects.filter(name__in=names).values_list('id', 'resume_count'))
+    if len(rows) < len(names):
+        return
+
+    rows.sort(key=lambda row: row[1])
+    rarest = (
+        ResumeSkill.objects.filter(skill_id=rows[0][0]).order_by('resume_id')
+        .values_list('resume_id', flat=True)
+    )
+    for chunk in chunked(rarest.iterator(chunk_size=chunk_size), chunk_size):
+        candidates = chunk
+        for skill_id, _ in rows[1:]:
+            if not candidates:
+                break
+            candidates = list(
+                ResumeSkill.objects.filter(skill_id=skill_id, resume_id__in=candidates)
+                .order_by('resume_id').values_list('resume_id', flat=True)
+            )
+        if candidates:
+            yield candidates
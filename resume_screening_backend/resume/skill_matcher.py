@@ -0,0 +1,147 @@
+# resume/skill_matcher.py
+
+import hashlib
+import json
+from collections import deque
+
+from django.conf import settings
+
+from .model_registry import registry
+
+# Characters that continue a word: "c" must not match inside "c++", nor
+# "java" inside "javascript".
+WORD_EXTRA_CHARS = frozenset("+#_")
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch in WORD_EXTRA_CHARS
+
+
+def normalize_text(text):
+    """Lowercase and collapse whitespace so phrases match across line breaks."""
+    return " ".join(text.lower().split())
+
+
+def load_taxonomy(path):
+    """
+    Read a taxonomy file into a {pattern: canonical name} mapping.
+
+    Each non-comment line holds a canonical skill name followed by its
+    synonyms, separated by "|". The canonical name is a pattern as well.
+    """
+    synonyms = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            names = [normalize_text(name) for name in line.split("|")]
+            names = [name for name in names if name]
+            if not names:
+                continue
+            canonical = names[0]
+            for name in names:
+                synonyms.setdefault(name, canonical)
+    return synonyms
+
+
+def taxonomy_version(synonyms):
+    """Short fingerprint of a taxonomy that changes whenever any pattern or canonical name does."""
+    return hashlib.sha1(json.dumps(sorted(synonyms.items())).encode('utf-8')).hexdigest()[:12]
+
+
+class SkillMatcher:
+    """
+    Aho-Corasick automaton over every skill name and synonym.
+
+    `find` makes a single pass over the text, so its cost is linear in the
+    text length (plus the number of matches) however large the taxonomy is.
+    """
+
+    def __init__(self, synonyms):
+        self._canonical = dict(synonyms)
+        # Stored with each resume's skills, so rows matched with an older taxonomy can be found
+        self.version = taxonomy_version(self._canonical)
+        self._patterns = []  # (length, canonical) per pattern
+        self._goto = [{}]
+        self._output = [-1]  # Pattern ending exactly at this node
+        self._fail = [0]
+        self._dict_link = [0]  # Nearest proper suffix node that ends a pattern
+
+        for pattern, canonical in self._canonical.items():
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._output.append(-1)
+                    self._fail.append(0)
+                    self._dict_link.append(0)
+                node = nxt
+            self._output[node] = len(self._patterns)
+            self._patterns.append((len(pattern), canonical))
+
+        self._build_links()
+
+    def _build_links(self):
+        goto, fail, output, dict_link = self._goto, self._fail, self._output, self._dict_link
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and ch not in goto[state]:
+                    state = fail[state]
+                target = goto[state].get(ch, 0)
+                fail[child] = target if target != child else 0
+                dict_link[child] = fail[child] if output[fail[child]] != -1 else dict_link[fail[child]]
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def canonical(self, name):
+        """Map a skill name or synonym to its canonical name (unknown names pass through)."""
+        name = normalize_text(name)
+        return self._canonical.get(name, name)
+
+    def canonical_names(self):
+        """Every canonical skill name of the taxonomy."""
+        return sorted(set(self._canonical.values()))
+
+    def find(self, text):
+        """Return the sorted canonical names of every skill mentioned in `text`."""
+        text = normalize_text(text)
+        goto, fail, output, dict_link, patterns = (
+            self._goto, self._fail, self._output, self._dict_link, self._patterns
+        )
+        last = len(text) - 1
+        found = set()
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+
+            match = node if output[node] != -1 else dict_link[node]
+            while match:
+                length, canonical = patterns[output[match]]
+                start = end - length + 1
+                # Only whole words and phrases count
+                if (start == 0 or not _is_word_char(text[start - 1])) and (
+                    end == last or not _is_word_char(text[end + 1])
+                ):
+                    found.add(canonical)
+                match = dict_link[match]
+        return sorted(found)
+
+
+def load_skill_matcher():
+    """Compile the configured taxonomy; called once per process through the model registry."""
+    return SkillMatcher(load_taxonomy(settings.SKILL_TAXONOMY_PATH))
+
+
+def get_skill_matcher():
+    return registry.get('skill_matcher')
@@ -0,0 +1,70 @@
+# resume/storage.py
+
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .instrumentation import span
+from .parsing import PARSE_VERSION, extract_fields, extract_resume_text
+from .skill_matcher import get_skill_matcher
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    """SHA-256 of a file on disk, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_path(content_hash, extension):
+    """Content-addressed location of an upload: `<upload dir>/<aa>/<hash><ext>`."""
+    return os.path.join(settings.UPLOAD_DIR, content_hash[:2], content_hash + extension.lower())
+
+
+def move_into_storage(tmp_path, content_hash, extension):
+    """Rename a complete temporary file to its content-addressed path (dropping it if already stored)."""
+    path = content_path(content_hash, extension)
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+    return path
+
+
+def discard_unreferenced(content_hash, path):
+    """Delete a stored upload no resume was created from, e.g. after its parse failed."""
+    from .models import Resume
+
+    if not Resume.objects.filter(content_hash=content_hash).exists() and os.path.exists(path):
+        os.remove(path)
+
+
+def _cache_key(content_hash):
+    # Skills matched with another taxonomy are stale as well
+    return f"resume-extract:v{PARSE_VERSION}:{get_skill_matcher().version}:{content_hash}"
+
+
+def cached_extraction(content_hash, file_path):
+    """
+    Return `(text, extracted_data)` for a file, parsing it only on a cache miss.
+
+    The cache is keyed by content hash, so re-submissions of a file under any
+    name skip the PDF/DOCX parser and skill extraction.
+    """
+    cache = caches[settings.EXTRACTION_CACHE_ALIAS]
+    with span('extract.cache'):
+        cached = cache.get(_cache_key(content_hash))
+    if cached is not None:
+        return cached['text'], dict(cached['data'])
+
+    text = extract_resume_text(file_path)
+    extracted_data = extract_fields(text)
+    cache.set(_cache_key(content_hash), {'text': text, 'data': extracted_data})
+    return text, dict(extracted_data)
@@ -1,3 +1,983 @@
-from django.test import TestCase
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+import numpy as np
+
+from . import reindex
+from .batch_screening import batch_shortlists, create_batch, run_batch, run_batch_in_background, top_k_per_query
+from .bm25 import BM25Index, build_bm25_index
+from .corpus_model import CorpusModel, _write_delta, current_model_path, fit_corpus_model, get_corpus_model, merge_deltas
+from .embeddings import build_embedding_index, embed_query, get_embedding_index
+from .extractors import (
+    PDF_BACKENDS, ExtractionError, ExtractionTimeout, extract_doc_text, extract_docx_text, extract_pdf_text,
+    extract_rtf_text, rtf_to_text,
+)
+from .feature_store import build_feature_store, get_feature_store
+from .fields import CompressedTextField
+from .hybrid import _combine, split_jd_skills
+from .index_updates import wait_for_index_updates
+from .instrumentation import Histogram, server_timing, span
+from .ingest import create_job, run_job
+from .models import IngestItem, IngestJob, ReindexJob, Resume, ResumeSkill, ScreeningBatch, ShortlistEntry
+from .parsing import PARSE_VERSION, extract_fields, find_email, find_name, find_phone, normalize_phone
+from .reindex import create_reindex_job, run_reindex, stale_resumes
+from .result_cache import ResultCache, get_result_cache
+from .sharding import ShardWorker, build_shard_stores, make_shard_server, merge_top_k, shard_of, shard_resumes
+from .skill_matcher import SkillMatcher, load_taxonomy, taxonomy_version
+from .views import rank_by_hybrid, rank_by_tfidf
+
+JOB_DESCRIPTION = "python developer with django and docker"
+
+SKILL_SETS = [
+    "python django postgresql docker",
+    "python flask redis kubernetes",
+    "java spring kafka docker",
+    "javascript react node graphql",
+    "python pandas numpy machine learning",
+]
+
+
+def make_resumes(count, **fields):
+    """
+    Store `count` parsed resumes. Their texts share skills, so any JD
+    matches several, and repeat every 15 resumes, so scores tie.
+    """
+    return [
+        Resume.objects.create(
+            name=f"Candidate {i}",
+            email=f"candidate{i}@example.com",
+            phone=f"+91{9000000000 + i}",
+            skills=SKILL_SETS[i % len(SKILL_SETS)].replace(" ", ", "),
+            resume_text=f"Experienced engineer skilled in {SKILL_SETS[i % len(SKILL_SETS)]}. "
+                        f"{i % 3 + 1} years of experience.",
+            **{'parse_version': PARSE_VERSION, **fields},
+        )
+        for i in range(count)
+    ]
+
+
+class IndexTestCase(TransactionTestCase):
+    """
+    Keeps the search indexes and uploads of each test in a temporary directory.
+
+    Views score on executor threads and batches run on their own thread,
+    which only see committed rows, hence a TransactionTestCase.
+    """
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        overrides = override_settings(
+            TFIDF_MODEL_DIR=os.path.join(self.root, 'tfidf'),
+            BM25_INDEX_DIR=os.path.join(self.root, 'bm25'),
+            EMBEDDING_DIR=os.path.join(self.root, 'embeddings'),
+            FEATURE_STORE_DIR=os.path.join(self.root, 'features'),
+            SHARD_INDEX_DIR=os.path.join(self.root, 'shards'),
+            # Indexes are up to date as soon as a save returns
+            INDEX_UPDATES_IN_BACKGROUND=False,
+            UPLOAD_DIR=os.path.join(self.root, 'uploads'),
+            BULK_UPLOAD_DIR=os.path.join(self.root, 'uploads', 'bulk'),
+            CACHES={
+                **settings.CACHES,
+                'extraction': {**settings.CACHES['extraction'], 'LOCATION': os.path.join(self.root, 'extraction')},
+            },
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Rate limit counters and the corpus version of cached results
+        caches['default'].clear()
+
+    def post_json(self, url, data):
+        return self.client.post(url, json.dumps(data), content_type='application/json')
+
+
+class ResultsTests(IndexTestCase):
+    def get_results(self, **data):
+        response = self.post_json('/api/get_results/', {'job_description': JOB_DESCRIPTION, 'min_score': 0, **data})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ranked_ids(self, mode):
+        return [resume['id'] for resume in self.get_results(mode=mode, top_k=500)['data']]
+
+    def read_pages(self, mode, top_k):
+        ids, cursor = [], None
+        while True:
+            payload = self.get_results(mode=mode, top_k=top_k, cursor=cursor)
+            ids += [resume['id'] for resume in payload['data']]
+            cursor = payload['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_cursor_pages_have_no_duplicates_or_gaps(self):
+        make_resumes(40)
+        fit_corpus_model()
+        build_bm25_index()
+        for mode in ('tfidf', 'bm25'):
+            with self.subTest(mode=mode):
+                everything = self.ranked_ids(mode)
+                self.assertGreater(len(everything), 20)
+                self.assertEqual(self.read_pages(mode, top_k=7), everything)
+
+    def test_deleted_resume_leaves_a_full_page(self):
+        make_resumes(20)
+        fit_corpus_model()
+        build_bm25_index()
+        before = {mode: self.ranked_ids(mode) for mode in ('tfidf', 'bm25')}
+        deleted = before['tfidf'][0]
+        Resume.objects.filter(pk=deleted).delete()
+
+        for mode in ('tfidf', 'bm25'):
+            with self.subTest(mode=mode):
+                ids = [resume['id'] for resume in self.get_results(mode=mode, top_k=5)['data']]
+                self.assertEqual(len(ids), 5)
+                self.assertNotIn(deleted, ids)
+                self.assertEqual(self.read_pages(mode, top_k=3), [i for i in before[mode] if i != deleted])
+
+    def test_invalid_cursor_is_rejected(self):
+        make_resumes(5)
+        fit_corpus_model()
+        for cursor in ('not-a-cursor', 42, ['x']):
+            response = self.post_json(
+                '/api/get_results/', {'job_description': JOB_DESCRIPTION, 'mode': 'tfidf', 'cursor': cursor}
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_missing_index_is_reported(self):
+        make_resumes(5)
+        response = self.post_json('/api/get_results/', {'job_description': JOB_DESCRIPTION, 'mode': 'tfidf'})
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('refit_tfidf', response.json()['message'])
+
+
+class UploadAdmissionTests(IndexTestCase):
+    def upload(self, name, content, field='resume', url='/api/upload/'):
+        return self.client.post(url, {field: SimpleUploadedFile(name, content)})
+
+    def assertRejected(self, response, status, code):
+        self.assertEqual(response.status_code, status, response.content)
+        self.assertEqual(response.json()['code'], code)
+
+    def test_unsupported_extension(self):
+        self.assertRejected(self.upload('resume.exe', b'MZ'), 415, 'unsupported_type')
+
+    def test_content_not_matching_the_extension(self):
+        self.assertRejected(self.upload('resume.pdf', b'PK\x03\x04 not a pdf'), 415, 'type_mismatch')
+
+    def test_empty_file(self):
+        self.assertRejected(self.upload('resume.txt', b''), 400, 'empty_file')
+
+    def test_truncated_pdf(self):
+        self.assertRejected(self.upload('resume.pdf', b'%PDF-1.4\n1 0 obj'), 422, 'invalid_document')
+
+    @override_settings(UPLOAD_MAX_BYTES=1024)
+    def test_too_large(self):
+        self.assertRejected(self.upload('resume.txt', b'x' * 4096), 413, 'file_too_large')
+
+    @override_settings(UPLOAD_RATE_LIMIT=2)
+    def test_rate_limited(self):
+        for _ in range(2):
+            self.assertRejected(self.upload('resume.exe', b'MZ'), 415, 'unsupported_type')
+        response = self.upload('resume.exe', b'MZ')
+        self.assertRejected(response, 429, 'rate_limited')
+        self.assertIn('Retry-After', response)
+
+    def test_bulk_upload_must_be_a_zip(self):
+        response = self.upload('resumes.zip', b'not a zip', field='archive', url='/api/bulk_upload/')
+        self.assertRejected(response, 415, 'unsupported_type')
+        self.assertEqual(os.listdir(os.path.join(self.root, 'uploads', 'bulk')), [])
+
+
+class BatchScreeningTests(IndexTestCase):
+    def test_shortlists_match_single_queries(self):
+        make_resumes(30)
+        fit_corpus_model()
+        job_descriptions = [JOB_DESCRIPTION, "java engineer who knows kafka and spring"]
+
+        # Wait for the batch thread, so the batch is done once the view returns
+        with mock.patch(
+            'resume.views.run_batch_in_background', side_effect=lambda pk: run_batch_in_background(pk).join()
+        ):
+            response = self.post_json(
+                '/api/batch_screening/', {'job_descriptions': job_descriptions, 'top_k': 4, 'min_score': 0}
+            )
+        self.assertEqual(response.status_code, 202, response.content)
+
+        status = self.client.get(f"/api/batch_screening/{response.json()['batch_id']}/").json()
+        self.assertEqual(status['status'], ScreeningBatch.STATUS_DONE)
+        self.assertEqual(len(status['shortlists']), 2)
+        for job_description, shortlist in zip(job_descriptions, status['shortlists']):
+            single = self.post_json(
+                '/api/get_results/', {'job_description': job_description, 'mode': 'tfidf', 'top_k': 4, 'min_score': 0}
+            ).json()['data']
+            self.assertEqual(
+                [(resume['id'], resume['similarity']) for resume in shortlist],
+                [(resume['id'], resume['similarity']) for resume in single],
+            )
+
+    def test_resume_deleted_while_scoring_is_left_out(self):
+        make_resumes(20)
+        fit_corpus_model()
+        batch = create_batch([JOB_DESCRIPTION], top_k=5, min_score=0)
+
+        deleted = []
+
+        def score_then_delete(*args, **kwargs):
+            shortlists = top_k_per_query(*args, **kwargs)
+            deleted.append(int(shortlists[0][0][0]))
+            Resume.objects.filter(pk=deleted[0]).delete()
+            return shortlists
+
+        with mock.patch('resume.batch_screening.top_k_per_query', side_effect=score_then_delete):
+            batch = run_batch(batch.pk)
+
+        self.assertEqual(batch.status, ScreeningBatch.STATUS_DONE)
+        self.assertFalse(ShortlistEntry.objects.filter(resume_id=deleted[0]).exists())
+        ranks = list(ShortlistEntry.objects.filter(batch=batch).order_by('rank').values_list('rank', flat=True))
+        self.assertEqual(ranks, list(range(1, 5)))
+        self.assertNotIn(deleted[0], [entry['id'] for entry in batch_shortlists(batch)[0]])
+
+
+class ColdStartTests(SimpleTestCase):
+    def test_loading_the_urls_imports_no_numerical_libraries(self):
+        script = (
+            "import sys; loaded = set(sys.modules); import django; django.setup(); import resume.urls; "
+            "print(sorted({'numpy', 'scipy', 'sklearn', 'spacy'} & (set(sys.modules) - loaded)))"
+        )
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'resume_screening_backend.settings'}
+        output = subprocess.run(
+            [sys.executable, '-c', script], env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(output.splitlines()[-1], '[]')
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ReindexTests(IndexTestCase):
+    def test_interrupted_job_resumes_from_its_checkpoint(self):
+        resumes = make_resumes(10, taxonomy_version='old')
+        job = create_reindex_job()
+        self.assertEqual(job.total, 10)
+
+        def interrupt(job):
+            raise Interrupted()
+
+        options = {'workers': 1, 'chunk_size': 3, 'pause': 0, 'max_load': 0, 'rebuild_indexes': False}
+        with self.assertRaises(Interrupted):
+            run_reindex(job.pk, progress=interrupt, **options)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReindexJob.STATUS_FAILED)
+        self.assertEqual((job.processed, job.last_resume_id), (3, resumes[2].id))
+
+        # Queueing again picks the unfinished job up rather than starting over
+        self.assertEqual(create_reindex_job().pk, job.pk)
+        with mock.patch('resume.reindex._store_chunk', wraps=reindex._store_chunk) as store_chunk:
+            job = run_reindex(job.pk, **options)
+
+        stored = [resume_id for call in store_chunk.call_args_list for resume_id, _, _ in call.args[1]]
+        self.assertEqual(stored, [resume.id for resume in resumes[3:]])
+        self.assertEqual(job.status, ReindexJob.STATUS_DONE)
+        self.assertEqual(job.processed, 10)
+        self.assertFalse(stale_resumes(job.parse_version, job.taxonomy_version).exists())
+
+
+class ReindexDeleteTests(IndexTestCase):
+    def test_resume_deleted_while_its_chunk_was_parsed_is_skipped(self):
+        resumes = make_resumes(3, taxonomy_version='old')
+        job = create_reindex_job()
+        results = [(resume.id, dict(extract_fields(resume.resume_text), text=resume.resume_text), False)
+                   for resume in resumes]
+        resumes[1].delete()
+
+        reindex._store_chunk(job, results)
+
+        job.refresh_from_db()
+        self.assertEqual((job.processed, job.last_resume_id), (3, resumes[2].id))
+        self.assertFalse(Resume.objects.filter(pk=results[1][0]).exists())
+        self.assertFalse(ResumeSkill.objects.filter(resume_id=results[1][0]).exists())
+        self.assertEqual(
+            set(Resume.objects.values_list('taxonomy_version', flat=True)), {job.taxonomy_version}
+        )
+
+
+class ReextractTests(IndexTestCase):
+    def test_legacy_row_is_matched_on_normalized_contact_details(self):
+        os.makedirs(settings.UPLOAD_DIR)
+        with open(os.path.join(settings.UPLOAD_DIR, 'ravi.txt'), 'w') as f:
+            f.write("Ravi Kumar\nRavi.Kumar@Example.com\n+91 98765 43210\nSkills: Python, Django, Docker\n")
+        # Stored before extraction lowercased emails and wrote phones in E.164
+        legacy = Resume.objects.create(
+            name="Ravi Kumar", email="Ravi.Kumar@Example.com", phone="98765 43210", skills="python",
+        )
+
+        call_command('reextract_resumes', stdout=StringIO())
+
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.parse_version, PARSE_VERSION)
+        self.assertIsNotNone(legacy.content_hash)
+        self.assertEqual((legacy.email, legacy.phone), ("ravi.kumar@example.com", "+919876543210"))
+        self.assertIn("django", legacy.skills)
+
+
+class ShardedSearchTests(IndexTestCase):
+    def serve_shards(self, count):
+        addresses = [f"unix:{os.path.join(self.root, f'shard{shard}.sock')}" for shard in range(count)]
+        overrides = override_settings(SEARCH_SHARDS=addresses)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        for shard in range(count):
+            server = make_shard_server(shard)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            self.addCleanup(server.server_close)
+            self.addCleanup(server.shutdown)
+
+    def test_skill_without_a_shard_column_ranks_as_on_a_single_node(self):
+        make_resumes(30)
+        fit_corpus_model()
+        self.serve_shards(2)
+        build_shard_stores()
+        # Stored after the shard stores were built, so they have no column for it
+        newcomers = [
+            Resume.objects.create(
+                name=f"Newcomer {i}", email=f"newcomer{i}@example.com", skills="python, zigbee",
+                resume_text=f"Embedded python developer, {i + 1} years with zigbee and docker.",
+                parse_version=PARSE_VERSION,
+            )
+            for i in range(6)
+        ]
+        self.assertFalse(any('zigbee' in ShardWorker(shard).store().columns for shard in range(2)))
+
+        options = {'weights': dict(settings.HYBRID_WEIGHTS), 'min_must_coverage': 1.0,
+                   'must_have': ['zigbee'], 'nice_to_have': ['python']}
+        sharded = rank_by_hybrid(JOB_DESCRIPTION, 10, 0, None, options)
+        with override_settings(SEARCH_SHARDS=[]):
+            single = rank_by_hybrid(JOB_DESCRIPTION, 10, 0, None, options)
+
+        self.assertNotIn('partial', sharded)
+        self.assertEqual(sorted(resume['id'] for resume in sharded['data']), sorted(r.id for r in newcomers))
+        self.assertEqual(
+            [(resume['id'], resume['similarity']) for resume in sharded['data']],
+            [(resume['id'], resume['similarity']) for resume in single['data']],
+        )
+
+
+    def test_tfidf_ranking_matches_a_single_node(self):
+        make_resumes(30)
+        fit_corpus_model()
+        self.serve_shards(3)
+        build_shard_stores()
+        sharded = rank_by_tfidf(JOB_DESCRIPTION, 50, 0)
+        with override_settings(SEARCH_SHARDS=[]):
+            single = rank_by_tfidf(JOB_DESCRIPTION, 50, 0)
+        self.assertGreater(len(single['data']), 10)
+        self.assertNotIn('partial', sharded)
+        self.assertEqual(
+            [(resume['id'], resume['similarity']) for resume in sharded['data']],
+            [(resume['id'], resume['similarity']) for resume in single['data']],
+        )
+
+    def test_unreachable_shard_gives_a_partial_result(self):
+        make_resumes(30)
+        fit_corpus_model()
+        self.serve_shards(2)
+        build_shard_stores()
+        with override_settings(SEARCH_SHARDS=[]):
+            single = rank_by_tfidf(JOB_DESCRIPTION, 50, 0)
+        addresses = [*settings.SEARCH_SHARDS, f"unix:{os.path.join(self.root, 'gone.sock')}"]
+        with override_settings(SEARCH_SHARDS=addresses):
+            payload = rank_by_tfidf(JOB_DESCRIPTION, 50, 0)
+        self.assertTrue(payload['partial'])
+        self.assertEqual([entry['shard'] for entry in payload['missing_shards']], [2])
+        # The stores were built for the two shards that answered, so they hold every resume
+        self.assertEqual(payload['data'], single['data'])
+
+
+class ShardRoutingTests(IndexTestCase):
+    def test_every_resume_has_exactly_one_shard(self):
+        resumes = make_resumes(12)
+        ids = [r.id for r in resumes]
+        for strategy, bounds in (('hash', []), ('range', [ids[4], ids[9]])):
+            with self.subTest(strategy=strategy), \
+                    override_settings(SEARCH_SHARD_STRATEGY=strategy, SEARCH_SHARD_BOUNDS=bounds):
+                owners = shard_of(ids, 3)
+                for shard in range(3):
+                    owned = sorted(shard_resumes(shard, 3).values_list('id', flat=True))
+                    self.assertEqual(owned, [i for i, owner in zip(ids, owners) if owner == shard])
+        with override_settings(SEARCH_SHARD_STRATEGY='range', SEARCH_SHARD_BOUNDS=[ids[4], ids[9]]):
+            self.assertEqual(shard_of(ids, 3).tolist(), [0] * 4 + [1] * 5 + [2] * 3)
+        with override_settings(SEARCH_SHARD_STRATEGY='range', SEARCH_SHARD_BOUNDS=[ids[9], ids[4]]), \
+                self.assertRaises(ImproperlyConfigured):
+            shard_of(ids, 3)
+
+    def test_merge_top_k_keeps_the_order_of_a_single_list(self):
+        replies = {
+            0: {'ids': [4, 2], 'scores': [0.9, 0.5], 'breakdown': {'text': [0.8, 0.1]}},
+            1: {'ids': [1, 7, 3], 'scores': [0.9, 0.6, 0.5], 'breakdown': {'text': [0.7, 0.6, 0.2]}},
+            2: {'ids': [], 'scores': [], 'breakdown': {}},
+        }
+        ids, scores, breakdown = merge_top_k(replies, 4)
+        # Ties go to the lower id, as in a single ranking
+        self.assertEqual(ids.tolist(), [1, 4, 7, 2])
+        self.assertEqual(scores.tolist(), [0.9, 0.9, 0.6, 0.5])
+        self.assertEqual(breakdown['text'].tolist(), [0.7, 0.8, 0.6, 0.1])
+
+
+class ProfilerTests(IndexTestCase):
+    async def test_cprofile_on_the_event_loop_only_profiles_the_scoring_work(self):
+        await sync_to_async(make_resumes)(10)
+        await sync_to_async(fit_corpus_model)()
+        with override_settings(PROFILE_REQUESTS=True, PROFILE_DIR=os.path.join(self.root, 'profiles')):
+            response = await self.async_client.post(
+                '/api/get_results/', {'job_description': JOB_DESCRIPTION, 'mode': 'tfidf', 'min_score': 0},
+                content_type='application/json', headers={'X-Profile': 'cprofile'},
+            )
+            path = os.path.join(settings.PROFILE_DIR, response['X-Profile-Path'])
+        self.assertEqual(response.status_code, 200, response.content)
+
+        functions = {name for _, _, name in pstats.Stats(path).stats}
+        self.assertIn('rank_by_tfidf', functions)
+        # Nothing run on the event loop, where other requests' coroutines interleave
+        self.assertNotIn('cached_results_response', functions)
+
+
+def hanging_pdf_backend(path, limit):
+    while True:
+        try:
+            while True:
+                pass
+        except Exception:
+            pass  # A parser that swallows the first timeout
+    yield ""
+
+
+class PdfTimeoutTests(SimpleTestCase):
+    def test_stuck_parser_is_interrupted(self):
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            f.write(b"%PDF-1.4\n")
+            f.flush()
+            with mock.patch.dict(PDF_BACKENDS, {'hang': hanging_pdf_backend}), \
+                    override_settings(PDF_TIMEOUT=0.5), self.assertRaises(ExtractionTimeout):
+                extract_pdf_text(f.name, 'hang')
+
+
+class IndexUpdateTests(IndexTestCase):
+    def bm25_docs(self):
+        return BM25Index.open(current_model_path(settings.BM25_INDEX_DIR)).doc_count
+
+    def test_indexes_are_only_written_once_the_save_commits(self):
+        make_resumes(5)
+        build_bm25_index()
+
+        with self.assertRaises(Interrupted), transaction.atomic():
+            make_resumes(1)
+            raise Interrupted
+        self.assertEqual(self.bm25_docs(), 5)
+
+        with override_settings(INDEX_UPDATES_IN_BACKGROUND=True):
+            with transaction.atomic():
+                make_resumes(1)
+                self.assertEqual(self.bm25_docs(), 5)
+            wait_for_index_updates()
+        self.assertEqual(self.bm25_docs(), 6)
+
+
+class CorpusModelTests(IndexTestCase):
+    def ranking(self):
+        ids, scores = get_corpus_model().similarities(JOB_DESCRIPTION)
+        return dict(zip(ids.tolist(), np.round(scores, 6).tolist()))
+
+    def test_appends_and_deletes_are_delta_segments(self):
+        resumes = make_resumes(10)
+        fit_corpus_model()
+        path = current_model_path()
+
+        newcomer = make_resumes(1)[0]
+        resumes[1].resume_text = "python django docker kubernetes terraform"
+        resumes[1].save()
+        resumes[2].delete()
+        model = get_corpus_model()
+        self.assertEqual([len(segment) for segment in model.segments], [10, 1, 1])
+        ranking = self.ranking()
+        self.assertEqual(sorted(ranking), sorted([r.id for r in resumes if r.pk] + [newcomer.id]))
+        expected = model.transform([resumes[1].resume_text]) @ model.transform([JOB_DESCRIPTION]).T
+        self.assertAlmostEqual(ranking[resumes[1].id], round(expected.toarray()[0, 0], 6))
+
+        # Two writers appending from stale copies of the model both count towards the drift
+        first, second = CorpusModel.open(path), CorpusModel.open(path)
+        for writer, text in ((first, "zyxwv qwerty python"), (second, "plokij python django")):
+            delta = writer.make_delta([resumes[3].id], [text])
+            _write_delta(path, delta)
+        self.assertEqual(get_corpus_model().appended, (4, 22, 4))
+        ranking = self.ranking()
+
+        with override_settings(TFIDF_MAX_DELTAS=1, TFIDF_MERGE_FACTOR=2):
+            while merge_deltas(path):
+                pass
+        model = get_corpus_model()
+        self.assertEqual(len(model.segments), 2)
+        self.assertEqual(model.appended, (4, 22, 4))
+        self.assertEqual(self.ranking(), ranking)
+        # 4 of 22 appended tokens are new: 18% drift
+        with override_settings(TFIDF_DRIFT_THRESHOLD=0.2):
+            call_command('refit_tfidf', '--if-drifted', stdout=StringIO())
+        self.assertEqual(current_model_path(), path)
+        with override_settings(TFIDF_DRIFT_THRESHOLD=0.15):
+            call_command('refit_tfidf', '--if-drifted', stdout=StringIO())
+        self.assertNotEqual(current_model_path(), path)
+
+
+class SkillMatcherTests(SimpleTestCase):
+    matcher = SkillMatcher({
+        'c': 'c', 'c++': 'c++', 'java': 'java', 'javascript': 'javascript', 'js': 'javascript',
+        'machine learning': 'machine learning', 'ml': 'machine learning', 'learning': 'learning',
+        'postgres': 'postgresql', 'postgresql': 'postgresql',
+    })
+
+    def test_synonyms_resolve_to_the_canonical_name(self):
+        self.assertEqual(self.matcher.find("Shipped JS and Postgres apps"), ['javascript', 'postgresql'])
+        self.assertEqual(self.matcher.canonical(" ML "), 'machine learning')
+        self.assertEqual(self.matcher.canonical("Rust"), 'rust')
+
+    def test_only_whole_words_match(self):
+        self.assertEqual(self.matcher.find("JavaScript, C++ and c#"), ['c++', 'javascript'])
+        self.assertEqual(self.matcher.find("java; c"), ['c', 'java'])
+
+    def test_overlapping_patterns_and_phrases_across_lines(self):
+        self.assertEqual(self.matcher.find("Machine\n  Learning"), ['learning', 'machine learning'])
+
+    def test_taxonomy_file(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write("# comment\nKubernetes | k8s\n\nNode.js|node|nodejs\n")
+        self.addCleanup(os.remove, f.name)
+        synonyms = load_taxonomy(f.name)
+        self.assertEqual(synonyms['k8s'], 'kubernetes')
+        self.assertEqual(SkillMatcher(synonyms).find("k8s, NodeJS"), ['kubernetes', 'node.js'])
+        self.assertNotEqual(taxonomy_version(synonyms), taxonomy_version({**synonyms, 'kube': 'kubernetes'}))
+
+
+@override_settings(PHONE_DEFAULT_COUNTRY_CODE='91')
+class ContactFieldTests(SimpleTestCase):
+    def test_phone_numbers_are_normalized_to_e164(self):
+        for raw, expected in (
+            ("+1 (415) 555-0100", "+14155550100"),
+            ("0044 20 7946 0958", "+442079460958"),
+            ("98765 43210", "+919876543210"),
+            ("098765-43210", "+919876543210"),
+            ("12345", None),
+        ):
+            with self.subTest(raw=raw):
+                self.assertEqual(normalize_phone(raw, '91'), expected)
+
+    def test_phone_confidence(self):
+        self.assertEqual(find_phone("Jane Doe\n+91 98765 43210"), ("+919876543210", 1.0))
+        self.assertEqual(find_phone("Jane Doe\n98765 43210"), ("+919876543210", 0.8))
+        # A date range is skipped; a number past the header is less certain
+        text = "2015 - 2019\n" + "x " * 1000 + "\nCall 98765 43210"
+        self.assertEqual(find_phone(text), ("+919876543210", 0.5))
+        self.assertEqual(find_phone("no number here"), (None, 0.0))
+
+    def test_email_confidence(self):
+        self.assertEqual(find_email("Mail: Jane.Doe@Example.com."), ("jane.doe@example.com", 1.0))
+        self.assertEqual(find_email("x " * 1000 + "jane@example.com"), ("jane@example.com", 0.7))
+        self.assertEqual(find_email("x " * 15000 + "jane@example.com"), (None, 0.0))
+
+    def test_name_confidence(self):
+        self.assertEqual(find_name("Jane Q. Doe\nEngineer"), ("Jane Q. Doe", 0.9))
+        self.assertEqual(find_name("Resume\n\nJANE DOE"), ("Jane Doe", 0.6))
+        self.assertEqual(find_name("\n".join(["line"] * 6 + ["Jane Doe"])), (None, 0.0))
+
+
+WORD_DOCUMENT = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+            xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006">
+  <w:body>
+    <w:p><w:r><w:t>Summary</w:t><w:tab/><w:t>Backend engineer</w:t></w:r></w:p>
+    <w:p><w:r><mc:AlternateContent>
+      <mc:Choice><w:txbxContent><w:p><w:r><w:t>Skills: Python</w:t></w:r></w:p></w:txbxContent></mc:Choice>
+      <mc:Fallback><w:txbxContent><w:p><w:r><w:t>Skills: Python</w:t></w:r></w:p></w:txbxContent></mc:Fallback>
+    </mc:AlternateContent><w:t>Anchor</w:t></w:r></w:p>
+    <w:tbl>
+      <w:tr><w:tc><w:p><w:r><w:t>Acme</w:t></w:r></w:p></w:tc><w:tc><w:p><w:r><w:t>2019</w:t></w:r></w:p></w:tc></w:tr>
+    </w:tbl>
+  </w:body>
+</w:document>"""
+
+WORD_HEADER = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<w:hdr xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:p><w:r><w:t>Jane Doe</w:t></w:r></w:p>
+</w:hdr>"""
+
+
+class DocumentExtractorTests(SimpleTestCase):
+    def write(self, suffix, content):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def docx(self, parts):
+        path = self.write('.docx', b"")
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, xml in parts.items():
+                archive.writestr(name, xml)
+        return path
+
+    def test_docx_reads_headers_text_boxes_and_tables(self):
+        path = self.docx({'word/document.xml': WORD_DOCUMENT, 'word/header1.xml': WORD_HEADER})
+        self.assertEqual(
+            extract_docx_text(path).splitlines(),
+            ["Jane Doe", "Summary\tBackend engineer", "Skills: Python", "Anchor", "Acme\t2019"],
+        )
+
+    def test_docx_limits(self):
+        with self.assertRaisesMessage(ExtractionError, "word/document.xml is missing"):
+            extract_docx_text(self.docx({'word/header1.xml': WORD_HEADER}))
+        with self.assertRaisesMessage(ExtractionError, "Not a valid .docx file"):
+            extract_docx_text(self.write('.docx', b"PK not really"))
+        with override_settings(DOCX_MAX_XML_BYTES=100), self.assertRaises(ExtractionError):
+            extract_docx_text(self.docx({'word/document.xml': WORD_DOCUMENT}))
+
+    def test_rtf(self):
+        rtf = (
+            r"{\rtf1\ansi{\fonttbl{\f0 Arial;}}{\*\generator Word;}"
+            r"Jane Doe\par Caf\'e9 \u8364? 5\tab Python\line {\b Django}\}}"
+        )
+        self.assertEqual(rtf_to_text(rtf), "Jane Doe\nCafé € 5\tPython\nDjango}")
+        self.assertEqual(extract_rtf_text(self.write('.rtf', rtf.encode('latin-1'))), rtf_to_text(rtf))
+
+    def test_doc_goes_through_the_converter(self):
+        path = self.write('.doc', "Jane Doe\nPython".encode('utf-8'))
+        with override_settings(DOC_CONVERTER=['cat']):
+            self.assertEqual(extract_doc_text(path), "Jane Doe\nPython")
+        with override_settings(DOC_CONVERTER=['no-such-converter']), \
+                self.assertRaisesMessage(ExtractionError, "need no-such-converter"):
+            extract_doc_text(path)
+
+
+class ResultCacheTests(IndexTestCase):
+    def payload(self, size):
+        return {'status': 'success', 'data': "x" * size}
+
+    def test_local_tier_is_a_byte_bounded_lru(self):
+        cache = ResultCache(max_bytes=400)
+        self.assertIsNone(cache.get('a', 1))  # Looked up before it is stored, as the views do
+        # About 75 bytes each: the sixth entry evicts the least recently used
+        for key in ('a', 'b', 'c'):
+            cache.set(key, self.payload(40))
+        cache.get('a', 1)
+        for key in ('d', 'e', 'f'):
+            cache.set(key, self.payload(40))
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), self.payload(40))
+        self.assertLessEqual(cache.stats()['bytes'], 400)
+
+        cache.set('huge', self.payload(200))  # Over a quarter of the tier
+        self.assertIsNone(cache.get('huge', 1))
+
+    def test_shared_tier_serves_other_workers(self):
+        worker, other = ResultCache(4096, shared_alias='default'), ResultCache(4096, shared_alias='default')
+        worker.set('key', self.payload(10))
+        self.assertEqual(other.get('key', 1), self.payload(10))
+        self.assertEqual(other.get('key', 1), self.payload(10))
+        self.assertEqual(
+            {name: other.stats()[name] for name in ('local_hits', 'shared_hits', 'misses')},
+            {'local_hits': 1, 'shared_hits': 1, 'misses': 0},
+        )
+
+    def test_new_corpus_version_empties_the_local_tier(self):
+        cache = ResultCache(4096)
+        self.assertIsNone(cache.get('key', 1))
+        cache.set('key', self.payload(10))
+        self.assertIsNotNone(cache.get('key', 1))
+        self.assertIsNone(cache.get('key', 2))
+
+    def test_storing_a_resume_invalidates_cached_results(self):
+        get_result_cache().clear()
+        make_resumes(10)
+        fit_corpus_model()
+        data = {'job_description': JOB_DESCRIPTION, 'mode': 'tfidf', 'min_score': 0}
+
+        self.assertFalse(self.post_json('/api/get_results/', data).json()['cached'])
+        self.assertTrue(self.post_json('/api/get_results/', data).json()['cached'])
+        make_resumes(1)
+        payload = self.post_json('/api/get_results/', data).json()
+        self.assertFalse(payload['cached'])
+        self.assertEqual(len(payload['data']), 11)
+
+
+class EmbeddingIndexTests(IndexTestCase):
+    def scores(self, index, probes=None):
+        ids, scores = index.similarities(embed_query(JOB_DESCRIPTION), probes)
+        return {resume_id: score for resume_id, score in zip(ids.tolist(), scores.tolist()) if score > -np.inf}
+
+    def test_appends_and_deletes_reach_the_exact_scan(self):
+        resumes = make_resumes(10)
+        build_embedding_index()
+        self.assertIsNone(get_embedding_index().ivf)
+        self.assertEqual(sorted(self.scores(get_embedding_index())), [r.id for r in resumes])
+
+        newcomer = make_resumes(1)[0]
+        resumes[1].resume_text = "Kotlin and Swift mobile developer."
+        resumes[1].save()
+        resumes[2].delete()
+        index = get_embedding_index()
+        self.assertEqual(len(index), 12)  # The re-extracted resume has two rows
+        scores = self.scores(index)
+        self.assertEqual(sorted(scores), sorted([r.id for r in resumes if r.pk] + [newcomer.id]))
+        query, vector = embed_query(JOB_DESCRIPTION), embed_query(resumes[1].resume_text)
+        self.assertAlmostEqual(scores[resumes[1].id], float(vector @ query), places=5)
+
+    def test_ivf_probes_nearest_lists_and_rows_appended_since_the_build(self):
+        make_resumes(40)
+        with override_settings(EMBEDDING_ANN_MIN_ROWS=20):
+            index = build_embedding_index(n_lists=4)
+        self.assertEqual(len(index.ivf['centroids']), 4)
+        self.assertEqual(len(index.ivf['rows']), 40)
+        exact = self.scores(index, probes=4)
+        self.assertEqual(len(exact), 40)
+
+        newcomer = make_resumes(1)[0]
+        probed = self.scores(get_embedding_index(), probes=1)
+        self.assertLess(len(probed), 41)
+        self.assertIn(newcomer.id, probed)
+        for resume_id, score in probed.items():
+            if resume_id != newcomer.id:
+                self.assertAlmostEqual(score, exact[resume_id], places=5)
+
+
+class HybridScoringTests(IndexTestCase):
+    def test_signals_without_input_drop_out_of_the_weighting(self):
+        candidates = np.array([1, 2, 3])
+        breakdown = {'must_have': np.array([1.0, 0.5, 0.0]), 'text': np.array([0.2, 0.4, 0.6])}
+        weights = {'must_have': 0.4, 'nice_to_have': 0.2, 'text': 0.4, 'recency': 0.0}
+        _, scores, _ = _combine(candidates, breakdown, weights)
+        np.testing.assert_allclose(scores, [0.6, 0.45, 0.3])
+        _, scores, _ = _combine(candidates, breakdown, {'text': 0.0})
+        np.testing.assert_array_equal(scores, [0, 0, 0])
+
+    def test_jd_sections_split_must_have_and_nice_to_have_skills(self):
+        job_description = "Backend engineer\nRequirements:\n- python, django\nNice to have: docker and python"
+        self.assertEqual(split_jd_skills(job_description), (['django', 'python'], ['docker']))
+
+    def test_weights_and_coverage_rank_the_candidates(self):
+        resumes = make_resumes(10)
+        fit_corpus_model()
+        data = {'job_description': JOB_DESCRIPTION, 'mode': 'hybrid', 'min_score': 0,
+                'must_have': ['python', 'django'], 'nice_to_have': ['docker']}
+
+        payload = self.post_json('/api/get_results/', {**data, 'min_must_coverage': 0.5, 'weights': {'text': 0}}).json()
+        # Half the must-haves lets every python resume in; those with django and docker cover everything
+        self.assertEqual({resume['id'] for resume in payload['data']}, {r.id for r in resumes if 'python' in r.skills})
+        full = {r.id for r in resumes if 'django' in r.skills}
+        for resume in payload['data']:
+            expected = 100.0 if resume['id'] in full else round((0.4 * 0.5 + 0.2 * 0) / 0.6 * 100, 2)
+            self.assertEqual(resume['similarity'], expected)
+        self.assertEqual({resume['id'] for resume in payload['data'][:len(full)]}, full)
+
+        payload = self.post_json('/api/get_results/', data).json()
+        self.assertEqual({resume['id'] for resume in payload['data']}, full)
+        self.assertEqual(set(payload['data'][0]['scores']), {'must_have', 'nice_to_have', 'text'})
+        response = self.post_json('/api/get_results/', {**data, 'weights': {'text': -1}})
+        self.assertEqual(response.status_code, 400)
+
+
+class FeatureStoreTests(IndexTestCase):
+    def ids_with(self, *skills):
+        return sorted(r.id for r in Resume.objects.all() if all(skill in r.skills for skill in skills))
+
+    def test_columns_follow_appends_re_extraction_and_deletes(self):
+        resumes = make_resumes(15)
+        fit_corpus_model()
+        build_feature_store()
+        self.assertEqual(get_feature_store().resumes_with_all_skills(['python', 'docker']).tolist(),
+                         self.ids_with('python', 'docker'))
+
+        make_resumes(2)
+        resumes[1].skills = "python, docker"
+        resumes[1].save()
+        resumes[0].delete()
+        store = get_feature_store()
+        self.assertEqual(len(store), 18)
+        self.assertEqual(store.resumes_with_all_skills(['python', 'docker']).tolist(),
+                         self.ids_with('python', 'docker'))
+        self.assertIsNone(store.resumes_with_all_skills(['python', 'zigbee']))
+
+        # A skill without a column counts through its posting list
+        counts = store.skill_counts(['python', 'zigbee'], {'zigbee': np.array([resumes[2].id])})
+        counts = dict(zip(store.ids[store.live].tolist(), counts[store.live].tolist()))
+        self.assertEqual(counts[resumes[2].id], 1 + ('python' in resumes[2].skills))
+        self.assertEqual(counts[resumes[1].id], 1)
+
+    def test_hybrid_scores_match_the_posting_list_path(self):
+        make_resumes(20)
+        fit_corpus_model()
+        options = {'weights': {**settings.HYBRID_WEIGHTS, 'recency': 0.0}, 'min_must_coverage': 0.5,
+                   'must_have': ['python', 'django'], 'nice_to_have': ['docker']}
+        without_store = rank_by_hybrid(JOB_DESCRIPTION, 20, 0, None, options)
+        store = build_feature_store()
+        self.assertTrue(store.has_text_for(get_corpus_model()))
+        with_store = rank_by_hybrid(JOB_DESCRIPTION, 20, 0, None, options)
+        self.assertGreater(len(with_store['data']), 5)
+        self.assertEqual(with_store['data'], without_store['data'])
+
+
+class StreamingShortlistTests(IndexTestCase):
+    async def test_ndjson_streams_the_json_shortlist_in_chunks(self):
+        await sync_to_async(make_resumes)(30)
+        data = {'job_description': JOB_DESCRIPTION, 'mode': 'skills'}
+        response = await self.async_client.post('/api/get_results/', data, content_type='application/json')
+        shortlist = response.json()['data']
+        self.assertGreater(len(shortlist), 4)
+
+        with mock.patch('resume.views.QUERY_CHUNK_SIZE', 4):
+            response = await self.async_client.post(
+                '/api/get_results/', {**data, 'format': 'ndjson'}, content_type='application/json',
+            )
+            self.assertTrue(response.streaming)
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), -(-len(shortlist) // 4))
+        lines = b"".join(chunks).decode('utf-8').splitlines()
+        self.assertEqual([json.loads(line) for line in lines], shortlist)
+
+
+class InlineParserPool(ThreadPoolExecutor):
+    """Parses on threads of the test process, which see its settings overrides."""
+
+    def __init__(self, max_workers, mp_context=None, initializer=None):
+        super().__init__(max_workers)
+
+
+class IngestJobTests(IndexTestCase):
+    def make_archive(self, files):
+        path = os.path.join(self.root, 'resumes.zip')
+        with zipfile.ZipFile(path, 'w') as archive:
+            for name, text in files.items():
+                archive.writestr(name, text)
+        return path
+
+    @mock.patch('resume.ingest.ProcessPoolExecutor', InlineParserPool)
+    def test_interrupted_job_resumes_with_its_pending_files(self):
+        duplicate = "Jane Doe\njane@example.com\nPython and Django developer."
+        archive = self.make_archive({
+            'a.txt': duplicate,
+            'nested/b.txt': duplicate,
+            'c.txt': "",
+            'd.png': "not a resume",
+            **{f'e{i}.txt': f"Candidate Number{i}\ncandidate{i}@example.com\nJava developer." for i in range(3)},
+        })
+        job = create_job(archive)
+
+        def interrupt(job):
+            raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            run_job(job.pk, workers=2, batch_size=2, progress=interrupt)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.total, job.processed), (IngestJob.STATUS_FAILED, 6, 2))
+
+        job = run_job(job.pk, workers=2, batch_size=2)
+        self.assertEqual((job.status, job.processed, job.failed), (IngestJob.STATUS_DONE, 6, 1))
+        self.assertIn("No text", job.items.get(status=IngestItem.STATUS_FAILED).error)
+        # The two copies of one file are stored once
+        self.assertEqual(Resume.objects.count(), 4)
+        copies = job.items.filter(path__endswith='b.txt') | job.items.filter(path__endswith='a.txt')
+        self.assertEqual(len({item.resume_id for item in copies}), 1)
+        jane = Resume.objects.get(email="jane@example.com")
+        self.assertEqual(jane.skills, "django, python")
+        self.assertEqual(
+            sorted(ResumeSkill.objects.filter(resume=jane).values_list('skill__name', flat=True)), ['django', 'python'],
+        )
+
+
+class CompressedTextFieldTests(IndexTestCase):
+    def stored_bytes(self, resume):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT resume_text FROM {Resume._meta.db_table} WHERE id = %s", [resume.pk])
+            return cursor.fetchone()[0]
+
+    def test_text_is_compressed_in_the_column_only(self):
+        text = "Senior Python developer; Zürich. " * 200
+        resume = make_resumes(1)[0]
+        resume.resume_text = text
+        resume.save()
+        stored = bytes(self.stored_bytes(resume))
+        self.assertLess(len(stored), len(text) // 10)
+        self.assertEqual(Resume.objects.get(pk=resume.pk).resume_text, text)
+        self.assertEqual(Resume.objects.filter(pk=resume.pk).values_list('resume_text', flat=True).get(), text)
+
+    def test_plain_text_rows_and_nulls_are_read_as_is(self):
+        resume = make_resumes(1)[0]
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {Resume._meta.db_table} SET resume_text = %s WHERE id = %s",
+                           [b"Stored before compression", resume.pk])
+        self.assertEqual(Resume.objects.get(pk=resume.pk).resume_text, "Stored before compression")
+        Resume.objects.filter(pk=resume.pk).update(resume_text=None)
+        self.assertIsNone(Resume.objects.get(pk=resume.pk).resume_text)
+
+    def test_compression_level_is_kept_in_migrations(self):
+        self.assertEqual(CompressedTextField().deconstruct()[3], {'editable': True})
+        self.assertEqual(CompressedTextField(compression_level=9).deconstruct()[3]['compression_level'], 9)
+
+
+class InstrumentationTests(IndexTestCase):
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = Histogram('test_seconds', "Test.", ['stage'], [0.1, 1])
+        for seconds in (0.05, 0.5, 0.7, 3):
+            histogram.observe(seconds, 'a"b')
+        self.assertEqual(histogram.render().splitlines()[2:], [
+            'test_seconds_bucket{stage="a\\"b",le="0.1"} 1',
+            'test_seconds_bucket{stage="a\\"b",le="1.0"} 3',
+            'test_seconds_bucket{stage="a\\"b",le="+Inf"} 4',
+            'test_seconds_sum{stage="a\\"b"} 4.25',
+            'test_seconds_count{stage="a\\"b"} 4',
+        ])
+
+    def test_server_timing_sums_the_spans_of_each_stage(self):
+        self.assertEqual(
+            server_timing({'results.cache': 0.0012, 'rank.tfidf': 0.25}, 0.3),
+            "results.cache;dur=1.20, rank.tfidf;dur=250.00, total;dur=300.00",
+        )
+
+    def test_spans_from_the_scoring_executor_reach_the_response(self):
+        make_resumes(10)
+        fit_corpus_model()
+        response = self.post_json('/api/get_results/', {'job_description': JOB_DESCRIPTION, 'mode': 'tfidf'})
+        stages = [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')]
+        # rank.tfidf is timed on an executor thread
+        for stage in ('results.parse', 'results.cache', 'results.score', 'rank.tfidf', 'results.serialize'):
+            self.assertIn(stage, stages)
+        self.assertEqual(stages[-1], 'total')
+        self.assertEqual(len(stages), len(set(stages)))
+
+        with override_settings(SERVER_TIMING_ENABLED=False):
+            response = self.post_json('/api/get_results/', {'job_description': JOB_DESCRIPTION, 'mode': 'tfidf'})
+        self.assertNotIn('Server-Timing', response)
+
+        with span('test.outside_a_request'):
+            pass
+        metrics = self.client.get('/api/metrics/').content.decode('utf-8')
+        self.assertIn('resume_stage_duration_seconds_count{stage="rank.tfidf"}', metrics)
+        self.assertIn('resume_stage_duration_seconds_count{stage="test.outside_a_request"} 1', metrics)
+        self.assertIn('resume_request_duration_seconds_count{view="get_results",method="POST",status="200"}', metrics)
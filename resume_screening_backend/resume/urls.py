@@ -6,4 +6,11 @@ from . import views
 urlpatterns = [
     path('upload/', views.upload_resume, name='upload_resume'),  # URL for uploading resumes
     path('get_results/', views.get_results, name='get_results'),  # URL to get extracted data
+    path('health/', views.health, name='health'),  # URL for health checks
+    path('metrics/', views.metrics, name='metrics'),  # URL for Prometheus latency histograms
+    path('results_cache/', views.results_cache_stats, name='results_cache_stats'),  # URL for result cache hit/miss counters
+    path('bulk_upload/', views.bulk_upload, name='bulk_upload'),  # URL for uploading a ZIP of resumes
+    path('ingest_jobs/<int:job_id>/', views.ingest_job_status, name='ingest_job_status'),  # URL to poll bulk upload progress
+    path('batch_screening/', views.batch_screening, name='batch_screening'),  # URL for ranking many JDs in one pass
+    path('batch_screening/<int:batch_id>/', views.screening_batch_status, name='screening_batch_status'),  # URL to poll a screening batch
 ]
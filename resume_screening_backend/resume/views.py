@@ -1,43 +1,41 @@
 # resume/views.py
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.shortcuts import render
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.http.multipartparser import MultiPartParserError
 from django.views.decorators.csrf import csrf_exempt
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from .models import Resume
+from .admission import AdmissionUploadHandler, ArchiveUploadHandler, UploadRejected, admit_request, check_structure
+from .batch_screening import batch_shortlists, create_batch, run_batch_in_background
+from .executors import ExecutorBusy, get_extraction_executor, get_scoring_executor
+from .instrumentation import render_metrics, span
+from .model_registry import IndexNotBuilt, registry
+from .models import IngestJob, Resume, ScreeningBatch
+from .ranking import decode_cursor, encode_cursor, top_k_indices
+from .result_cache import acurrent_corpus_version, get_result_cache, make_key
+from .skill_index import QUERY_CHUNK_SIZE, canonical_skill, iter_resumes_with_all_skills
+from .skill_matcher import get_skill_matcher, normalize_text
+from .ingest import create_job, resume_from_extracted, run_job_in_background
+from .storage import cached_extraction, discard_unreferenced, move_into_storage
+import asyncio
 import os
-import PyPDF2
-import docx
-import re
-import spacy
 import json
+import uuid
+from functools import partial
 
 
 # View to handle fetching resume data
-KNOWN_SKILLS = [
-    "react.js", "javascript", "redux", "python", "java", "django",
-    "html", "css", "typescript", "node.js", "git", "restful apis",
-    "tailwind css", "material-ui", "sql", "mongodb", "graphql",
-]
-
 def extract_skills_from_text(text):
     """
-    Extract skills from text using spaCy and a predefined list of known skills.
+    Extract skills from a job description with the same matcher used for resumes.
     """
-    # Process the text with spaCy
-    doc = nlp(text.lower())
-    
-    # Extract matching skills from the known skills list
-    extracted_skills = [
-        skill for skill in KNOWN_SKILLS if skill in text.lower()
-    ]
-    
-    # Return unique skills
-    return list(set(extracted_skills))
+    with span('results.jd_skills'):
+        return get_skill_matcher().find(text)
 
 @csrf_exempt
-def get_results(request):
+async def get_results(request):
     try:
         # Ensure the request method is POST
         if request.method != "POST":
@@ -45,8 +43,10 @@ def get_results(request):
 
         # Parse JSON data from the request body
         try:
-            data = json.loads(request.body)
+            with span('results.parse'):
+                data = json.loads(request.body)
             job_description = data.get("job_description", "")
+            mode = data.get("mode", "skills")
         except json.JSONDecodeError:
             return JsonResponse({'status': 'error', 'message': 'Invalid JSON payload'}, status=400)
 
@@ -54,293 +54,570 @@ def get_results(request):
         if not job_description or not job_description.strip():
             return JsonResponse({'status': 'error', 'message': 'Job description is required'}, status=400)
 
-        # Extract skills from the job description
-        jd_skills = extract_skills_from_text(job_description)
-        if not jd_skills:
-            return JsonResponse({'status': 'error', 'message': 'No skills found in job description'}, status=400)
-
-        # Fetch resumes with non-empty `skills` field
-        resumes = Resume.objects.exclude(skills__isnull=True).exclude(skills__exact="")
-        if not resumes.exists():
-            return JsonResponse({'status': 'success', 'data': [], 'message': 'No resumes found'}, status=200)
-
-        # Prepare data for comparison
-        shortlisted_resumes = []
-        for resume in resumes:
-            # Extract skills from the resume
-            resume_skills = [skill.strip().lower() for skill in resume.skills.split(",") if skill.strip()]
-            
-            # Check if all JD skills are in the resume's skills
-            if all(skill in resume_skills for skill in jd_skills):
-                shortlisted_resumes.append({
-                    'id': resume.id,
-                    'name': resume.name,
-                    'email': resume.email,
-                    'phone': resume.phone,
-                    'skills': resume.skills,
-                })
-
-        # Return the shortlisted resumes
-        return JsonResponse({'status': 'success', 'data': shortlisted_resumes}, status=200)
+        if mode in RANKERS:
+            try:
+                top_k, min_score, after = parse_ranking_params(data)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            key_parts = (mode, normalize_text(job_description), top_k, min_score, data.get("cursor"))
+            build_payload = partial(RANKERS[mode], job_description, top_k, min_score, after)
+        elif mode == "hybrid":
+            try:
+                top_k, min_score, after = parse_ranking_params(data)
+                options = parse_hybrid_params(data, job_description)
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            key_parts = ("hybrid", normalize_text(job_description), top_k, min_score, data.get("cursor"), options)
+            build_payload = partial(rank_by_hybrid, job_description, top_k, min_score, after, options)
+        elif mode == "skills":
+            # Extract skills from the job description
+            jd_skills = extract_skills_from_text(job_description)
+            if not jd_skills:
+                return JsonResponse({'status': 'error', 'message': 'No skills found in job description'}, status=400)
+            if data.get("format") == "ndjson":
+                # Streamed as it is read, so memory and time to first byte do not grow with the shortlist
+                return StreamingHttpResponse(
+                    aiter_sync(iter_shortlist_ndjson(jd_skills)), content_type='application/x-ndjson'
+                )
+            # JDs that differ only in wording share the same shortlist
+            key_parts = ("skills", jd_skills)
+            build_payload = partial(shortlist_by_skills, jd_skills)
+        else:
+            return JsonResponse({'status': 'error', 'message': f'Unknown mode: {mode}'}, status=400)
+
+        return await cached_results_response(key_parts, build_payload)
 
+    except ExecutorBusy as e:
+        return busy_response(e)
+    except IndexNotBuilt as e:
+        if not await Resume.objects.aexists():
+            return JsonResponse({'status': 'success', 'data': [], 'next_cursor': None, 'message': 'No resumes found'})
+        return index_not_built_response(e)
     except Exception as e:
         # Handle unexpected exceptions
         return JsonResponse({'status': 'error', 'message': f'Error processing resumes: {str(e)}'}, status=500)
-    try:
-        # Ensure the request method is POST
-        if request.method != "POST":
-            return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
-        # Initialize job_description with a default value
-        job_description = None
 
-        # Parse JSON data from the request body
-        try:
-            data = json.loads(request.body)
-            job_description = data.get("job_description", "")
-        except json.JSONDecodeError:
-            return JsonResponse({'status': 'error', 'message': 'Invalid JSON payload'}, status=400)
+async def cached_results_response(key_parts, build_payload):
+    """
+    Serve a results payload from the result cache; on a miss the payload is
+    built on the scoring executor so the event loop keeps serving requests.
+    """
+    result_cache = get_result_cache()
+    corpus_version = await acurrent_corpus_version()
+    key = make_key(corpus_version, *key_parts)
+
+    with span('results.cache'):
+        payload = await result_cache.aget(key, corpus_version)
+    cached = payload is not None
+    if not cached:
+        with span('results.score'):
+            payload = await get_scoring_executor().run(build_payload)
+        if not payload.get('partial'):  # Retried in full once every shard answers again
+            with span('results.cache'):
+                await result_cache.aset(key, payload)
+
+    payload['cached'] = cached
+    with span('results.serialize'):
+        return JsonResponse(payload, status=200)
+
+
+def iter_shortlist_ids(jd_skills):
+    """
+    Chunks of the ids of resumes that have all of the JD's skills, in id order.
 
-        # Ensure job description is provided
-        if not job_description or not job_description.strip():
-            return JsonResponse({'status': 'error', 'message': 'Job description is required'}, status=400)
+    The feature store answers with a bitwise AND over its skill columns;
+    without a store, or for a skill it has no column for, the posting
+    lists are intersected instead.
+    """
+    store = registry.get('feature_store')
+    if store is not None:
+        ids = store.resumes_with_all_skills({canonical_skill(skill) for skill in jd_skills})
+        if ids is not None:
+            for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+                yield ids[start:start + QUERY_CHUNK_SIZE].tolist()
+            return
+    yield from iter_resumes_with_all_skills(jd_skills)
+
+
+def iter_shortlist(jd_skills):
+    """Yield every resume that has all of the JD's skills, in id order, without holding them all."""
+    for ids in iter_shortlist_ids(jd_skills):
+        rows = Resume.objects.filter(id__in=ids).order_by('id').values_list('id', 'name', 'email', 'phone', 'skills')
+        for resume_id, name, email, phone, skills in rows:
+            yield {
+                'id': resume_id,
+                'name': name,
+                'email': email,
+                'phone': phone,
+                'skills': skills,
+            }
 
-        # Fetch resumes with non-empty `resume_text`
-        resumes = Resume.objects.exclude(resume_text__isnull=True).exclude(resume_text__exact="")
-        if not resumes.exists():
-            return JsonResponse({'status': 'success', 'data': [], 'message': 'No resumes found'}, status=200)
 
-        # Prepare data for comparison
-        resume_data = [
-            {
-                'id': resume.id,
-                'name': resume.name,
-                'email': resume.email,
-                'phone': resume.phone,
-                'skills': resume.skills,
-                'resume_text': resume.resume_text
-            }
-            for resume in resumes
-        ]
-
-        # Combine job description with all resumes' text
-        documents = [job_description] + [resume['resume_text'] for resume in resume_data]
-
-        # Calculate TF-IDF vectors
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform(documents)
-
-        # Compute cosine similarity
-        similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
-
-        # Filter resumes with similarity >= 85% and prepare results
-        threshold = 0.85
-        matching_resumes = [
-            {
-                'id': resume_data[idx]['id'],
-                'name': resume_data[idx]['name'],
-                'email': resume_data[idx]['email'],
-                'phone': resume_data[idx]['phone'],
-                'skills': resume_data[idx]['skills'],
-                'similarity': round(similarity * 100, 2)  # Convert similarity to percentage
-            }
-            for idx, similarity in enumerate(similarities) if similarity >= threshold
-        ]
+def shortlist_by_skills(jd_skills):
+    """Payload listing every resume that has all of the JD's skills."""
+    # Fetch resumes with non-empty `skills` field
+    resumes = Resume.objects.exclude(skills__isnull=True).exclude(skills__exact="")
+    if not resumes.exists():
+        return {'status': 'success', 'data': [], 'message': 'No resumes found'}
 
-        # Sort matching resumes by similarity in descending order
-        matching_resumes = sorted(matching_resumes, key=lambda x: x['similarity'], reverse=True)
+    # Intersect the skill posting lists, rarest skill first
+    with span('rank.skills'):
+        shortlisted_resumes = list(iter_shortlist(jd_skills))
 
-        # Return the ranked results
-        return JsonResponse({'status': 'success', 'data': matching_resumes}, status=200)
+    # Return the shortlisted resumes
+    return {'status': 'success', 'data': shortlisted_resumes}
 
-    except Exception as e:
-        # Handle unexpected exceptions
-        return JsonResponse({'status': 'error', 'message': f'Error processing resumes: {str(e)}'}, status=500)
-    try:
-        if request.method != "POST":
-            return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
-        # Get job description from the request
-            data = json.loads(request.body)
-            job_description = data.get("job_description", "")
-        if not job_description:
-            return JsonResponse({'status': 'error', 'message': 'Job description is required'}, status=400)
+def iter_shortlist_ndjson(jd_skills):
+    """The shortlist as NDJSON, one encoded chunk of lines per database round trip."""
+    lines = []
+    for resume in iter_shortlist(jd_skills):
+        lines.append(json.dumps(resume))
+        if len(lines) >= QUERY_CHUNK_SIZE:
+            yield ("\n".join(lines) + "\n").encode('utf-8')
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode('utf-8')
 
-        # Fetch resumes with non-empty `resume_text`
-        resumes = Resume.objects.exclude(resume_text__isnull=True).exclude(resume_text__exact="")
-        if not resumes.exists():
-            return JsonResponse({'status': 'success', 'data': [], 'message': 'No resumes found'}, status=200)
 
-        # Prepare data for comparison
-        resume_data = [
-            {
-                'id': resume.id,
-                'name': resume.name,
-                'email': resume.email,
-                'phone': resume.phone,
-                'skills': resume.skills,
-                'resume_text': resume.resume_text
-            }
-            for resume in resumes
-        ]
-
-        # Combine job description with all resumes' text
-        documents = [job_description] + [resume['resume_text'] for resume in resume_data]
-
-        # Calculate TF-IDF vectors
-        vectorizer = TfidfVectorizer()
-        tfidf_matrix = vectorizer.fit_transform(documents)
-
-        # Compute cosine similarity
-        similarities = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
-
-        # Filter resumes with similarity >= 85% and prepare results
-        threshold = 0.01
-        matching_resumes = [
-            {
-                'id': resume_data[idx]['id'],
-                'name': resume_data[idx]['name'],
-                'email': resume_data[idx]['email'],
-                'phone': resume_data[idx]['phone'],
-                'skills': resume_data[idx]['skills'],
-                'similarity': round(similarity * 100, 2)  # Convert similarity to percentage
-            }
-            for idx, similarity in enumerate(similarities) if similarity >= threshold
-        ]
+async def aiter_sync(iterator):
+    """Drive a sync, ORM-backed iterator from async code, one item per hop to the sync thread."""
+    done = object()
+    while True:
+        item = await sync_to_async(next)(iterator, done)
+        if item is done:
+            return
+        yield item
 
-        # Sort matching resumes by similarity in descending order
-        matching_resumes = sorted(matching_resumes, key=lambda x: x['similarity'], reverse=True)
 
-        # Return the ranked results
-        return JsonResponse({'status': 'success', 'data': matching_resumes}, status=200)
+def parse_ranking_params(data):
+    """Read and validate the `top_k`, `min_score` and `cursor` request fields."""
+    try:
+        top_k = int(data.get("top_k", settings.RESULTS_DEFAULT_TOP_K))
+        min_score = float(data.get("min_score", settings.RESULTS_DEFAULT_MIN_SCORE))
+    except (TypeError, ValueError):
+        raise ValueError("top_k must be an integer and min_score a number") from None
+    if not 1 <= top_k <= settings.RESULTS_MAX_TOP_K:
+        raise ValueError(f"top_k must be between 1 and {settings.RESULTS_MAX_TOP_K}")
 
-    except Exception as e:
-        return JsonResponse({'status': 'error', 'message': f'Error processing resumes: {str(e)}'}, status=500)
+    cursor = data.get("cursor")
+    after = decode_cursor(cursor) if cursor not in (None, "") else None
+    return top_k, min_score, after
 
-# Function to extract data from uploaded resume (example)
-def extract_resume_data(file_path):
-    file_extension = os.path.splitext(file_path)[1].lower()
-    text = ""
 
+def parse_hybrid_params(data, job_description):
+    """
+    Read and validate the hybrid ranking fields: `weights`, `min_must_coverage`
+    and the `must_have` / `nice_to_have` skill lists (parsed from the JD when absent).
+    """
+    from .hybrid import SIGNALS, split_jd_skills
+
+    weights = dict(settings.HYBRID_WEIGHTS)
+    requested = data.get("weights") or {}
+    if not isinstance(requested, dict) or set(requested) - set(SIGNALS):
+        raise ValueError(f"weights must map any of {', '.join(SIGNALS)} to a number")
     try:
-        # Extract text from the file
-        if file_extension == '.pdf':
-            with open(file_path, 'rb') as f:
-                reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text
-        elif file_extension == '.docx':
-            doc = docx.Document(file_path)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
+        weights.update((signal, float(weight)) for signal, weight in requested.items())
+        min_must_coverage = float(data.get("min_must_coverage", settings.HYBRID_MIN_MUST_COVERAGE))
+    except (TypeError, ValueError):
+        raise ValueError("weights and min_must_coverage must be numbers") from None
+    if any(weight < 0 for weight in weights.values()):
+        raise ValueError("weights must not be negative")
+    if not 0 <= min_must_coverage <= 1:
+        raise ValueError("min_must_coverage must be between 0 and 1")
+
+    must_have, nice_to_have = split_jd_skills(job_description)
+    matcher = get_skill_matcher()
+    for field in ("must_have", "nice_to_have"):
+        skills = data.get(field)
+        if skills is None:
+            continue
+        if not isinstance(skills, list) or not all(isinstance(skill, str) for skill in skills):
+            raise ValueError(f"{field} must be a list of skill names")
+        skills = sorted({matcher.canonical(skill) for skill in skills if skill.strip()})
+        if field == "must_have":
+            must_have = skills
         else:
-            raise ValueError("Unsupported file format: Only .pdf and .docx files are supported")
+            nice_to_have = skills
+    nice_to_have = [skill for skill in nice_to_have if skill not in must_have]
+
+    return {
+        'weights': weights,
+        'min_must_coverage': min_must_coverage,
+        'must_have': must_have,
+        'nice_to_have': nice_to_have,
+    }
 
-    except Exception as e:
-        raise ValueError(f"Error extracting data from resume: {str(e)}")
 
-    if not text.strip():
-        raise ValueError("No text could be extracted from the file")
+def rank_by_hybrid(job_description, top_k, min_score, after, options):
+    """Payload ranking the resumes that pass the skill filter by their weighted signals."""
+    from .hybrid import score_resumes
 
-    # Extract dynamic information using regex
-    extracted_data = {
-        'name': extract_name(text),
-        'email': extract_email(text),
-        'phone': extract_phone(text),
-        'skills':extract_skills_nlp(text)
-    }
+    if settings.SEARCH_SHARDS:
+        payload = rank_on_shards(job_description, top_k, min_score, after, options)
+    else:
+        with span('rank.hybrid'):
+            resume_ids, scores, breakdown = score_resumes(
+                job_description, options['must_have'], options['nice_to_have'],
+                options['weights'], options['min_must_coverage'],
+            )
+        payload = ranked_payload(resume_ids, scores, top_k, min_score, after, breakdown)
+    payload['must_have'] = options['must_have']
+    payload['nice_to_have'] = options['nice_to_have']
+    return payload
+
+
+def rank_by_tfidf(job_description, top_k, min_score, after=None):
+    """Payload ranking resumes by cosine similarity to the JD using the persisted corpus model."""
+    if settings.SEARCH_SHARDS:
+        return rank_on_shards(job_description, top_k, min_score, after)
 
-    return extracted_data
+    # Fitted offline (refit_tfidf) and reloaded when another process refits it
+    model = registry.require('tfidf')
 
+    # Transform only the job description and score it against the cached matrix
+    with span('rank.tfidf'):
+        resume_ids, similarities = model.similarities(job_description)
+    return ranked_payload(resume_ids, similarities, top_k, min_score, after)
 
-def extract_email(text):
-    """Extract email from text using regex."""
-    email_pattern = r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+'
-    matches = re.findall(email_pattern, text)
-    return matches[0] if matches else None
 
+def rank_on_shards(job_description, top_k, min_score, after=None, options=None):
+    """
+    Payload ranked by the shard servers of SEARCH_SHARDS: each scores its
+    own resumes (TF-IDF, or the hybrid signals given `options`) and their
+    top k are merged.
+    """
+    from .sharding import search_shards
 
-def extract_phone(text):
-    """Extract phone number from text using regex."""
-    # Regex to match 10-digit phone numbers, optionally with country code
-    phone_pattern = r'\+?\d{1,3}[-.\s]?\(?\d{2,4}\)?[-.\s]?\d{2,4}[-.\s]?\d{4,10}'
-    matches = re.findall(phone_pattern, text)
+    with span('rank.shards'):
+        resume_ids, scores, breakdown, missing = search_shards(job_description, top_k, min_score / 100, after, options)
+    payload = ranked_payload(resume_ids, scores, top_k, min_score, after, breakdown if options else None)
+    if missing:
+        # Shards that failed or timed out are left out rather than failing the query
+        payload['partial'] = True
+        payload['missing_shards'] = missing
+    return payload
 
-    # Return the first match if found, else None
-    return matches[0] if matches else None
 
+def rank_by_bm25(job_description, top_k, min_score, after=None):
+    """Payload ranking resumes by BM25 over the on-disk postings index."""
+    index = registry.require('bm25')
+    if not index.doc_count:
+        return {'status': 'success', 'data': [], 'next_cursor': None, 'message': 'No resumes found'}
 
-def extract_name(text):
-    """Extract name using heuristics or libraries like spaCy."""
-    # Basic heuristic: Assume the name is in the first 2-3 lines of the resume
-    lines = text.split('\n')[:5]  # First few lines of the text
-    name = None
-    for line in lines:
-        if re.match(r'^[A-Z][a-z]+\s[A-Z][a-z]+$', line.strip()):  # Matches "First Last"
-            name = line.strip()
-            break
-    return name
+    # MaxScore only returns the rows that can still make the top k
+    with span('rank.bm25'):
+        resume_ids, scores = index.search(job_description, top_k, min_score / 100, after)
+    return ranked_payload(resume_ids, scores, top_k, min_score, after)
 
 
+def rank_by_embeddings(job_description, top_k, min_score, after=None):
+    """Payload ranking resumes by cosine similarity of dense embeddings to the JD's."""
+    from .embeddings import embed_query
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+    index = registry.require('embedding_index')
+    if not len(index):
+        return {'status': 'success', 'data': [], 'next_cursor': None, 'message': 'No resumes found'}
 
-def extract_skills_nlp(text):
-    """Extract skills using NLP (spaCy)."""
-    # Predefined skill keywords
-    skill_keywords = [
-        "Python", "Java", "C++", "SQL", "JavaScript", "React", "Angular", "Node.js", "HTML", "CSS", "Docker",
-        "Kubernetes", "AWS", "Azure", "Data Analysis", "Machine Learning", "Deep Learning", "AI", "DevOps",
-        "TensorFlow", "Pandas", "NumPy", "Scikit-learn", "Excel", "Tableau", "Power BI", "Git", "Jenkins"
-    ]
+    # Exact scan for small corpora, IVF candidates once the index has one
+    with span('rank.semantic'):
+        resume_ids, similarities = index.similarities(embed_query(job_description))
+    return ranked_payload(resume_ids, similarities, top_k, min_score, after)
 
-    # Process text with spaCy
-    doc = nlp(text)
-    skills = []
 
-    # Match skills based on spaCy tokens
-    for token in doc:
-        if token.text in skill_keywords:
-            skills.append(token.text)
+def ranked_payload(resume_ids, similarities, top_k, min_score, after=None, breakdown=None):
+    """
+    Payload of the `top_k` best-scoring resumes, with a cursor for the next page.
 
-    return list(set(skills))  # Remove duplicates
+    `breakdown` optionally maps signal names to per-row scores, reported
+    for each resume next to its overall `similarity`.
+    """
+    # Select the k best rows above `min_score` (a percentage, like `similarity`)
+    with span('rank.top_k'):
+        winners = top_k_indices(similarities, resume_ids, top_k, min_score / 100, after)
+    with span('rank.fetch'):
+        resumes = Resume.objects.only('id', 'name', 'email', 'phone', 'skills').in_bulk(
+            [int(resume_ids[idx]) for idx in winners]
+        )
+
+    matching_resumes = []
+    for idx in winners:
+        resume = resumes.get(int(resume_ids[idx]))
+        if resume is None:
+            continue  # Deleted since the index was built
+        result = {
+            'id': resume.id,
+            'name': resume.name,
+            'email': resume.email,
+            'phone': resume.phone,
+            'skills': resume.skills,
+            'similarity': round(float(similarities[idx]) * 100, 2)  # Convert similarity to percentage
+        }
+        if breakdown:
+            result['scores'] = {signal: round(float(values[idx]) * 100, 2) for signal, values in breakdown.items()}
+        matching_resumes.append(result)
+
+    # A full page means there may be more results after the last winner
+    next_cursor = None
+    if len(winners) == top_k:
+        last = winners[-1]
+        next_cursor = encode_cursor(similarities[last], resume_ids[last])
+
+    # Return the ranked results
+    return {'status': 'success', 'data': matching_resumes, 'next_cursor': next_cursor}
+
+
+# Ranked modes of `get_results`
+RANKERS = {
+    'tfidf': rank_by_tfidf,
+    'bm25': rank_by_bm25,
+    'semantic': rank_by_embeddings,
+}
 
 # View for handling file upload and processing
 @csrf_exempt
-def upload_resume(request):
-    if request.method == 'POST' and request.FILES.get('resume'):
+async def upload_resume(request):
+    if request.method == 'POST':
+        handler = AdmissionUploadHandler(request)
         try:
-            # Save the uploaded file
-            resume_file = request.FILES['resume']
-            upload_dir = "uploaded_resumes"
-            os.makedirs(upload_dir, exist_ok=True)
-            file_path = os.path.join(upload_dir, resume_file.name)
-
-            with open(file_path, 'wb') as f:
-                for chunk in resume_file.chunks():
-                    f.write(chunk)
-            
-            # Extract data
-            extracted_data = extract_resume_data(file_path)
+            # Size and rate limits are checked on the headers, before the body is read
+            await sync_to_async(admit_request)(request)
+
+            # Turn the upload away before writing it if parsing is already backed up
+            extraction_executor = get_extraction_executor()
+            if extraction_executor.is_full():
+                raise ExecutorBusy(extraction_executor.retry_after)
+
+            # Stream the file to a temporary file, sniffing its type from the first
+            # chunk, and move it under its content hash once it passed the checks
+            request.upload_handlers = [handler]
+            with span('upload.store'):
+                files = await asyncio.to_thread(lambda: request.FILES)
+                resume_file = files.get('resume')
+                if resume_file is None:
+                    return JsonResponse({'status': 'error', 'message': 'No file uploaded'}, status=400)
+                content_hash = resume_file.content_hash
+                file_path = await asyncio.to_thread(store_admitted, resume_file)
+
+            # The same file was uploaded before: return the stored resume
+            with span('upload.dedupe'):
+                existing = await Resume.objects.filter(content_hash=content_hash).afirst()
+            if existing is not None:
+                return duplicate_upload_response(existing)
+
+            # Extract data in a worker process (skipped when the extraction cache has this content)
+            try:
+                with span('upload.extract'):
+                    text, extracted_data = await extraction_executor.run(cached_extraction, content_hash, file_path)
+            except ValueError as e:
+                # Unreadable or textless: nothing references the stored file
+                await asyncio.to_thread(discard_unreferenced, content_hash, file_path)
+                return rejected_response(UploadRejected('unreadable_document', str(e), 422))
 
             # Save to database
-            Resume.objects.create(
-                name=extracted_data['name'],
-                email=extracted_data['email'],
-                phone=extracted_data['phone'],
-                skills=", ".join(extracted_data['skills']),  # Save skills as a string
-                resume_text=extracted_data
-            ),
+            try:
+                with span('upload.save'):
+                    await sync_to_async(save_new_resume)(resume_from_extracted(extracted_data, text, content_hash))
+            except IntegrityError:
+                # A concurrent upload of the same file won the race
+                return duplicate_upload_response(await Resume.objects.aget(content_hash=content_hash))
 
             return JsonResponse(
                 {'message': 'Resume uploaded and data saved successfully!', 'data': extracted_data},
                 status=200
             )
 
+        except UploadRejected as e:
+            return rejected_response(e)
+        except MultiPartParserError as e:
+            return rejected_response(UploadRejected('malformed_request', str(e)))
+        except ExecutorBusy as e:
+            return busy_response(e)
         except Exception as e:
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        finally:
+            handler.discard()
 
     return JsonResponse({'status': 'error', 'message': 'No file uploaded'}, status=400)
+
+
+def store_admitted(upload):
+    """Check that an admitted upload is parseable, then move it into content-addressed storage."""
+    check_structure(upload.tmp_path, upload.extension)
+    return move_into_storage(upload.tmp_path, upload.content_hash, upload.extension)
+
+
+def save_new_resume(resume):
+    # The skill index commits with the row; the search indexes are written once it has committed
+    with transaction.atomic():
+        resume.save()
+
+
+def rejected_response(error):
+    """Structured error for a refused upload: a stable `code` next to the message."""
+    response = JsonResponse({'status': 'error', 'code': error.code, 'message': str(error)}, status=error.status)
+    if error.retry_after:
+        response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def busy_response(error):
+    """429 telling the client when to retry."""
+    response = JsonResponse({'status': 'error', 'message': str(error)}, status=429)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def index_not_built_response(error):
+    """503 naming the command that builds the missing index."""
+    return JsonResponse({'status': 'error', 'message': str(error)}, status=503)
+
+
+def duplicate_upload_response(resume):
+    """Response for a re-submitted file, built from the already stored resume."""
+    return JsonResponse(
+        {
+            'message': 'Resume was already uploaded',
+            'duplicate': True,
+            'data': {
+                'id': resume.id,
+                'name': resume.name,
+                'email': resume.email,
+                'phone': resume.phone,
+                'skills': [skill.strip() for skill in resume.skills.split(",") if skill.strip()],
+            },
+        },
+        status=200
+    )
+
+
+# Liveness probe; deliberately touches neither the database nor any model
+def health(request):
+    return JsonResponse({'status': 'ok'}, status=200)
+
+
+# Prometheus scrape target: this worker's stage and request latency histograms
+def metrics(request):
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# Hit/miss counters of this worker's result cache
+def results_cache_stats(request):
+    return JsonResponse(get_result_cache().stats(), status=200)
+
+
+# View for queueing a ZIP archive of resumes
+@csrf_exempt
+def bulk_upload(request):
+    if request.method == 'POST':
+        handler = ArchiveUploadHandler(request)
+        try:
+            # The archive gets the same size and rate checks as single uploads, with a larger cap
+            admit_request(request, settings.BULK_UPLOAD_MAX_BYTES)
+
+            # Stream the archive to disk; it is unpacked and parsed in the background
+            request.upload_handlers = [handler]
+            archive = request.FILES.get('archive')
+            if archive is None:
+                return JsonResponse({'status': 'error', 'message': 'No archive uploaded'}, status=400)
+            archive_path = os.path.join(settings.BULK_UPLOAD_DIR, f"{uuid.uuid4().hex}.zip")
+            os.replace(archive.tmp_path, archive_path)
+
+            try:
+                job = create_job(archive_path)
+            except ValueError as e:
+                os.remove(archive_path)
+                return rejected_response(UploadRejected('invalid_document', str(e), 422))
+            run_job_in_background(job.pk)
+
+            return JsonResponse({'status': 'queued', 'job_id': job.pk}, status=202)
+
+        except UploadRejected as e:
+            return rejected_response(e)
+        except MultiPartParserError as e:
+            return rejected_response(UploadRejected('malformed_request', str(e)))
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        finally:
+            handler.discard()
+
+    return JsonResponse({'status': 'error', 'message': 'No archive uploaded'}, status=400)
+
+
+# View for polling the progress of a bulk upload
+def ingest_job_status(request, job_id):
+    try:
+        job = IngestJob.objects.get(pk=job_id)
+    except IngestJob.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Ingest job not found'}, status=404)
+
+    progress = round(job.processed * 100 / job.total, 2) if job.total else 100.0
+    return JsonResponse({
+        'job_id': job.pk,
+        'status': job.status,
+        'total': job.total,
+        'processed': job.processed,
+        'failed': job.failed,
+        'progress': progress,
+        'error': job.error,
+    }, status=200)
+
+
+# View for queueing many job descriptions to be ranked against the corpus together
+@csrf_exempt
+def batch_screening(request):
+    if request.method != "POST":
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON payload'}, status=400)
+
+    job_descriptions = data.get("job_descriptions")
+    if (
+        not isinstance(job_descriptions, list) or not job_descriptions
+        or not all(isinstance(jd, str) and jd.strip() for jd in job_descriptions)
+    ):
+        return JsonResponse(
+            {'status': 'error', 'message': 'job_descriptions must be a list of non-empty strings'}, status=400
+        )
+    if len(job_descriptions) > settings.BATCH_SCREENING_MAX_JDS:
+        return JsonResponse(
+            {'status': 'error', 'message': f'At most {settings.BATCH_SCREENING_MAX_JDS} job descriptions per batch'},
+            status=400
+        )
+    try:
+        top_k, min_score, _ = parse_ranking_params(data)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    if registry.get('tfidf') is None:
+        return index_not_built_response(IndexNotBuilt('tfidf'))
+
+    batch = create_batch(job_descriptions, top_k, min_score)
+    run_batch_in_background(batch.pk)
+    return JsonResponse(
+        {'status': 'queued', 'batch_id': batch.pk, 'job_descriptions': len(job_descriptions)},
+        status=202
+    )
+
+
+# View for polling a screening batch; returns the shortlists once it is done
+def screening_batch_status(request, batch_id):
+    try:
+        batch = ScreeningBatch.objects.get(pk=batch_id)
+    except ScreeningBatch.DoesNotExist:
+        return JsonResponse({'status': 'error', 'message': 'Screening batch not found'}, status=404)
+
+    response = {
+        'batch_id': batch.pk,
+        'status': batch.status,
+        'job_descriptions': len(batch.job_descriptions),
+        'top_k': batch.top_k,
+        'min_score': batch.min_score,
+        'error': batch.error or None,
+    }
+    if batch.status == ScreeningBatch.STATUS_DONE:
+        response['shortlists'] = batch_shortlists(batch)
+    return JsonResponse(response, status=200)
@@ -55,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'resume.middleware.InstrumentationMiddleware',
 ]
 
 CORS_ALLOWED_ORIGINS = [
@@ -142,3 +143,281 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# NLP models
+
+# Skill names and synonyms compiled into the matcher shared by JD and resume parsing
+SKILL_TAXONOMY_PATH = BASE_DIR / 'resume' / 'data' / 'skills.txt'
+
+# Country calling code given to phone numbers written without one, so that
+# every stored phone number is in E.164 form
+PHONE_DEFAULT_COUNTRY_CODE = '91'
+
+# Load models when the WSGI/ASGI application starts instead of on first use.
+# Management commands never preload and load models only if they need them.
+PRELOAD_MODELS = True
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'resume': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
+
+# Search indexes
+
+SEARCH_INDEX_DIR = BASE_DIR / 'search_index'
+
+TFIDF_MODEL_DIR = SEARCH_INDEX_DIR / 'tfidf'
+
+# Refit the TF-IDF model once this share of appended tokens is out of vocabulary
+TFIDF_DRIFT_THRESHOLD = 0.2
+
+# Appends add delta segments next to the fitted rows; once there are more
+# than TFIDF_MAX_DELTAS, runs of TFIDF_MERGE_FACTOR adjacent deltas are
+# merged in the background
+TFIDF_MAX_DELTAS = 16
+
+TFIDF_MERGE_FACTOR = 8
+
+# Write saved and deleted resumes into the on-disk indexes on a background
+# thread after their transaction commits; off, the committing thread does it
+INDEX_UPDATES_IN_BACKGROUND = True
+
+BM25_INDEX_DIR = SEARCH_INDEX_DIR / 'bm25'
+
+BM25_K1 = 1.2
+
+BM25_B = 0.75
+
+# Uploads add small segments; once there are more than BM25_MAX_SEGMENTS,
+# runs of BM25_MERGE_FACTOR adjacent segments are merged in the background
+BM25_MAX_SEGMENTS = 16
+
+BM25_MERGE_FACTOR = 8
+
+# Semantic search: 'hashing' (hashed character n-grams, no model files) or
+# 'sentence-transformers' (needs the package and a local model in EMBEDDING_MODEL)
+EMBEDDING_BACKEND = 'hashing'
+
+EMBEDDING_MODEL = None
+
+# Vector size of the hashing embedder
+EMBEDDING_DIM = 512
+
+EMBEDDING_DIR = SEARCH_INDEX_DIR / 'embeddings'
+
+# Smaller corpora are scanned exactly instead of through the IVF index
+EMBEDDING_ANN_MIN_ROWS = 20000
+
+# IVF lists (None: square root of the corpus size), and lists probed per
+# query: more probes give better recall for more latency
+EMBEDDING_IVF_LISTS = None
+
+EMBEDDING_IVF_PROBES = 8
+
+# Memory-mapped columns (skill bitsets, TF-IDF rows, upload times) that the
+# skill filter and hybrid ranking read instead of the database
+FEATURE_STORE_DIR = SEARCH_INDEX_DIR / 'features'
+
+
+# Sharded search (build_shards, serve_shards)
+
+# Addresses of the shard servers, 'host:port' or 'unix:/path/to/socket', in
+# shard order. When set, TF-IDF and hybrid queries are scattered to them and
+# their per-shard top k merged; empty ranks in process.
+SEARCH_SHARDS = []
+
+# 'hash' assigns resume ids to shards by id modulo the shard count, 'range'
+# by SEARCH_SHARD_BOUNDS: ascending ids starting shards 1, 2, ...
+SEARCH_SHARD_STRATEGY = 'hash'
+
+SEARCH_SHARD_BOUNDS = []
+
+# One feature store per shard, under shard-00, shard-01, ...
+SHARD_INDEX_DIR = SEARCH_INDEX_DIR / 'shards'
+
+# Seconds a query waits for the shards; the results of those that did not
+# answer in time are left out and the payload is marked partial
+SEARCH_SHARD_TIMEOUT = 2.0
+
+SEARCH_SHARD_MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+
+# Ranked results
+
+RESULTS_DEFAULT_TOP_K = 50
+
+RESULTS_MAX_TOP_K = 500
+
+# Minimum similarity, in percent, for a resume to be returned
+RESULTS_DEFAULT_MIN_SCORE = 1.0
+
+# Hybrid ranking: weight of each signal in the combined score (recency is
+# off by default: it reads the upload date of every candidate)
+HYBRID_WEIGHTS = {'must_have': 0.4, 'nice_to_have': 0.2, 'text': 0.4, 'recency': 0.0}
+
+# Share of the JD's must-have skills a resume needs to be ranked at all
+HYBRID_MIN_MUST_COVERAGE = 1.0
+
+HYBRID_RECENCY_HALF_LIFE_DAYS = 180
+
+# Text signal of hybrid ranking: 'tfidf' or 'bm25'
+HYBRID_TEXT_SCORER = 'tfidf'
+
+# Per-process LRU of get_results responses, bounded by their total size
+RESULTS_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Optional CACHES alias (e.g. Redis) shared by all workers as a second tier
+RESULTS_CACHE_ALIAS = None
+
+RESULTS_CACHE_TIMEOUT = 60 * 60
+
+# Batch screening: JDs accepted per batch, and resumes scored per sparse
+# product (the score block held in memory is JDs x rows floats)
+BATCH_SCREENING_MAX_JDS = 200
+
+BATCH_SCREENING_CHUNK_ROWS = 20000
+
+
+# Uploads
+
+# Uploaded files are stored content-addressed: <UPLOAD_DIR>/<aa>/<sha256><ext>
+UPLOAD_DIR = BASE_DIR / 'uploaded_resumes'
+
+# Larger uploads are refused (from Content-Length when sent, else once
+# that many bytes have streamed in)
+UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+
+# Uploads are streamed to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# Per client, at most UPLOAD_RATE_LIMIT uploads and UPLOAD_CLIENT_MAX_BYTES
+# bytes every UPLOAD_RATE_WINDOW seconds (None: no limit). The counters are
+# kept in the UPLOAD_RATE_CACHE_ALIAS cache; point it at a shared cache for
+# the limits to hold across workers.
+UPLOAD_RATE_WINDOW = 60
+
+UPLOAD_RATE_LIMIT = 30
+
+UPLOAD_CLIENT_MAX_BYTES = 200 * 1024 * 1024
+
+UPLOAD_RATE_CACHE_ALIAS = 'default'
+
+# META key of a proxy header naming the client (e.g. 'HTTP_X_FORWARDED_FOR');
+# None counts uploads against REMOTE_ADDR
+UPLOAD_CLIENT_IP_HEADER = None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Extracted text and fields keyed by content hash, shared by all workers
+    'extraction': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'extraction',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+
+EXTRACTION_CACHE_ALIAS = 'extraction'
+
+
+# PDF text extraction
+
+# 'pypdf2' or 'pdfminer'
+PDF_BACKEND = 'pypdf2'
+
+# Larger files are rejected; pages past the cap are ignored
+PDF_MAX_BYTES = 20 * 1024 * 1024
+
+PDF_MAX_PAGES = 50
+
+# Seconds before extraction of a single document is abandoned
+PDF_TIMEOUT = 30
+
+
+# Other document formats
+
+# .docx (and .doc) files over DOCX_MAX_BYTES are rejected, as are .docx
+# archives whose XML parts inflate past DOCX_MAX_XML_BYTES
+DOCX_MAX_BYTES = 20 * 1024 * 1024
+
+DOCX_MAX_XML_BYTES = 100 * 1024 * 1024
+
+# Cap on .txt and .rtf files, which are read whole
+TEXT_MAX_BYTES = 5 * 1024 * 1024
+
+# Command (plus arguments) that prints the text of a legacy .doc file given
+# its path; it runs with the PDF_TIMEOUT limit
+DOC_CONVERTER = ['antiword']
+
+
+# Async endpoints
+
+# Worker processes parsing uploads, and threads ranking JDs, per server process
+EXTRACTION_WORKERS = min(os.cpu_count() or 1, 4)
+
+SCORING_WORKERS = 4
+
+# Queued plus running tasks per executor; further requests get a 429
+EXECUTOR_MAX_PENDING = 32
+
+# Seconds sent in the Retry-After header of a 429
+EXECUTOR_RETRY_AFTER = 5
+
+
+# Bulk ingestion
+
+# ZIP archives and their extracted members are kept here, one directory per job
+BULK_UPLOAD_DIR = BASE_DIR / 'uploaded_resumes' / 'bulk'
+
+# Larger archives are refused like oversized uploads; they count against the
+# same per-client limits
+BULK_UPLOAD_MAX_BYTES = 100 * 1024 * 1024
+
+# Resumes inserted per bulk_create batch
+INGEST_BATCH_SIZE = 200
+
+
+# Re-indexing (reindex_resumes)
+
+# Parser processes and resumes per chunk when re-deriving stored resumes
+REINDEX_WORKERS = max((os.cpu_count() or 1) // 2, 1)
+
+REINDEX_CHUNK_SIZE = 500
+
+# Throttling, so a pass over the whole corpus does not starve live traffic:
+# workers run at a lower priority, the job sleeps REINDEX_PAUSE seconds
+# after each chunk and waits (at most REINDEX_MAX_WAIT seconds) while the
+# load average per CPU is above REINDEX_MAX_LOAD (None: never waits)
+REINDEX_WORKER_NICENESS = 10
+
+REINDEX_PAUSE = 0.2
+
+REINDEX_MAX_LOAD = 0.8
+
+REINDEX_MAX_WAIT = 60
+
+
+# Instrumentation
+
+# Upper bounds, in seconds, of the stage and request latency histograms
+# exported at /api/metrics/
+METRICS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+# Report the time spent in each stage of a request in a Server-Timing header
+SERVER_TIMING_ENABLED = True
+
+# Profile requests sent with an "X-Profile: cprofile" (or "pyinstrument")
+# header and write the dumps to PROFILE_DIR. Keep off in production.
+PROFILE_REQUESTS = DEBUG
+
+PROFILE_DIR = BASE_DIR / 'profiles'
@@ -14,3 +14,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'resume_screening_backend.settings')
 
 application = get_wsgi_application()
+
+# Load NLP models and search indexes at worker start rather than on the first
+# request. Under gunicorn with `preload_app` this runs once in the master and
+# the forked workers share the loaded pages.
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_MODELS:
+    from resume.model_registry import registry
+
+    registry.preload()